@@ -6,11 +6,68 @@ Generates easy-to-understand summaries of security events using AI/ML
 
 import sys
 import json
+import html
 import os
 from datetime import datetime, timedelta
-from collections import defaultdict
+from collections import Counter
+from functools import lru_cache
+from operator import itemgetter
+import heapq
 import re
 
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# Severity rank (lower = more urgent) and report colors
+SEVERITY_ORDER = {"critical": 0, "high": 1, "medium": 2, "low": 3, "info": 4}
+SEVERITY_COLORS = {
+    "critical": "#dc3545",
+    "high": "#fd7e14",
+    "medium": "#ffc107",
+    "low": "#17a2b8",
+    "info": "#28a745"
+}
+
+@lru_cache(maxsize=4096)
+def _parse_ts(timestamp):
+    """ISO-8601 timestamp -> epoch seconds (0.0 when missing or unparseable)"""
+    try:
+        return datetime.fromisoformat(timestamp.replace("Z", "+00:00")).timestamp()
+    except (ValueError, TypeError, AttributeError):
+        return 0.0
+
+def _json_loads(data):
+    """Parse JSON bytes, preferring orjson's C parser"""
+    return orjson.loads(data) if HAS_ORJSON else json.loads(data)
+
+def _json_dumps(obj):
+    """Serialize to indented JSON text, preferring orjson"""
+    if HAS_ORJSON:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(obj, indent=2)
+
+_severity_of = itemgetter("severity")
+
+def normalize_events(events):
+    """
+    Events with a lowercase "severity" (default "info"), so later passes skip .get/.lower
+    
+    Returns a new list; an event that needs a change is copied, the caller's
+    dicts are never modified.
+    """
+    normalized = []
+    for event in events:
+        severity = event.get("severity")
+        if severity is None:
+            event = {**event, "severity": "info"}
+        elif not severity.islower():
+            event = {**event, "severity": severity.lower()}
+        normalized.append(event)
+    return normalized
+
 def analyze_security_events(events):
     """Analyze security events and generate insights"""
     if not events:
@@ -20,15 +77,11 @@ def analyze_security_events(events):
             "recommendations": []
         }
     
-    # Categorize events
-    categories = defaultdict(list)
-    severity_counts = {"critical": 0, "high": 0, "medium": 0, "low": 0, "info": 0}
-    
-    for event in events:
-        category = event.get("category", "general")
-        severity = event.get("severity", "info").lower()
-        categories[category].append(event)
-        severity_counts[severity] = severity_counts.get(severity, 0) + 1
+    # Tally categories and severities (severity already normalized)
+    events = normalize_events(events)
+    categories = Counter(event.get("category", "general") for event in events)
+    severity_counts = Counter({"critical": 0, "high": 0, "medium": 0, "low": 0, "info": 0})
+    severity_counts.update(map(_severity_of, events))
     
     # Generate summary
     total_events = len(events)
@@ -73,23 +126,24 @@ def analyze_security_events(events):
         "summary": summary,
         "severity": severity,
         "total_events": total_events,
-        "by_category": {k: len(v) for k, v in categories.items()},
-        "by_severity": severity_counts,
+        "by_category": dict(categories),
+        "by_severity": dict(severity_counts),
         "recommendations": recommendations,
         "top_issues": get_top_issues(events, 5)
     }
 
 def get_top_issues(events, limit=5):
-    """Get top priority issues"""
+    """Get top priority issues (events as returned by normalize_events)"""
     # Sort by severity (critical > high > medium > low > info)
-    severity_order = {"critical": 0, "high": 1, "medium": 2, "low": 3, "info": 4}
-    
-    sorted_events = sorted(
+    # Partial heap selection: O(N log k); most recent event wins severity ties
+    return heapq.nsmallest(
+        limit,
         events,
-        key=lambda x: severity_order.get(x.get("severity", "info").lower(), 99)
+        key=lambda x: (
+            SEVERITY_ORDER.get(_severity_of(x), 99),
+            -_parse_ts(x.get("timestamp", ""))
+        )
     )
-    
-    return sorted_events[:limit]
 
 def generate_trend_analysis(historical_data):
     """Analyze trends over time using simple ML"""
@@ -166,19 +220,8 @@ def generate_natural_language_report(analysis, trend=None):
     
     return "\n".join(report)
 
-def generate_html_email(analysis, trend=None, events=None):
-    """Generate HTML email template"""
-    severity_colors = {
-        "critical": "#dc3545",
-        "high": "#fd7e14",
-        "medium": "#ffc107",
-        "low": "#17a2b8",
-        "info": "#28a745"
-    }
-    
-    color = severity_colors.get(analysis["severity"], "#6c757d")
-    
-    html = f"""
+# Static head/statistics block, filled in with str.format per report
+HTML_EMAIL_HEAD = """
 <!DOCTYPE html>
 <html>
 <head>
@@ -202,63 +245,78 @@ def generate_html_email(analysis, trend=None, events=None):
     <div class="container">
         <div class="header">
             <h1>🛡️ MacGuardian Security Report</h1>
-            <p>{datetime.now().strftime('%B %d, %Y at %I:%M %p')}</p>
+            <p>{generated_at}</p>
         </div>
         <div class="content">
-            <div class="summary">{analysis['summary']}</div>
+            <div class="summary">{summary}</div>
             
             <div class="stat-box">
                 <h3>📊 Statistics</h3>
-                <p><strong>Total Events:</strong> {analysis['total_events']}</p>
-                <p><strong>Critical:</strong> {analysis['by_severity'].get('critical', 0)} | 
-                   <strong>High:</strong> {analysis['by_severity'].get('high', 0)} | 
-                   <strong>Medium:</strong> {analysis['by_severity'].get('medium', 0)}</p>
+                <p><strong>Total Events:</strong> {total_events}</p>
+                <p><strong>Critical:</strong> {critical} | 
+                   <strong>High:</strong> {high} | 
+                   <strong>Medium:</strong> {medium}</p>
             </div>
 """
+
+def generate_html_email(analysis, trend=None, events=None):
+    """Generate HTML email template"""
+    color = SEVERITY_COLORS.get(analysis["severity"], "#6c757d")
+    by_severity = analysis["by_severity"]
+    
+    parts = [HTML_EMAIL_HEAD.format(
+        color=color,
+        generated_at=datetime.now().strftime('%B %d, %Y at %I:%M %p'),
+        summary=html.escape(analysis["summary"]),
+        total_events=analysis["total_events"],
+        critical=by_severity.get("critical", 0),
+        high=by_severity.get("high", 0),
+        medium=by_severity.get("medium", 0)
+    )]
     
     if analysis.get("top_issues"):
-        html += """
+        parts.append("""
             <div class="stat-box">
                 <h3>🔍 Top Priority Issues</h3>
-"""
+""")
         for issue in analysis["top_issues"]:
-            severity = issue.get("severity", "info").lower()
-            title = issue.get("title", "Unknown issue")
-            html += f"""
+            severity = html.escape(issue.get("severity", "info").lower())
+            title = html.escape(issue.get("title", "Unknown issue"))
+            parts.append(f"""
                 <div class="issue-item">
                     <span class="badge badge-{severity}">{severity.upper()}</span>
                     <strong>{title}</strong>
                 </div>
-"""
-        html += """
+""")
+        parts.append("""
             </div>
-"""
+""")
     
     if trend:
         trend_icon = "📈" if trend["trend"] == "increasing" else "📉" if trend["trend"] == "decreasing" else "📊"
-        html += f"""
+        parts.append(f"""
             <div class="stat-box">
                 <h3>{trend_icon} Trend Analysis</h3>
                 <p>Security issues are <strong>{trend['trend']}</strong></p>
-"""
+""")
         if trend["trend"] != "stable":
-            html += f"<p>Change: {trend['change_percent']:.1f}%</p>"
-        html += """
+            parts.append(f"<p>Change: {trend['change_percent']:.1f}%</p>")
+        parts.append("""
             </div>
-"""
+""")
     
     if analysis.get("recommendations"):
-        html += """
+        parts.append("""
             <div class="stat-box">
                 <h3>💡 Recommendations</h3>
-"""
+""")
         for rec in analysis["recommendations"]:
-            html += f'<div class="recommendation">{rec}</div>'
-        html += """
+            parts.append(f'<div class="recommendation">{html.escape(rec)}</div>')
+        parts.append("""
             </div>
-"""
+""")
     
-    html += """
+    parts.append("""
             <p style="margin-top: 20px; font-size: 12px; color: #666;">
                 This report was generated by MacGuardian Suite with AI-powered analysis.
             </p>
@@ -266,9 +324,9 @@ def generate_html_email(analysis, trend=None, events=None):
     </div>
 </body>
 </html>
-"""
+""")
     
-    return html
+    return "".join(parts)
 
 def main():
     """Main function"""
@@ -281,8 +339,8 @@ def main():
     # Load events
     events = []
     if os.path.exists(events_file):
-        with open(events_file, 'r') as f:
-            events = json.load(f)
+        with open(events_file, 'rb') as f:
+            events = _json_loads(f.read())
     
     # Analyze
     analysis = analyze_security_events(events)
@@ -302,7 +360,7 @@ def main():
     
     # Also output JSON for programmatic use
     print("JSON_ANALYSIS_START")
-    print(json.dumps(analysis, indent=2))
+    print(_json_dumps(analysis))
     print("JSON_ANALYSIS_END")
 
 if __name__ == "__main__":
@@ -8,9 +8,16 @@ Lightweight on-device machine learning for security analysis
 import json
 import sys
 import os
+import re
+import math
+import mmap
 import argparse
+import importlib.machinery
 from pathlib import Path
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import ClassVar
 import statistics
 
 try:
@@ -21,32 +28,126 @@ except ImportError:
     print("Warning: numpy not available, using basic math", file=sys.stderr)
 
 try:
-    from sklearn.ensemble import IsolationForest
-    from sklearn.preprocessing import StandardScaler
-    HAS_SKLEARN = True
+    import orjson
+    HAS_ORJSON = True
 except ImportError:
-    HAS_SKLEARN = False
-    print("Warning: scikit-learn not available, using statistical methods", file=sys.stderr)
+    HAS_ORJSON = False
+
+try:
+    from ai_engine_numba import zscore_flags
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+
+def _json_loads(data):
+    """Parse JSON bytes, preferring orjson's C parser"""
+    return orjson.loads(data) if HAS_ORJSON else json.loads(data)
+
+
+def _json_dumps_bytes(obj):
+    """Serialize to indented JSON bytes, preferring orjson"""
+    if HAS_ORJSON:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2).encode()
+
+
+BASELINE_PATH = Path.home() / ".macguardian" / "ai" / "baseline.json"
+
+
+@lru_cache(maxsize=4)
+def _load_baseline_cached(path_str, mtime):
+    """Parse a baseline file once per (path, mtime); treat the result as read-only"""
+    with open(path_str, 'rb') as f:
+        return _json_loads(f.read())
+
+
+def _load_counts(path):
+    """Read (process_count, network_connections) from a metrics file, or None"""
+    try:
+        with open(path, 'rb') as f:
+            data = _json_loads(f.read())
+        return data.get("process_count", 0), data.get("network_connections", 0)
+    except:
+        return None
+
+
+def _slope(values):
+    """Closed-form least-squares slope of values against 0..n-1.
+    
+    Equivalent to np.polyfit(range(n), values, 1)[0] without the
+    Vandermonde/SVD setup; for the <=10 points used here plain Python
+    is faster than NumPy dispatch.
+    """
+    n = len(values)
+    sum_x = n * (n - 1) / 2
+    sum_xx = (n - 1) * n * (2 * n - 1) / 6
+    sum_y = sum(values)
+    sum_xy = sum(i * y for i, y in enumerate(values))
+    denom = n * sum_xx - sum_x * sum_x
+    if denom == 0:
+        return 0.0
+    return (n * sum_xy - sum_x * sum_y) / denom
+
+
+# Single-pass byte matchers for pattern_recognition (one regex scan per file)
+SUSPICIOUS_PROCESS_RE = re.compile(rb"miner|crypto|bitcoin|malware|trojan", re.IGNORECASE)
+SUSPICIOUS_PORT_RE = re.compile(rb":(4444|5555|6666|7777|8888|9999|1337|31337)\b")
+
+
+MAX_UNIQUE_THREATS = 10  # stop scanning once this many distinct hits are seen
+
+
+def _first_unique(matches, limit):
+    """Distinct lowercased hits (last group, else whole match) in first-seen order"""
+    hits = {}
+    for m in matches:
+        hits.setdefault(m.group(m.lastindex or 0).lower(), None)
+        if len(hits) >= limit:
+            break
+    return [hit.decode() for hit in hits]
+
+
+def _scan_file(path, pattern, limit=MAX_UNIQUE_THREATS):
+    """Scan an mmapped file for up to limit distinct pattern hits without decoding it"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            # Match objects pin the mmap; they are released when _first_unique returns
+            return _first_unique(pattern.finditer(buf), limit)
+
+
+# Metrics forming the 4-D feature vector for the baseline distance check
+FEATURE_METRICS = ("process_count", "network_connections", "cpu_usage", "memory_usage")
+
+# File extensions flagged by classify_files
+RISK_EXTENSIONS = frozenset({".exe", ".bat", ".scr", ".vbs", ".ps1", ".sh"})
+RISK_EXTENSIONS_LIST = sorted(RISK_EXTENSIONS)
+BULK_CLASSIFY_THRESHOLD = 10000  # switch to np.isin above this many files
 
 
 class SecurityAnalyzer:
     """Lightweight ML-based security analyzer optimized for M1 Pro"""
     
+    _baseline_dir_ready: ClassVar[bool] = False
+    
     def __init__(self):
         self.baseline_metrics = None
         self.anomaly_threshold = 2.0  # Standard deviations
         self.load_baseline()
+        self._stack_baseline()
     
     def load_baseline(self):
         """Load or create baseline metrics"""
-        baseline_file = Path.home() / ".macguardian" / "ai" / "baseline.json"
+        baseline_file = BASELINE_PATH
         
-        if baseline_file.exists():
-            try:
-                with open(baseline_file, 'r') as f:
-                    self.baseline_metrics = json.load(f)
-            except:
-                self.baseline_metrics = None
+        try:
+            self.baseline_metrics = _load_baseline_cached(
+                str(baseline_file), baseline_file.stat().st_mtime
+            )
+        except:
+            self.baseline_metrics = None
         
         if not self.baseline_metrics:
             # Create initial baseline
@@ -60,64 +161,83 @@ class SecurityAnalyzer:
     
     def save_baseline(self):
         """Save baseline metrics"""
-        baseline_file = Path.home() / ".macguardian" / "ai" / "baseline.json"
-        baseline_file.parent.mkdir(parents=True, exist_ok=True)
+        if not SecurityAnalyzer._baseline_dir_ready:
+            BASELINE_PATH.parent.mkdir(parents=True, exist_ok=True)
+            SecurityAnalyzer._baseline_dir_ready = True
+        
+        # Write to a sibling temp file and rename so readers never see a partial file
+        tmp_file = BASELINE_PATH.with_suffix(".json.tmp")
+        with open(tmp_file, 'wb') as f:
+            f.write(_json_dumps_bytes(self.baseline_metrics))
+        os.replace(tmp_file, BASELINE_PATH)
+    
+    def _stack_baseline(self):
+        """Stack baseline means/stds into arrays for vectorized z-scores"""
+        self._metric_names = [
+            name for name, stats in self.baseline_metrics.items()
+            if isinstance(stats, dict)
+        ]
+        means = [self.baseline_metrics[n].get("mean", 0) for n in self._metric_names]
+        stds = [self.baseline_metrics[n].get("std", 1) for n in self._metric_names]
+        
+        if HAS_NUMPY:
+            self._means = np.array(means, dtype=np.float64)
+            self._stds = np.array(stds, dtype=np.float64)
+        else:
+            self._means = means
+            self._stds = stds
         
-        with open(baseline_file, 'w') as f:
-            json.dump(self.baseline_metrics, f, indent=2)
+        try:
+            self._baseline_vector = tuple(
+                self.baseline_metrics[name]["mean"] for name in FEATURE_METRICS
+            )
+        except (KeyError, TypeError):
+            self._baseline_vector = None
     
     def analyze_anomalies(self, metrics_file):
         """Detect behavioral anomalies using statistical methods"""
         try:
-            with open(metrics_file, 'r') as f:
-                metrics = json.load(f)
+            with open(metrics_file, 'rb') as f:
+                metrics = _json_loads(f.read())
         except:
             return "ERROR"
         
-        anomalies = []
-        
-        # Check each metric against baseline
-        for metric_name, value in metrics.items():
-            if metric_name == "timestamp":
-                continue
-            
-            if metric_name in self.baseline_metrics:
-                baseline = self.baseline_metrics[metric_name]
-                mean = baseline.get("mean", 0)
-                std = baseline.get("std", 1)
-                
+        # Check every baseline metric in one pass; missing metrics score 0σ
+        if HAS_NUMPY:
+            vals = np.array(
+                [metrics.get(n, m) for n, m in zip(self._metric_names, self._means)],
+                dtype=np.float64
+            )
+            if HAS_NUMBA:
+                flagged, z_flagged = zscore_flags(
+                    vals, self._means, self._stds, self.anomaly_threshold
+                )
+            else:
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    z_scores = np.abs((vals - self._means) / self._stds)
+                flagged = np.nonzero((self._stds > 0) & (z_scores > self.anomaly_threshold))[0]
+                z_flagged = z_scores[flagged]
+            anomalies = [
+                f"{self._metric_names[i]} deviation: {z:.2f}σ"
+                for i, z in zip(flagged, z_flagged)
+            ]
+        else:
+            anomalies = []
+            for name, mean, std in zip(self._metric_names, self._means, self._stds):
                 if std > 0:
-                    z_score = abs((value - mean) / std)
-                    
+                    z_score = abs((metrics.get(name, mean) - mean) / std)
                     if z_score > self.anomaly_threshold:
-                        anomalies.append(f"{metric_name} deviation: {z_score:.2f}σ")
+                        anomalies.append(f"{name} deviation: {z_score:.2f}σ")
         
-        # Use Isolation Forest if available
-        if HAS_SKLEARN and len(anomalies) > 0:
+        # Distance from the baseline centroid (no per-call model fitting)
+        if len(anomalies) > 0:
             try:
-                # Prepare data
-                feature_vector = [
-                    metrics.get("process_count", 0),
-                    metrics.get("network_connections", 0),
-                    metrics.get("cpu_usage", 0),
-                    metrics.get("memory_usage", 0)
-                ]
-                
-                # Use lightweight Isolation Forest
-                clf = IsolationForest(contamination=0.1, random_state=42, n_estimators=50)
-                X = np.array([feature_vector])
-                
-                # Need historical data for training, use baseline for now
-                baseline_vector = [
-                    self.baseline_metrics["process_count"]["mean"],
-                    self.baseline_metrics["network_connections"]["mean"],
-                    self.baseline_metrics["cpu_usage"]["mean"],
-                    self.baseline_metrics["memory_usage"]["mean"]
-                ]
-                
-                # Simple comparison
-                if HAS_NUMPY:
-                    distance = np.linalg.norm(np.array(feature_vector) - np.array(baseline_vector))
+                # Plain 4-D Euclidean norm: cheaper than allocating arrays for np.linalg.norm
+                if self._baseline_vector is not None:
+                    distance = math.hypot(*(
+                        metrics.get(name, 0) - mean
+                        for name, mean in zip(FEATURE_METRICS, self._baseline_vector)
+                    ))
                     if distance > 50:  # Threshold
                         return f"ML anomaly detected: {', '.join(anomalies[:3])}"
             except Exception as e:
@@ -130,41 +250,27 @@ class SecurityAnalyzer:
     
     def pattern_recognition(self, process_file, network_file):
         """Recognize suspicious patterns"""
-        threats = []
+        threats = {}  # insertion-ordered set of distinct findings
         
         # Analyze processes
         if os.path.exists(process_file):
             try:
-                with open(process_file, 'r') as f:
-                    processes = f.readlines()
-                
-                suspicious_keywords = ["miner", "crypto", "bitcoin", "malware", "trojan"]
-                for line in processes:
-                    line_lower = line.lower()
-                    for keyword in suspicious_keywords:
-                        if keyword in line_lower:
-                            threats.append(f"Suspicious process pattern: {keyword}")
-                            break
+                for keyword in _scan_file(process_file, SUSPICIOUS_PROCESS_RE):
+                    threats.setdefault(f"Suspicious process pattern: {keyword}", None)
             except:
                 pass
         
         # Analyze network
-        if os.path.exists(network_file):
+        if os.path.exists(network_file) and len(threats) < MAX_UNIQUE_THREATS:
             try:
-                with open(network_file, 'r') as f:
-                    connections = f.readlines()
-                
-                suspicious_ports = [4444, 5555, 6666, 7777, 8888, 9999, 1337, 31337]
-                for line in connections:
-                    for port in suspicious_ports:
-                        if f":{port}" in line:
-                            threats.append(f"Suspicious network pattern: port {port}")
-                            break
+                remaining = MAX_UNIQUE_THREATS - len(threats)
+                for port in _scan_file(network_file, SUSPICIOUS_PORT_RE, remaining):
+                    threats.setdefault(f"Suspicious network pattern: port {port}", None)
             except:
                 pass
         
         if threats:
-            return "; ".join(threats[:3])
+            return "; ".join(list(threats)[:3])
         
         return ""
     
@@ -182,27 +288,17 @@ class SecurityAnalyzer:
             return "Insufficient data for prediction"
         
         # Simple trend analysis
-        process_counts = []
-        network_counts = []
+        # Files are independent and IO-bound: overlap the reads (map keeps order)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = [r for r in executor.map(_load_counts, metrics_files) if r is not None]
         
-        for mfile in metrics_files:
-            try:
-                with open(mfile, 'r') as f:
-                    data = json.load(f)
-                    process_counts.append(data.get("process_count", 0))
-                    network_counts.append(data.get("network_connections", 0))
-            except:
-                continue
+        process_counts = [r[0] for r in results]
+        network_counts = [r[1] for r in results]
         
         if len(process_counts) >= 3:
             # Calculate trend
-            if HAS_NUMPY:
-                process_trend = np.polyfit(range(len(process_counts)), process_counts, 1)[0]
-                network_trend = np.polyfit(range(len(network_counts)), network_counts, 1)[0]
-            else:
-                # Simple linear trend
-                process_trend = (process_counts[-1] - process_counts[0]) / len(process_counts)
-                network_trend = (network_counts[-1] - network_counts[0]) / len(network_counts)
+            process_trend = _slope(process_counts)
+            network_trend = _slope(network_counts)
             
             predictions = []
             
@@ -219,18 +315,18 @@ class SecurityAnalyzer:
     def classify_files(self, file_data):
         """Classify files by type and risk"""
         try:
-            with open(file_data, 'r') as f:
-                files = json.load(f)
+            with open(file_data, 'rb') as f:
+                files = _json_loads(f.read())
         except:
             return "ERROR"
         
-        risk_extensions = {".exe", ".bat", ".scr", ".vbs", ".ps1", ".sh"}
-        suspicious_count = 0
+        exts = [file_info.get("ext", "").lower() for file_info in files]
         
-        for file_info in files:
-            ext = file_info.get("ext", "").lower()
-            if ext in risk_extensions:
-                suspicious_count += 1
+        if HAS_NUMPY and len(exts) >= BULK_CLASSIFY_THRESHOLD:
+            # One C-level membership scan for large inventories
+            suspicious_count = int(np.isin(np.array(exts), RISK_EXTENSIONS_LIST).sum())
+        else:
+            suspicious_count = sum(1 for ext in exts if ext in RISK_EXTENSIONS)
         
         if suspicious_count > 0:
             return f"Found {suspicious_count} potentially risky file(s)"
@@ -269,6 +365,20 @@ def main():
         parser.print_help()
 
 
+def _native_main():
+    """Return main() from a mypyc build of this module (see build_native.sh), if present"""
+    here = Path(__file__).resolve().parent
+    if not any((here / f"ai_engine{suffix}").exists()
+               for suffix in importlib.machinery.EXTENSION_SUFFIXES):
+        return None
+    try:
+        # Extension modules take precedence over ai_engine.py on import
+        import ai_engine as native
+    except ImportError:
+        return None
+    return native.main if native.__file__ != __file__ else None
+
+
 if __name__ == "__main__":
-    main()
+    (_native_main() or main)()
 
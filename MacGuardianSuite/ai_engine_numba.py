@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+"""
+Mac Guardian AI Engine - Numba kernels
+JIT-compiled inner loops used by ai_engine when numba is installed
+"""
+
+import numpy as np
+from numba import njit
+
+
+@njit(cache=True, fastmath=True)
+def zscore_flags(vals, means, stds, threshold):
+    """Return (indices, z-scores) of metrics whose |z| exceeds threshold"""
+    idx = np.empty(vals.size, dtype=np.int64)
+    z_out = np.empty(vals.size, dtype=np.float64)
+    n = 0
+    for i in range(vals.size):
+        if stds[i] > 0:
+            z = abs((vals[i] - means[i]) / stds[i])
+            if z > threshold:
+                idx[n] = i
+                z_out[n] = z
+                n += 1
+    return idx[:n], z_out[:n]
@@ -0,0 +1,40 @@
+#!/bin/bash
+
+# ===============================
+# Mac Guardian Native Build
+# AOT-compiles the AI engine and STIX exporter with mypyc
+# ===============================
+
+set -euo pipefail
+
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+source "$SCRIPT_DIR/utils.sh"
+
+# Modules compiled in place; the .py files stay as the fallback
+NATIVE_MODULES=("ai_engine.py" "stix_exporter.py")
+
+if ! command -v mypyc &> /dev/null; then
+    error_exit "mypyc not found. Install with: pip3 install mypy"
+fi
+
+cd "$SCRIPT_DIR"
+
+if [ "${1:-}" = "--clean" ]; then
+    for module in "${NATIVE_MODULES[@]}"; do
+        rm -f "${module%.py}".*.so
+    done
+    rm -f ./*__mypyc*.so
+    rm -rf build .mypy_cache
+    success "Removed native builds"
+    exit 0
+fi
+
+info "Compiling ${NATIVE_MODULES[*]} with mypyc..."
+# Optional deps (numpy, sklearn, numba, orjson) may be absent at build time
+if mypyc --ignore-missing-imports "${NATIVE_MODULES[@]}"; then
+    rm -rf build
+    success "Native build complete (remove with: $0 --clean)"
+else
+    warning "mypyc build failed; the pure-Python modules will be used"
+    exit 1
+fi
@@ -6,26 +6,23 @@ Collects DNS query information
 """
 
 import json
+import re
 import sys
 import subprocess
 from datetime import datetime
 from typing import List, Dict, Any
 
+NAMESERVER_RE = re.compile(rb'^nameserver\s+(\S+)', re.MULTILINE)
+
 def get_dns_servers() -> List[str]:
     """Get DNS servers from /etc/resolv.conf"""
-    dns_servers = []
-    
     try:
-        with open('/etc/resolv.conf', 'r') as f:
-            for line in f:
-                if line.startswith('nameserver'):
-                    parts = line.split()
-                    if len(parts) > 1:
-                        dns_servers.append(parts[1])
+        with open('/etc/resolv.conf', 'rb') as f:
+            buf = f.read()
     except IOError:
-        pass
+        return []
     
-    return dns_servers
+    return [ip.decode() for ip in NAMESERVER_RE.findall(buf)]
 
 def get_dns_cache() -> List[Dict[str, Any]]:
     """Get DNS cache entries (if accessible)"""
@@ -4,8 +4,13 @@ FSEvents Collector - Event-driven file system monitoring
 Uses macOS FSEvents API for efficient file change detection
 """
 
+import asyncio
 import subprocess
 import json
+import os
+import queue
+import re
+import stat
 import threading
 from datetime import datetime
 from pathlib import Path
@@ -18,6 +23,47 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from event_bus import get_event_bus
 
 
+# fswatch event flag -> normalized event type
+EVENT_MAP = {
+    "Created": "file.create",
+    "Updated": "file.modify",
+    "Removed": "file.delete",
+    "Renamed": "file.rename"
+}
+
+
+# Max fswatch record size and event dispatch sizing; records are sharded
+# across workers by path hash so events for one path are emitted in order
+READ_LIMIT = 65536
+DISPATCH_QUEUE_SIZE = 10000  # Total across all worker queues
+DISPATCH_WORKERS = 2
+
+# Cached file types (cleared when full); only "Updated" events read the
+# cache, since any other event may mean the path now has a different type
+PATH_TYPE_CACHE_SIZE = 8192
+_PATH_TYPES: Dict[str, str] = {}
+
+
+def _classify_path(path: str) -> str:
+    """Classify a path like Path.is_dir()/is_file()/is_symlink(): links are
+    followed, so only a link to neither a file nor a directory (e.g. a
+    dangling one) is "symlink"; one stat for the common cases"""
+    try:
+        mode = os.stat(path).st_mode
+        if stat.S_ISDIR(mode):
+            return "directory"
+        if stat.S_ISREG(mode):
+            return "file"
+    except OSError:
+        pass
+    try:
+        if stat.S_ISLNK(os.lstat(path).st_mode):
+            return "symlink"
+    except OSError:
+        pass
+    return "unknown"
+
+
 class FSEventsCollector:
     """
     Collects file system events using macOS FSEvents.
@@ -29,9 +75,16 @@ class FSEventsCollector:
         self.enabled = self.config.get("enabled", True)
         self.paths = self.config.get("paths", ["/Users", "/Applications"])
         self.exclude_patterns = self.config.get("exclude", [".git", "node_modules", ".DS_Store"])
+        self._exclude_re = self._compile_excludes(self.exclude_patterns)
         self.running = False
         self.process = None
         self.thread = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.workers: List[threading.Thread] = []
+        self.dispatch_queues: List[queue.Queue] = [
+            queue.Queue(maxsize=DISPATCH_QUEUE_SIZE // DISPATCH_WORKERS)
+            for _ in range(DISPATCH_WORKERS)
+        ]
         self.event_bus = get_event_bus()
         
     def initialize(self, config: Dict):
@@ -40,6 +93,7 @@ class FSEventsCollector:
         self.enabled = config.get("enabled", True)
         self.paths = config.get("paths", ["/Users", "/Applications"])
         self.exclude_patterns = config.get("exclude", [".git", "node_modules"])
+        self._exclude_re = self._compile_excludes(self.exclude_patterns)
         
     def start(self):
         """Start collecting FSEvents"""
@@ -53,6 +107,14 @@ class FSEventsCollector:
         
         self.running = True
         
+        # Start dispatch workers (parse/emit off the reader thread), one per queue
+        self.workers = [
+            threading.Thread(target=self._dispatch_worker, args=(dispatch_queue,), daemon=True)
+            for dispatch_queue in self.dispatch_queues
+        ]
+        for worker in self.workers:
+            worker.start()
+        
         # Start monitoring thread
         self.thread = threading.Thread(target=self._monitor, daemon=True)
         self.thread.start()
@@ -62,8 +124,11 @@ class FSEventsCollector:
     def stop(self):
         """Stop collecting events"""
         self.running = False
-        if self.process:
-            self.process.terminate()
+        if self.process and self._loop and not self._loop.is_closed():
+            # Terminating fswatch EOFs its stdout and ends the reader task
+            self._loop.call_soon_threadsafe(self._terminate_process)
+        for dispatch_queue in self.dispatch_queues:
+            dispatch_queue.put(None)
         print("✅ FSEvents collector stopped")
     
     def get_status(self) -> Dict:
@@ -86,58 +151,87 @@ class FSEventsCollector:
             self._fallback_monitor()
             return
         
-        # Build fswatch command
-        cmd = ["fswatch", "-r", "-x", "--event", "Created,Updated,Removed,Renamed"]
-        cmd.extend(self.paths)
-        
+        # One event loop drives the fswatch reader for this collector
+        self._loop = asyncio.new_event_loop()
         try:
-            self.process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                bufsize=1
-            )
-            
-            for line in self.process.stdout:
-                if not self.running:
-                    break
-                
-                line = line.strip()
-                if not line:
-                    continue
-                
-                # Parse fswatch output
-                # Format: <path> <event_type>
-                parts = line.split()
-                if len(parts) >= 2:
-                    path = parts[0]
-                    event_type = parts[1]
-                    
-                    # Check if path should be excluded
-                    if any(pattern in path for pattern in self.exclude_patterns):
-                        continue
-                    
-                    # Emit event
-                    self._emit_event(path, event_type)
-                    
+            self._loop.run_until_complete(self._monitor_async())
         except Exception as e:
             print(f"❌ FSEvents collector error: {e}")
         finally:
-            if self.process:
+            self._terminate_process()
+            self._loop.close()
+    
+    async def _monitor_async(self):
+        """Read NUL-delimited fswatch records from an asyncio subprocess"""
+        # Build fswatch command (-0: NUL-delimited records)
+        cmd = ["fswatch", "-0", "-r", "-x", "--event", "Created,Updated,Removed,Renamed"]
+        cmd.extend(self.paths)
+        
+        self.process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            limit=READ_LIMIT
+        )
+        loop = asyncio.get_running_loop()
+        
+        while self.running:
+            try:
+                record = await self.process.stdout.readuntil(b"\0")
+            except asyncio.IncompleteReadError:
+                break  # fswatch exited
+            
+            # Parse fswatch output
+            # Format: <path> <event_type> [<event_type> ...]
+            parts = record[:-1].decode("utf-8", errors="replace").split()
+            if len(parts) < 2:
+                continue
+            
+            path = parts[0]
+            event_type = parts[1]
+            
+            # Check if path should be excluded
+            if self._exclude_re and self._exclude_re.search(path):
+                continue
+            
+            # Hand off to the path's dispatch worker; wait off-loop when saturated
+            item = (path, event_type)
+            dispatch_queue = self.dispatch_queues[hash(path) % DISPATCH_WORKERS]
+            try:
+                dispatch_queue.put_nowait(item)
+            except queue.Full:
+                await loop.run_in_executor(None, dispatch_queue.put, item)
+    
+    def _terminate_process(self):
+        """Terminate fswatch if it is still running"""
+        if self.process and self.process.returncode is None:
+            try:
                 self.process.terminate()
+            except ProcessLookupError:
+                pass
+    
+    @staticmethod
+    def _compile_excludes(patterns: List[str]) -> Optional[re.Pattern]:
+        """Compile substring excludes into one alternation (single C-level scan per path)"""
+        if not patterns:
+            return None
+        return re.compile("|".join(re.escape(p) for p in patterns))
+    
+    def _dispatch_worker(self, dispatch_queue: queue.Queue):
+        """Emit (path, event_type) records from one shard until a None sentinel arrives"""
+        while True:
+            item = dispatch_queue.get()
+            if item is None:
+                break
+            try:
+                self._emit_event(*item)
+            except Exception as e:
+                print(f"❌ FSEvents dispatch error: {e}")
     
     def _emit_event(self, path: str, event_type: str):
         """Emit a file system event"""
         # Map fswatch events to our event types
-        event_map = {
-            "Created": "file.create",
-            "Updated": "file.modify",
-            "Removed": "file.delete",
-            "Renamed": "file.rename"
-        }
-        
-        event_type_normalized = event_map.get(event_type, "file.change")
+        event_type_normalized = EVENT_MAP.get(event_type, "file.change")
         
         event = {
             "timestamp": datetime.utcnow().isoformat() + "Z",
@@ -146,7 +240,7 @@ class FSEventsCollector:
             "data": {
                 "path": path,
                 "event": event_type,
-                "file_type": self._get_file_type(path)
+                "file_type": self._get_file_type(path, event_type)
             },
             "metadata": {
                 "severity": "info",
@@ -156,17 +250,22 @@ class FSEventsCollector:
         
         self.event_bus.emit(event)
     
-    def _get_file_type(self, path: str) -> str:
-        """Determine file type"""
-        p = Path(path)
-        if p.is_dir():
-            return "directory"
-        elif p.is_file():
-            return "file"
-        elif p.is_symlink():
-            return "symlink"
+    def _get_file_type(self, path: str, event_type: Optional[str] = None) -> str:
+        """Determine file type, reusing the cached type for repeated updates"""
+        if event_type == "Updated":
+            file_type = _PATH_TYPES.get(path)
+            if file_type is not None:
+                return file_type
+        
+        file_type = _classify_path(path)
+        if event_type in ("Removed", "Renamed"):
+            # Gone or moved: whatever appears at this path next is re-checked
+            _PATH_TYPES.pop(path, None)
         else:
-            return "unknown"
+            if len(_PATH_TYPES) >= PATH_TYPE_CACHE_SIZE:
+                _PATH_TYPES.clear()
+            _PATH_TYPES[path] = file_type
+        return file_type
     
     def _fallback_monitor(self):
         """Fallback to polling-based monitoring"""
@@ -6,8 +6,11 @@ Collects security events, system events, and application logs
 
 import subprocess
 import json
+import os
+import select
 import threading
 from datetime import datetime
+from functools import lru_cache
 from typing import Dict, Optional
 import sys
 from pathlib import Path
@@ -16,6 +19,39 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from event_bus import get_event_bus
 
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# Raw stdout read size for the log stream pipe
+READ_CHUNK_SIZE = 65536
+
+# Idle poll interval; self.running is only checked when the pipe is quiet
+POLL_TIMEOUT = 0.5
+
+# Unified log eventType -> MacGuardian severity
+_SEVERITY_MAP = {
+    "Default": "info",
+    "Info": "info",
+    "Debug": "debug",
+    "Error": "error",
+    "Fault": "critical"
+}
+
+
+@lru_cache(maxsize=1024)
+def _event_type_for(subsystem: str, category: str) -> str:
+    """Interned event type per (subsystem, category)"""
+    return f"log.{subsystem}.{category}"
+
+
+@lru_cache(maxsize=1024)
+def _tags_for(subsystem: str, category: str) -> tuple:
+    """Shared immutable tag tuple per (subsystem, category)"""
+    return ("log", subsystem, category)
+
 
 class UnifiedLoggingCollector:
     """
@@ -74,7 +110,9 @@ class UnifiedLoggingCollector:
     def _monitor(self):
         """Monitor unified logs using log stream"""
         # Build log stream command
-        cmd = ["log", "stream", "--style", "json", "--predicate"]
+        # ndjson: exactly one JSON object per line (--style json emits a
+        # pretty-printed array that cannot be parsed line by line)
+        cmd = ["log", "stream", "--style", "ndjson", "--predicate"]
         
         # Combine predicates with OR
         predicate = " OR ".join(self.predicates)
@@ -85,24 +123,44 @@ class UnifiedLoggingCollector:
                 cmd,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
-                text=True,
-                bufsize=1
+                bufsize=READ_CHUNK_SIZE
             )
             
-            for line in self.process.stdout:
-                if not self.running:
-                    break
-                
-                line = line.strip()
-                if not line:
+            # Read in large chunks and split lines ourselves: one read per
+            # chunk instead of one readline() per log entry. stop() terminates
+            # the process, which ends the stream with EOF; running is polled
+            # only on select timeouts
+            fd = self.process.stdout.fileno()
+            os.set_blocking(fd, False)
+            pending = b""
+            
+            while True:
+                ready, _, _ = select.select([fd], [], [], POLL_TIMEOUT)
+                if not ready:
+                    if not self.running:
+                        break
                     continue
                 
                 try:
-                    # Parse JSON log entry
-                    log_entry = json.loads(line)
-                    self._emit_event(log_entry)
-                except json.JSONDecodeError:
+                    chunk = os.read(fd, READ_CHUNK_SIZE)
+                except BlockingIOError:
                     continue
+                if not chunk:
+                    break  # log stream exited
+                
+                lines = (pending + chunk).split(b"\n")
+                pending = lines.pop()
+                
+                for line in lines:
+                    if not line.strip():
+                        continue
+                    
+                    try:
+                        # Parse JSON log entry (bytes in, no text decode step)
+                        log_entry = _json_loads(line)
+                    except ValueError:
+                        continue
+                    self._emit_event(log_entry)
                     
         except Exception as e:
             print(f"❌ Unified Logging collector error: {e}")
@@ -119,18 +177,11 @@ class UnifiedLoggingCollector:
         message = log_entry.get("eventMessage", "")
         
         # Determine severity
-        severity_map = {
-            "Default": "info",
-            "Info": "info",
-            "Debug": "debug",
-            "Error": "error",
-            "Fault": "critical"
-        }
-        severity = severity_map.get(log_entry.get("eventType", "Default"), "info")
+        severity = _SEVERITY_MAP.get(log_entry.get("eventType", "Default"), "info")
         
         event = {
             "timestamp": log_entry.get("timestamp", datetime.utcnow().isoformat() + "Z"),
-            "event_type": f"log.{subsystem}.{category}",
+            "event_type": _event_type_for(subsystem, category),
             "source": "unified_logging",
             "data": {
                 "subsystem": subsystem,
@@ -141,11 +192,12 @@ class UnifiedLoggingCollector:
             },
             "metadata": {
                 "severity": severity,
-                "tags": ["log", subsystem, category]
+                "tags": _tags_for(subsystem, category)
             }
         }
         
-        self.event_bus.emit(event)
+        # Already in the bus schema; skip re-normalization
+        self.event_bus.emit_normalized(event)
 
 
 if __name__ == "__main__":
@@ -5,13 +5,21 @@ import sys
 import re
 from pathlib import Path
 
+# Static patterns, compiled once at import
+_STYLE_TAG = re.compile(r'<style>(.*?)</style>', re.DOTALL)
+_CSS_CLASS_RULE = re.compile(r'\.?([\w-]+)\s*\{([^}]+)\}')
+_ELEM_RULE = re.compile(r'([a-z]+)\s*\{([^}]+)\}')
+_BODY_TAG = re.compile(r'<body([^>]*)>')
+_CLASS_TAG = re.compile(r'<[a-zA-Z][^>]*?(?<![\w-])class=["\']([^"\']+)["\'][^>]*>')
+_STYLE_ATTR = re.compile(r'(?<![\w-])style=(["\'])(.*?)\1', re.DOTALL)
+
 def convert_to_email_html(html_file: str) -> str:
     """Convert HTML with <style> tags to inline styles for email compatibility."""
     
     html_content = Path(html_file).read_text()
     
     # Extract styles from <style> tag
-    style_match = re.search(r'<style>(.*?)</style>', html_content, re.DOTALL)
+    style_match = _STYLE_TAG.search(html_content)
     if not style_match:
         return html_content
     
@@ -19,13 +27,16 @@ def convert_to_email_html(html_file: str) -> str:
     
     # Parse CSS rules (simple parser)
     css_rules = {}
-    for rule in re.finditer(r'\.?([\w-]+)\s*\{([^}]+)\}', styles):
+    styles_by_class = {}
+    for rule in _CSS_CLASS_RULE.finditer(styles):
         selector = rule.group(1).strip()
         properties = rule.group(2).strip()
         css_rules[selector] = properties
+        if rule.group(0).startswith('.'):
+            styles_by_class[selector] = properties
     
     # Also handle element selectors
-    for rule in re.finditer(r'([a-z]+)\s*\{([^}]+)\}', styles):
+    for rule in _ELEM_RULE.finditer(styles):
         selector = rule.group(1).strip()
         properties = rule.group(2).strip()
         css_rules[selector] = properties
@@ -34,33 +45,36 @@ def convert_to_email_html(html_file: str) -> str:
     result = html_content
     
     # Remove the <style> tag
-    result = re.sub(r'<style>.*?</style>', '', result, flags=re.DOTALL)
+    result = _STYLE_TAG.sub('', result)
     
     # Apply styles to body
     if 'body' in css_rules:
         body_style = css_rules['body']
-        result = re.sub(r'<body([^>]*)>', f'<body\\1 style="{body_style}">', result)
+        result = _BODY_TAG.sub(f'<body\\1 style="{body_style}">', result)
     
-    # Apply styles to elements with classes
-    for selector, properties in css_rules.items():
-        if selector.startswith('.'):
-            class_name = selector[1:]  # Remove the dot
-            # Find elements with this class and add inline styles
-            pattern = f'class=["\']([^"\']*\\b{class_name}\\b[^"\']*)["\']'
-            def add_style(match):
-                existing_class = match.group(1)
-                # Check if style already exists
-                tag_match = re.search(r'<([^>]+class=["\']' + re.escape(existing_class) + r'["\'][^>]*)>', result)
-                if tag_match:
-                    tag_content = tag_match.group(1)
-                    if 'style=' in tag_content:
-                        # Append to existing style
-                        return tag_content.replace('style="', f'style="{properties}; ')
-                    else:
-                        # Add new style attribute
-                        return tag_content + f' style="{properties}"'
-                return match.group(0)
-            result = re.sub(pattern, add_style, result)
+    # Apply styles to elements with classes in a single pass over the
+    # document, one whole start tag at a time
+    if styles_by_class:
+        def add_style(match):
+            properties = '; '.join(
+                styles_by_class[name].rstrip('; ') for name in match.group(1).split()
+                if name in styles_by_class
+            )
+            tag = match.group(0)
+            if not properties:
+                return tag
+            style = _STYLE_ATTR.search(tag)
+            if style:
+                # Merge into the existing style attribute, wherever it is;
+                # its own declarations come last and so still win
+                quote = style.group(1)
+                merged = f'style={quote}{properties}; {style.group(2)}{quote}'
+                return tag[:style.start()] + merged + tag[style.end():]
+            # Add new style attribute
+            end = -2 if tag.endswith('/>') else -1
+            return f'{tag[:end].rstrip()} style="{properties}"{tag[end:]}'
+        
+        result = _CLASS_TAG.sub(add_style, result)
     
     # For better email compatibility, wrap in a table-based layout
     # Many email clients work better with tables
@@ -5,6 +5,11 @@ import sys
 import re
 from pathlib import Path
 
+# Static patterns, compiled once at import
+_BODY_MATCH = re.compile(r'<body[^>]*>(.*?)</body>', re.DOTALL)
+_SCRIPT_TAG = re.compile(r'<script[^>]*>.*?</script>', re.DOTALL | re.IGNORECASE)
+_STYLE_MATCH = re.compile(r'<style[^>]*>(.*?)</style>', re.DOTALL)
+
 def create_email_html(html_file: str) -> str:
     """Create email-compatible HTML with inline styles."""
     
@@ -14,17 +19,17 @@ def create_email_html(html_file: str) -> str:
     # Email clients often have issues with large base64 images
     
     # Extract body content
-    body_match = re.search(r'<body[^>]*>(.*?)</body>', html_content, re.DOTALL)
+    body_match = _BODY_MATCH.search(html_content)
     if not body_match:
         return html_content
     
     body_content = body_match.group(1)
     
     # Remove script tags
-    body_content = re.sub(r'<script[^>]*>.*?</script>', '', body_content, flags=re.DOTALL | re.IGNORECASE)
+    body_content = _SCRIPT_TAG.sub('', body_content)
     
     # Extract style content and convert to inline styles where possible
-    style_match = re.search(r'<style[^>]*>(.*?)</style>', html_content, re.DOTALL)
+    style_match = _STYLE_MATCH.search(html_content)
     styles = style_match.group(1) if style_match else ""
     
     # Create email-compatible HTML wrapper
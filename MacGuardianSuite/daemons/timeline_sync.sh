@@ -24,7 +24,7 @@ else
         echo "[" > "$temp_timeline"
         local first=true
         
-        find "$EVENT_DIR" -name "event_*.json" -type f -exec cat {} \; 2>/dev/null | while IFS= read -r line; do
+        find "$EVENT_DIR" \( -name "event_*.json" -o -name "events-*.jsonl" \) -type f -exec cat {} \; 2>/dev/null | while IFS= read -r line; do
             if [ -n "$line" ]; then
                 if [ "$first" = true ]; then
                     first=false
@@ -106,6 +106,7 @@ def main():
     fsevents.stop()
     unified.stop()
     bus.stop()
+    local_output.close()
     
     print()
     print("✅ Demo complete!")
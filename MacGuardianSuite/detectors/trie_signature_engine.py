@@ -5,14 +5,56 @@ O(m) matching instead of O(n*m) for traditional string matching
 """
 
 import json
+import mmap
 import os
 import sys
-from typing import Dict, List, Optional, Set
+from typing import Dict, List, Optional, Set, Union
+
+try:
+    import hyperscan
+    HAS_HYPERSCAN = True
+except ImportError:
+    HAS_HYPERSCAN = False
+
+try:
+    import ahocorasick
+    HAS_AHOCORASICK = True
+except ImportError:
+    HAS_AHOCORASICK = False
+
+try:
+    import numpy as np
+    from trie_signature_numba import trie_scan
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+# Child slots per trie node: ASCII bytes index directly; a node grows to the
+# full byte range only if a signature puts a non-ASCII byte below it
+ASCII_FANOUT = 128
+BYTE_FANOUT = 256
+
+# Window size for scanning mmapped files (peak memory ~2x this, not 2x file size)
+SCAN_CHUNK_SIZE = 1 << 20
+
+def _to_bytes(text: Union[str, bytes]) -> bytes:
+    """Signatures and scan targets are matched as raw UTF-8 bytes"""
+    return text.encode('utf-8') if isinstance(text, str) else text
+
+def _hs_literal(data: bytes) -> bytes:
+    """Hyperscan takes regex source; hex-escape every byte to match it literally"""
+    return b''.join(b'\\x%02x' % byte for byte in data)
+
+def _ac_key(data: bytes):
+    """pyahocorasick's default (unicode) build needs str; latin-1 maps bytes 1:1"""
+    return data.decode('latin-1') if ahocorasick.unicode else data
 
 class TrieNode:
     """Node in the trie structure"""
+    __slots__ = ('children', 'is_end', 'signature_id', 'metadata')
+    
     def __init__(self):
-        self.children: Dict[str, 'TrieNode'] = {}
+        self.children: List[Optional['TrieNode']] = [None] * ASCII_FANOUT
         self.is_end: bool = False
         self.signature_id: Optional[str] = None
         self.metadata: Optional[Dict] = None
@@ -23,67 +65,252 @@ class SignatureTrie:
     def __init__(self):
         self.root = TrieNode()
         self.signature_count = 0
+        self.max_pattern_length = 0
+        # Hyperscan DFA database (SIMD, caseless) when available; takes
+        # precedence over every other backend
+        self._hs_nodes: Dict[bytes, TrieNode] = {}
+        self._hs_entries: List[tuple] = []
+        self._hs_db = None
+        # C-level Aho-Corasick automaton (single O(n) scan) when available;
+        # the Python trie is kept for prefix_match and as the fallback
+        self._ac = ahocorasick.Automaton() if HAS_AHOCORASICK else None
+        self._ac_ready = False
+        # Flattened goto/accept tables for the Numba walk, rebuilt lazily
+        self._goto = None
+        self._accept = None
+        self._accept_nodes: List[TrieNode] = []
     
     def insert(self, pattern: str, signature_id: str, metadata: Optional[Dict] = None):
         """Insert a signature pattern into the trie (O(m) where m = pattern length)"""
         node = self.root
+        key = _to_bytes(pattern).lower()
         
-        for char in pattern.lower():
-            if char not in node.children:
-                node.children[char] = TrieNode()
-            node = node.children[char]
+        for byte in key:
+            children = node.children
+            if byte >= len(children):
+                children.extend([None] * (BYTE_FANOUT - len(children)))
+            child = children[byte]
+            if child is None:
+                child = children[byte] = TrieNode()
+            node = child
         
         node.is_end = True
         node.signature_id = signature_id
         node.metadata = metadata or {}
         self.signature_count += 1
+        self.max_pattern_length = max(self.max_pattern_length, len(key))
+        
+        if HAS_HYPERSCAN and key:
+            self._hs_nodes[key] = node
+            self._hs_db = None
+        
+        if self._ac is not None:
+            self._ac.add_word(_ac_key(key), (signature_id, node.metadata, len(key)))
+            self._ac_ready = False
+        self._goto = None
+    
+    def finalize(self):
+        """Compile the Hyperscan database / build Aho-Corasick failure links
+        after all signatures are inserted"""
+        if HAS_HYPERSCAN and self._hs_db is None and self._hs_nodes:
+            keys = list(self._hs_nodes)
+            db = hyperscan.Database(mode=hyperscan.HS_MODE_BLOCK)
+            db.compile(
+                expressions=[_hs_literal(key) for key in keys],
+                ids=list(range(len(keys))),
+                elements=len(keys),
+                flags=[hyperscan.HS_FLAG_CASELESS] * len(keys)
+            )
+            self._hs_entries = [(len(key), self._hs_nodes[key]) for key in keys]
+            self._hs_db = db
+        
+        if self._ac is not None and not self._ac_ready and len(self._ac):
+            self._ac.make_automaton()
+            self._ac_ready = True
     
-    def search(self, text: str) -> List[Dict]:
-        """Search for all matching signatures in text (O(m) per match)"""
+    def search(self, text: Union[str, bytes]) -> List[Dict]:
+        """Search for all matching signatures in text (O(m) per match)
+        
+        Matching is ASCII case-insensitive over UTF-8 bytes; positions and
+        lengths are byte offsets.
+        """
+        data = _to_bytes(text)
+        
+        if self._hs_nodes:
+            self.finalize()
+            return self._search_hyperscan(data)
+        
+        data_lower = data.lower()
+        
+        if self._ac is not None:
+            self.finalize()
+            if self._ac_ready:
+                return self._search_automaton(data, data_lower)
+        
+        if HAS_NUMBA:
+            return self._search_compiled(data, data_lower)
+        
         matches = []
-        text_lower = text.lower()
+        root = self.root
+        n = len(data_lower)
         
-        for i in range(len(text_lower)):
-            node = self.root
-            for j in range(i, len(text_lower)):
-                char = text_lower[j]
-                if char not in node.children:
+        for i in range(n):
+            node = root
+            for j in range(i, n):
+                try:
+                    node = node.children[data_lower[j]]
+                except IndexError:
+                    break  # non-ASCII byte under an ASCII-only node
+                if node is None:
                     break
                 
-                node = node.children[char]
                 if node.is_end:
                     matches.append({
                         'signature_id': node.signature_id,
                         'position': i,
                         'length': j - i + 1,
-                        'matched_text': text[i:j+1],
+                        'matched_text': data[i:j+1].decode('utf-8', errors='replace'),
                         'metadata': node.metadata
                     })
         
         return matches
     
+    def search_buffer(self, buf, chunk_size: int = SCAN_CHUNK_SIZE) -> List[Dict]:
+        """Search a bytes-like buffer (e.g. an mmap) in overlapping windows
+        
+        Each window is extended by max_pattern_length - 1 bytes so matches
+        spanning a boundary are found; only matches starting inside the
+        window proper are kept, so nothing is reported twice.
+        """
+        size = len(buf)
+        if size <= chunk_size:
+            return self.search(bytes(buf))
+        
+        overlap = max(self.max_pattern_length - 1, 0)
+        matches = []
+        
+        for offset in range(0, size, chunk_size):
+            window = buf[offset:offset + chunk_size + overlap]
+            for match in self.search(window):
+                if match['position'] < chunk_size:
+                    match['position'] += offset
+                    matches.append(match)
+        
+        return matches
+    
+    def _search_hyperscan(self, data: bytes) -> List[Dict]:
+        """Hyperscan block scan; same matches and ordering as the trie walk"""
+        matches = []
+        entries = self._hs_entries
+        
+        def on_match(index, _start, end, _flags, _context):
+            # Start-of-match is not tracked (cheaper); the length is known
+            length, node = entries[index]
+            start = end - length
+            matches.append({
+                'signature_id': node.signature_id,
+                'position': start,
+                'length': length,
+                'matched_text': data[start:end].decode('utf-8', errors='replace'),
+                'metadata': node.metadata
+            })
+        
+        self._hs_db.scan(data, match_event_handler=on_match)
+        
+        matches.sort(key=lambda m: (m['position'], m['length']))
+        return matches
+    
+    def _search_automaton(self, data: bytes, data_lower: bytes) -> List[Dict]:
+        """Aho-Corasick scan; same matches and ordering as the trie walk"""
+        matches = []
+        
+        for end, (signature_id, metadata, length) in self._ac.iter(_ac_key(data_lower)):
+            start = end - length + 1
+            matches.append({
+                'signature_id': signature_id,
+                'position': start,
+                'length': length,
+                'matched_text': data[start:end+1].decode('utf-8', errors='replace'),
+                'metadata': metadata
+            })
+        
+        matches.sort(key=lambda m: (m['position'], m['length']))
+        return matches
+    
+    def _compile(self):
+        """Flatten the trie into goto/accept arrays (node ids in BFS order)
+        
+        The goto table is ASCII_FANOUT columns wide (half the memory) unless
+        some signature contains a non-ASCII byte; with a narrow table a
+        non-ASCII input byte simply ends the walk, since no edge uses it.
+        """
+        nodes = [self.root]
+        for node in nodes:
+            nodes.extend(child for child in node.children if child is not None)
+        ids = {id(node): i for i, node in enumerate(nodes)}
+        fanout = max(len(node.children) for node in nodes)
+        
+        goto = np.full((len(nodes), fanout), -1, dtype=np.int32)
+        accept = np.full(len(nodes), -1, dtype=np.int32)
+        accept_nodes = []
+        
+        for i, node in enumerate(nodes):
+            for byte, child in enumerate(node.children):
+                if child is not None:
+                    goto[i, byte] = ids[id(child)]
+            if node.is_end:
+                accept[i] = len(accept_nodes)
+                accept_nodes.append(node)
+        
+        self._goto = goto
+        self._accept = accept
+        self._accept_nodes = accept_nodes
+    
+    def _search_compiled(self, data: bytes, data_lower: bytes) -> List[Dict]:
+        """Numba trie walk; same matches and ordering as the Python walk"""
+        if self._goto is None:
+            self._compile()
+        
+        positions, lengths, sig_ids = trie_scan(
+            self._goto, self._accept, np.frombuffer(data_lower, dtype=np.uint8))
+        
+        matches = []
+        for start, length, sig in zip(positions.tolist(), lengths.tolist(), sig_ids.tolist()):
+            node = self._accept_nodes[sig]
+            matches.append({
+                'signature_id': node.signature_id,
+                'position': start,
+                'length': length,
+                'matched_text': data[start:start+length].decode('utf-8', errors='replace'),
+                'metadata': node.metadata
+            })
+        
+        return matches
+    
     def prefix_match(self, prefix: str) -> List[str]:
         """Find all signatures with given prefix (O(m + k) where k = matches)"""
         node = self.root
         results = []
         
         # Navigate to prefix node
-        for char in prefix.lower():
-            if char not in node.children:
+        key = _to_bytes(prefix).lower()
+        for byte in key:
+            if byte >= len(node.children) or node.children[byte] is None:
                 return results
-            node = node.children[char]
+            node = node.children[byte]
         
         # Collect all signatures from this node
-        self._collect_signatures(node, prefix, results)
+        self._collect_signatures(node, results)
         return results
     
-    def _collect_signatures(self, node: TrieNode, prefix: str, results: List[str]):
+    def _collect_signatures(self, node: TrieNode, results: List[str]):
         """Recursively collect all signatures from a node"""
         if node.is_end and node.signature_id:
             results.append(node.signature_id)
         
-        for char, child in node.children.items():
-            self._collect_signatures(child, prefix + char, results)
+        for child in node.children:
+            if child is not None:
+                self._collect_signatures(child, results)
     
     def load_from_file(self, filepath: str):
         """Load signatures from JSON file"""
@@ -98,6 +325,8 @@ class SignatureTrie:
                 
                 if pattern and sig_id:
                     self.insert(pattern, sig_id, metadata)
+            
+            self.finalize()
         except Exception as e:
             print(f"⚠️ Failed to load signatures: {e}", file=sys.stderr)
     
@@ -111,15 +340,14 @@ def scan_file(filepath: str, trie: SignatureTrie) -> List[Dict]:
     """Scan a file for signature matches"""
     try:
         with open(filepath, 'rb') as f:
-            content = f.read()
-        
-        # Try to decode as text
-        try:
-            text = content.decode('utf-8', errors='ignore')
-        except:
-            text = str(content)
-        
-        matches = trie.search(text)
+            if os.fstat(f.fileno()).st_size == 0:
+                matches = []
+            else:
+                # Scan straight from the page cache, one window at a time
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    if hasattr(mm, 'madvise') and hasattr(mmap, 'MADV_SEQUENTIAL'):
+                        mm.madvise(mmap.MADV_SEQUENTIAL)
+                    matches = trie.search_buffer(mm)
         
         # Also check file path
         path_matches = trie.search(filepath)
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Trie signature engine - Numba kernels
+JIT-compiled trie walk over a flattened goto table, used by
+trie_signature_engine when numba is installed
+"""
+
+import numpy as np
+from numba import njit
+
+
+@njit(cache=True, boundscheck=False)
+def trie_scan(goto, accept, data):
+    """Return (positions, lengths, accept ids) of every signature in data
+
+    goto[node, byte] is the child node id (-1 for none, root is 0) and
+    accept[node] the signature slot ending at node (-1 if none); a byte past
+    the table's width has no edge. Matches are ordered by position, then
+    length, like the pure-Python walk.
+    """
+    n = data.size
+    fanout = goto.shape[1]
+    cap = 64
+    positions = np.empty(cap, dtype=np.int64)
+    lengths = np.empty(cap, dtype=np.int64)
+    ids = np.empty(cap, dtype=np.int32)
+    count = 0
+
+    for i in range(n):
+        node = 0
+        for j in range(i, n):
+            byte = data[j]
+            if byte >= fanout:
+                break
+            node = goto[node, byte]
+            if node < 0:
+                break
+            sig = accept[node]
+            if sig >= 0:
+                if count == cap:
+                    cap *= 2
+                    positions = np.concatenate((positions, np.empty_like(positions)))
+                    lengths = np.concatenate((lengths, np.empty_like(lengths)))
+                    ids = np.concatenate((ids, np.empty_like(ids)))
+                positions[count] = i
+                lengths[count] = j - i + 1
+                ids[count] = sig
+                count += 1
+
+    return positions[:count], lengths[:count], ids[:count]
@@ -12,6 +12,9 @@ CONFIG_DIR="$HOME/.macguardian"
 EVENT_DIR="$CONFIG_DIR/events"
 LOG_DIR="$CONFIG_DIR/logs"
 
+# Bytes already forwarded from each daily events-YYYYMMDD.jsonl log
+OFFSET_DIR="$CONFIG_DIR/fleet_offsets"
+
 # SIEM endpoints (configured via MDM)
 SIEM_ENDPOINT="${SIEM_ENDPOINT:-}"
 SIEM_API_KEY="${SIEM_API_KEY:-}"
@@ -84,8 +87,11 @@ forward_event() {
         return 1
     fi
     
-    local event_json
-    event_json=$(cat "$event_file")
+    forward_event_json "$(cat "$event_file")"
+}
+
+forward_event_json() {
+    local event_json="$1"
     
     case "$SIEM_TYPE" in
         webhook)
@@ -107,6 +113,46 @@ forward_event() {
     esac
 }
 
+# Forward the complete lines appended to a JSONL event log since the last
+# pass; a partially written last line waits for the next pass
+forward_new_lines() {
+    local log_file="$1"
+    local offset_file="$OFFSET_DIR/$(basename "$log_file").offset"
+    local LC_ALL=C  # ${#line} counts bytes
+    local offset=0 size consumed=0 line
+    
+    if [ -f "$offset_file" ]; then
+        offset=$(cat "$offset_file")
+    fi
+    size=$(wc -c < "$log_file" | tr -d ' ')
+    if [ "$size" -le "$offset" ]; then
+        return 0
+    fi
+    
+    while IFS= read -r line; do
+        consumed=$((consumed + ${#line} + 1))
+        if [ -n "$line" ]; then
+            forward_event_json "$line" || echo "WARNING: Failed to forward event from $log_file" >&2
+        fi
+    done < <(tail -c +$((offset + 1)) "$log_file" | head -c $((size - offset)))
+    
+    echo $((offset + consumed)) > "$offset_file"
+}
+
+# Logs already on disk with no offset yet (first run after an upgrade) start
+# at their current end, so history is not replayed to the SIEM; logs created
+# later start at 0
+seed_offsets() {
+    local log_file offset_file
+    
+    for log_file in "$EVENT_DIR"/events-*.jsonl; do
+        offset_file="$OFFSET_DIR/$(basename "$log_file").offset"
+        if [ -f "$log_file" ] && [ ! -f "$offset_file" ]; then
+            wc -c < "$log_file" | tr -d ' ' > "$offset_file"
+        fi
+    done
+}
+
 # ===============================
 # Monitor and Forward
 # ===============================
@@ -116,9 +162,19 @@ monitor_events() {
     echo "SIEM Type: $SIEM_TYPE"
     echo "Endpoint: $SIEM_ENDPOINT"
     
+    mkdir -p "$OFFSET_DIR"
+    seed_offsets
+    
     # Watch for new events
     while true; do
-        # Find new events (modified in last minute)
+        # Daily JSONL logs written by the event bus
+        for log_file in "$EVENT_DIR"/events-*.jsonl; do
+            if [ -f "$log_file" ]; then
+                forward_new_lines "$log_file"
+            fi
+        done
+        
+        # Legacy one-file-per-event layout (modified in last minute)
         find "$EVENT_DIR" -name "event_*.json" -type f -mmin -1 | while read -r event_file; do
             forward_event "$event_file"
         done
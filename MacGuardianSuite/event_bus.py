@@ -5,14 +5,38 @@ Part of MacGuardian's modular architecture
 """
 
 import json
-import queue
 import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Callable
-import gzip
+from typing import BinaryIO, Dict, List, Optional, Callable
+import itertools
 import os
+import secrets
+import weakref
+import zlib
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# Spill files stay open and are rolled once per bucket of this many seconds
+BUFFER_ROLL_SECONDS = 60
+
+# Spill streams are sync-flushed every this many events so a file that was
+# never closed (crash, kill) still decompresses up to the last flush
+BUFFER_SYNC_EVENTS = 256
+
+
+class _SubqueueOwner:
+    """Held in a producer thread's thread-local storage; freed (and its
+    finalizer run) when that thread exits"""
+    __slots__ = ("__weakref__",)
+
 
 class EventBus:
     """
@@ -25,11 +49,33 @@ class EventBus:
         self.buffer_dir = self.config_dir / "event_buffer"
         self.buffer_dir.mkdir(parents=True, exist_ok=True)
         
-        # In-memory queue
-        self.event_queue = queue.Queue(maxsize=10000)
+        # In-memory queues: one deque per producer thread (single producer,
+        # single consumer), so emit takes no shared lock; the worker sleeps on
+        # _cv until a subqueue fills a batch or the flush deadline passes.
+        # A thread's subqueue is retired when it exits (or unregisters) and
+        # dropped once drained
+        self.max_queue_size = 10000  # across all producer threads
+        self.batch_size = 100
+        self.flush_interval = 1.0  # Flush at least every second
+        self._subqueues: List[deque] = []
+        self._retired: List[deque] = []
+        self._subqueues_lock = threading.Lock()
+        self._local = threading.local()
+        self._cv = threading.Condition()
+        
+        # Disk spill: one open gzip stream (zlib, wbits=31) per time bucket
+        self._buffer_lock = threading.Lock()
+        self._buffer_fp: Optional[BinaryIO] = None
+        self._buffer_zobj = None
+        self._buffer_unsynced = 0
+        self._buffer_path: Optional[Path] = None
+        self._buffer_epoch: Optional[int] = None
         
-        # Output handlers
+        # Output handlers, each with its own single-thread executor: a batch
+        # fans out to every output in parallel, while each output still gets
+        # its batches one at a time, in order
         self.output_handlers: List[Callable] = []
+        self._output_pools: List[ThreadPoolExecutor] = []
         
         # Statistics
         self.stats = {
@@ -39,6 +85,14 @@ class EventBus:
             "buffer_size": 0
         }
         
+        # Per-process invariants stamped on every event
+        self._host = os.uname().nodename
+        self._user = os.getenv("USER", "unknown")
+        
+        # Correlation IDs: per-process random prefix + monotonic counter
+        self._corr_prefix = secrets.token_hex(3)
+        self._corr_counter = itertools.count().__next__
+        
         # Threading
         self.running = False
         self.worker_thread = None
@@ -61,8 +115,12 @@ class EventBus:
     def stop(self):
         """Stop the event bus"""
         self.running = False
+        with self._cv:
+            self._cv.notify_all()
         
-        # Flush remaining events
+        # Flush remaining events (close the open spill file so it is included)
+        with self._buffer_lock:
+            self._close_buffer_file()
         self._flush_buffer()
         
         if self.worker_thread:
@@ -70,14 +128,27 @@ class EventBus:
         if self.buffer_thread:
             self.buffer_thread.join(timeout=5)
         
+        # Wait for in-flight output calls, then end the output threads; the
+        # replacement executors start no thread until the bus is used again
+        for pool in self._output_pools:
+            pool.shutdown(wait=True)
+        self._output_pools = [self._new_output_pool(h) for h in self.output_handlers]
+        
         print("✅ Event bus stopped")
     
     def register_output(self, handler: Callable):
         """Register an output handler"""
-        self.output_handlers.append(handler)
         handler_name = getattr(handler, '__name__', handler.__class__.__name__)
+        self.output_handlers.append(handler)
+        self._output_pools.append(self._new_output_pool(handler))
         print(f"✅ Registered output handler: {handler_name}")
     
+    @staticmethod
+    def _new_output_pool(handler: Callable) -> ThreadPoolExecutor:
+        """Single-thread executor that runs one output's calls in order"""
+        handler_name = getattr(handler, '__name__', handler.__class__.__name__)
+        return ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"output-{handler_name}")
+    
     def emit(self, event: Dict):
         """
         Emit an event to the bus.
@@ -90,25 +161,89 @@ class EventBus:
                 - data: Event-specific data
         """
         # Normalize event
-        normalized = self._normalize_event(event)
+        self._enqueue(self._normalize_event(event))
+    
+    def emit_normalized(self, event: Dict):
+        """
+        Emit an event the collector already built in the bus schema
+        (timestamp, event_type, source, data, metadata), skipping the
+        field-by-field copy in _normalize_event.
+        """
+        event.setdefault("host", self._host)
+        event.setdefault("user", self._user)
+        metadata = event["metadata"]
+        if "correlation_id" not in metadata:
+            metadata["correlation_id"] = self._generate_correlation_id()
         
-        # Try to add to queue (non-blocking)
-        try:
-            self.event_queue.put_nowait(normalized)
+        self._enqueue(event)
+    
+    def _enqueue(self, normalized: Dict):
+        """Queue a normalized event, spilling to disk when the queue is full"""
+        # Add to this thread's queue (non-blocking)
+        subqueue = self.register_collector()
+        if self._queued() < self.max_queue_size:
+            subqueue.append(normalized)
             self.stats["events_received"] += 1
-        except queue.Full:
+            if len(subqueue) == self.batch_size:
+                # Only a full batch wakes the worker early
+                with self._cv:
+                    self._cv.notify()
+        else:
             # Queue full, write to disk buffer
             self._write_to_buffer(normalized)
             self.stats["events_dropped"] += 1
     
+    def register_collector(self) -> deque:
+        """Return the calling thread's subqueue, creating it on first use"""
+        subqueue = getattr(self._local, "queue", None)
+        if subqueue is None:
+            subqueue = deque()
+            with self._subqueues_lock:
+                self._subqueues.append(subqueue)
+            self._local.queue = subqueue
+            # Thread-exit hook: the owner dies with the thread's locals
+            self._local.owner = owner = _SubqueueOwner()
+            weakref.finalize(owner, self._retire_subqueue, subqueue)
+        return subqueue
+    
+    def unregister_collector(self):
+        """Retire the calling thread's subqueue (its queued events are still
+        delivered); a later emit from this thread registers a new one"""
+        owner = getattr(self._local, "owner", None)
+        if owner is not None:
+            del self._local.queue
+            del self._local.owner  # Runs the finalizer
+    
+    def _retire_subqueue(self, subqueue: deque):
+        """Mark a subqueue whose producer is gone for removal once drained"""
+        with self._subqueues_lock:
+            self._retired.append(subqueue)
+    
+    def _prune_subqueues(self):
+        """Forget retired subqueues that have been drained (nothing can be
+        appended to them any more)"""
+        with self._subqueues_lock:
+            drained = {id(q) for q in self._retired if not q}
+            if drained:
+                self._subqueues = [q for q in self._subqueues if id(q) not in drained]
+                self._retired = [q for q in self._retired if id(q) not in drained]
+    
+    def _queued(self) -> int:
+        """Number of events waiting across all subqueues"""
+        return sum(len(q) for q in self._subqueues)
+    
     def _normalize_event(self, event: Dict) -> Dict:
         """Normalize event to common schema"""
+        timestamp = event.get("timestamp")
+        if timestamp is None:
+            timestamp = datetime.utcnow().isoformat() + "Z"
+        
         normalized = {
-            "timestamp": event.get("timestamp", datetime.utcnow().isoformat() + "Z"),
+            "timestamp": timestamp,
             "event_type": event.get("event_type", "unknown"),
             "source": event.get("source", "unknown"),
-            "host": event.get("host", os.uname().nodename),
-            "user": event.get("user", os.getenv("USER", "unknown")),
+            "host": event.get("host", self._host),
+            "user": event.get("user", self._user),
             "data": event.get("data", {}),
             "metadata": event.get("metadata", {})
         }
@@ -121,57 +256,94 @@ class EventBus:
     
     def _generate_correlation_id(self) -> str:
         """Generate a unique correlation ID"""
-        import uuid
-        return str(uuid.uuid4())[:8]
+        return f"{self._corr_prefix}{self._corr_counter():05x}"
     
     def _worker(self):
         """Worker thread that processes events"""
-        batch = []
-        batch_size = 100
-        last_flush = time.time()
-        flush_interval = 1.0  # Flush every second
+        batch_size = self.batch_size
+        ready = lambda: not self.running or self._queued() >= batch_size
+        deadline = time.monotonic() + self.flush_interval
         
-        while self.running:
-            try:
-                # Get event from queue (with timeout)
-                event = self.event_queue.get(timeout=0.1)
-                batch.append(event)
-                
-                # Flush if batch is full or timeout reached
-                if len(batch) >= batch_size or (time.time() - last_flush) >= flush_interval:
-                    self._process_batch(batch)
-                    batch = []
-                    last_flush = time.time()
-                    
-            except queue.Empty:
-                # No events, check for buffered events
-                if batch:
-                    self._process_batch(batch)
-                    batch = []
-                    last_flush = time.time()
-                continue
+        while self.running or self._queued():
+            with self._cv:
+                self._cv.wait_for(ready, timeout=max(deadline - time.monotonic(), 0))
+            deadline = time.monotonic() + self.flush_interval
+            
+            # Drain every subqueue in turn; popleft is safe against
+            # concurrent appends (list()+clear() would lose events). Each
+            # batch goes out as soon as it is full, so a backlog is never
+            # gathered into one list and re-sliced
+            batch = []
+            for subqueue in list(self._subqueues):
+                popleft = subqueue.popleft
+                while True:
+                    try:
+                        batch.append(popleft())
+                    except IndexError:
+                        break
+                    if len(batch) == batch_size:
+                        self._process_batch(batch)
+                        batch = []
+            
+            self._process_batch(batch)
+            
+            if self._retired:
+                self._prune_subqueues()
     
     def _process_batch(self, batch: List[Dict]):
         """Process a batch of events"""
         if not batch:
             return
         
-        # Send to all output handlers
-        for handler in self.output_handlers:
+        # Send to all output handlers concurrently, then wait for every one
+        # (a slow output holds back the next batch rather than queueing
+        # batches without bound)
+        futures = [
+            (handler, pool.submit(handler, batch))
+            for handler, pool in zip(self.output_handlers, self._output_pools)
+        ]
+        for handler, future in futures:
             try:
-                handler(batch)
+                future.result()
                 self.stats["events_sent"] += len(batch)
             except Exception as e:
-                print(f"⚠️  Error in output handler {handler.__name__}: {e}")
+                handler_name = getattr(handler, '__name__', handler.__class__.__name__)
+                print(f"⚠️  Error in output handler {handler_name}: {e}")
         
-        self.stats["buffer_size"] = self.event_queue.qsize()
+        self.stats["buffer_size"] = self._queued()
     
     def _write_to_buffer(self, event: Dict):
         """Write event to disk buffer"""
-        buffer_file = self.buffer_dir / f"buffer_{int(time.time())}.jsonl.gz"
+        if HAS_ORJSON:
+            line = orjson.dumps(event) + b"\n"
+        else:
+            line = (json.dumps(event) + "\n").encode()
         
-        with gzip.open(buffer_file, "at") as f:
-            f.write(json.dumps(event) + "\n")
+        with self._buffer_lock:
+            now = int(time.time())
+            epoch = now // BUFFER_ROLL_SECONDS
+            if epoch != self._buffer_epoch:
+                self._close_buffer_file()
+                self._buffer_path = self.buffer_dir / f"buffer_{now}.jsonl.gz"
+                self._buffer_fp = open(self._buffer_path, "ab")
+                self._buffer_zobj = zlib.compressobj(3, zlib.DEFLATED, 31)
+                self._buffer_epoch = epoch
+            self._buffer_fp.write(self._buffer_zobj.compress(line))
+            self._buffer_unsynced += 1
+            if self._buffer_unsynced >= BUFFER_SYNC_EVENTS:
+                self._buffer_fp.write(self._buffer_zobj.flush(zlib.Z_SYNC_FLUSH))
+                self._buffer_unsynced = 0
+    
+    def _close_buffer_file(self):
+        """Close the open spill file (caller holds _buffer_lock)"""
+        if self._buffer_fp is not None:
+            self._buffer_fp.write(self._buffer_zobj.flush())
+            self._buffer_fp.close()
+        self._buffer_fp = None
+        self._buffer_zobj = None
+        self._buffer_unsynced = 0
+        self._buffer_path = None
+        self._buffer_epoch = None
     
     def _buffer_flusher(self):
         """Periodically flush buffered events from disk"""
@@ -181,28 +353,60 @@ class EventBus:
     
     def _flush_buffer(self):
         """Flush events from disk buffer"""
-        buffer_files = sorted(self.buffer_dir.glob("buffer_*.jsonl.gz"))
+        with self._buffer_lock:
+            # Close an expired spill file; skip one that is still being written
+            if (self._buffer_epoch is not None and
+                    int(time.time()) // BUFFER_ROLL_SECONDS != self._buffer_epoch):
+                self._close_buffer_file()
+            active = self._buffer_path
         
-        for buffer_file in buffer_files[:10]:  # Process up to 10 files at a time
-            try:
-                events = []
-                with gzip.open(buffer_file, "rt") as f:
-                    for line in f:
-                        if line.strip():
-                            events.append(json.loads(line))
-                
-                if events:
+        buffer_files = sorted(
+            f for f in self.buffer_dir.glob("buffer_*.jsonl.gz") if f != active
+        )
+        
+        buffer_files = buffer_files[:10]  # Process up to 10 files at a time
+        if not buffer_files:
+            return
+        
+        # zlib releases the GIL, so files decompress in parallel; batches are
+        # still handed to the outputs one file at a time, in order
+        workers = min(len(buffer_files), os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(self._decompress_one, buffer_files)
+            for buffer_file, events in zip(buffer_files, results):
+                if not events:
+                    continue
+                try:
                     self._process_batch(events)
                     buffer_file.unlink()  # Delete after processing
-                    
-            except Exception as e:
-                print(f"⚠️  Error flushing buffer {buffer_file}: {e}")
+                except Exception as e:
+                    print(f"⚠️  Error flushing buffer {buffer_file}: {e}")
+    
+    def _decompress_one(self, buffer_file: Path) -> Optional[List[Dict]]:
+        """Read one spill file back into events (None on error)"""
+        try:
+            data = buffer_file.read_bytes()
+            chunks = []
+            while data:
+                # One gzip member per writer session; a truncated member
+                # yields everything up to its last sync flush
+                zobj = zlib.decompressobj(31)
+                chunks.append(zobj.decompress(data))
+                data = zobj.unused_data
+            
+            # Drop a trailing partial line from an unfinished stream
+            lines = b"".join(chunks).split(b"\n")[:-1]
+            loads = orjson.loads if HAS_ORJSON else json.loads
+            return [loads(line) for line in lines if line.strip()]
+        except Exception as e:
+            print(f"⚠️  Error flushing buffer {buffer_file}: {e}")
+            return None
     
     def get_stats(self) -> Dict:
         """Get event bus statistics"""
         return {
             **self.stats,
-            "queue_size": self.event_queue.qsize(),
+            "queue_size": self._queued(),
             "buffer_files": len(list(self.buffer_dir.glob("buffer_*.jsonl.gz")))
         }
 
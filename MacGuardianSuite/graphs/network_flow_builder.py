@@ -6,147 +6,204 @@ Builds graph visualization data from network connections
 """
 
 import json
+import os
 import sys
 import subprocess
-import re
+import threading
 from datetime import datetime
 from typing import Dict, List, Any
 
+# Seconds before a hung lsof is killed
+LSOF_TIMEOUT = 10
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+
+def _json_dumps_bytes(obj) -> bytes:
+    """Serialize to indented JSON bytes, preferring orjson"""
+    if HAS_ORJSON:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2).encode()
+
+
+def _write_atomic(path: str, data: bytes):
+    """Write data in one call to a temp file, then rename it over path so
+    pollers never see a partial file"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
 def get_network_connections() -> List[Dict[str, Any]]:
     """Get network connections using lsof"""
     connections = []
     
     try:
-        result = subprocess.run(
+        # Stream rows as the command produces them rather than capturing
+        # and splitting the whole output
+        proc = subprocess.Popen(
             ['lsof', '-i', '-P', '-n'],
-            capture_output=True,
-            text=True,
-            timeout=10
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL
         )
+        # A hung command is killed after the timeout; the loop then sees EOF
+        watchdog = threading.Timer(LSOF_TIMEOUT, proc.kill)
+        watchdog.start()
         
-        if result.returncode != 0:
-            return connections
-        
-        for line in result.stdout.split('\n')[1:]:  # Skip header
-            if not line.strip():
-                continue
+        try:
+            # Hot loop: bind the append once; blank lines fail the length check.
+            # Rows are parsed as bytes and only kept fields are decoded. lsof
+            # prints one row per descriptor, so sockets sharing the same
+            # endpoints collapse into a single connection
+            add_connection = connections.append
+            seen = set()
+            next(proc.stdout, None)  # Skip header
+            for line in proc.stdout:
+                parts = line.split()
+                if len(parts) < 9:
+                    continue
             
-            parts = line.split()
-            if len(parts) < 9:
-                continue
-            
-            try:
-                process = parts[0]
-                pid = parts[1]
-                connection_info = parts[8]
+                try:
+                    process = parts[0]
+                    pid = parts[1]
+                    connection_info = parts[8]
                 
-                # Parse connection (e.g., "192.168.1.1:443")
-                if '->' in connection_info:
-                    local, remote = connection_info.split('->')
-                else:
-                    local = connection_info
-                    remote = ""
+                    # Parse connection (e.g., "192.168.1.1:443")
+                    if b'->' in connection_info:
+                        local, remote = connection_info.split(b'->')
+                    else:
+                        local = connection_info
+                        remote = b""
                 
-                # Extract IP and port
-                local_match = re.match(r'([^:]+):(\d+)', local)
-                remote_match = re.match(r'([^:]+):(\d+)', remote) if remote else None
+                    # Extract IP and port (split on the last ':' so IPv6
+                    # "[::1]:443" keeps its brackets in the IP)
+                    local_ip, _, local_port = local.rpartition(b':')
                 
-                if local_match:
-                    local_ip = local_match.group(1)
-                    local_port = int(local_match.group(2))
+                    if local_ip and local_port.isdigit():
+                        local_port = int(local_port)
                     
-                    remote_ip = ""
-                    remote_port = 0
-                    if remote_match:
-                        remote_ip = remote_match.group(1)
-                        remote_port = int(remote_match.group(2))
+                        remote_ip, _, remote_port = remote.rpartition(b':')
+                        if remote_ip and remote_port.isdigit():
+                            remote_port = int(remote_port)
+                        else:
+                            remote_ip = b""
+                            remote_port = 0
                     
-                    connections.append({
-                        'process': process,
-                        'pid': pid,
-                        'local_ip': local_ip,
-                        'local_port': local_port,
-                        'remote_ip': remote_ip,
-                        'remote_port': remote_port
-                    })
-            except (ValueError, IndexError):
-                continue
+                        key = (pid, local_ip, local_port, remote_ip, remote_port)
+                        if key in seen:
+                            continue
+                        seen.add(key)
+                        
+                        add_connection({
+                            'process': process.decode('utf-8', 'replace'),
+                            'pid': pid.decode('ascii', 'replace'),
+                            'local_ip': local_ip.decode('ascii', 'replace'),
+                            'local_port': local_port,
+                            'remote_ip': remote_ip.decode('ascii', 'replace'),
+                            'remote_port': remote_port
+                        })
+                except (ValueError, IndexError):
+                    continue
+        finally:
+            watchdog.cancel()
+            proc.stdout.close()
+            proc.wait()
+        
+        if proc.returncode != 0:
+            return []
                 
-    except subprocess.TimeoutExpired:
-        pass
     except Exception as e:
         print(f"Error getting network connections: {e}", file=sys.stderr)
     
     return connections
 
-def build_network_graph() -> Dict[str, Any]:
-    """Build network flow graph"""
+# Column order of compact edge rows; remote_port is null on process -> IP edges
+EDGE_SCHEMA = ['from', 'to', 'local_port', 'remote_port']
+
+def build_network_graph(compact: bool = False) -> Dict[str, Any]:
+    """Build network flow graph
+    
+    With compact=True edges are emitted as EDGE_SCHEMA-ordered arrays (and
+    the schema is included) instead of one labelled object per edge.
+    """
     connections = get_network_connections()
     
     nodes = []
     edges = []
-    node_ids = {}
-    node_counter = 0
+    node_ids = {}  # ('process', pid) / ('ip', address) -> node id
+    
+    def get_or_add(key, make_node):
+        """Node id for key, creating the node on first sight"""
+        node_id = node_ids.get(key)
+        if node_id is None:
+            node_id = node_ids[key] = len(nodes)
+            nodes.append(make_node(node_id))
+        return node_id
     
     # Create nodes and edges
     for conn in connections:
         # Process node
-        process_id = f"process_{conn['pid']}"
-        if process_id not in node_ids:
-            node_ids[process_id] = node_counter
-            nodes.append({
-                'id': node_counter,
-                'label': f"{conn['process']} (PID {conn['pid']})",
-                'type': 'process',
-                'pid': conn['pid']
-            })
-            node_counter += 1
+        process_node = get_or_add(('process', conn['pid']), lambda i: {
+            'id': i,
+            'label': f"{conn['process']} (PID {conn['pid']})",
+            'type': 'process',
+            'pid': conn['pid']
+        })
         
         # Local IP node
-        if conn['local_ip'] and conn['local_ip'] not in ['*', 'localhost']:
-            local_ip_id = f"ip_{conn['local_ip']}"
-            if local_ip_id not in node_ids:
-                node_ids[local_ip_id] = node_counter
-                nodes.append({
-                    'id': node_counter,
-                    'label': conn['local_ip'],
-                    'type': 'ip',
-                    'ip': conn['local_ip']
-                })
-                node_counter += 1
+        local_ip = conn['local_ip']
+        local_node = None
+        if local_ip and local_ip not in ('*', 'localhost'):
+            local_node = get_or_add(('ip', local_ip), lambda i: {
+                'id': i,
+                'label': local_ip,
+                'type': 'ip',
+                'ip': local_ip
+            })
             
             # Edge: Process -> Local IP
-            edges.append({
-                'from': node_ids[process_id],
-                'to': node_ids[local_ip_id],
-                'label': f"Port {conn['local_port']}",
-                'port': conn['local_port']
-            })
+            edges.append((process_node, local_node, conn['local_port'], None))
         
         # Remote IP node
-        if conn['remote_ip']:
-            remote_ip_id = f"ip_{conn['remote_ip']}"
-            if remote_ip_id not in node_ids:
-                node_ids[remote_ip_id] = node_counter
-                nodes.append({
-                    'id': node_counter,
-                    'label': conn['remote_ip'],
-                    'type': 'ip',
-                    'ip': conn['remote_ip']
-                })
-                node_counter += 1
+        remote_ip = conn['remote_ip']
+        if remote_ip:
+            remote_node = get_or_add(('ip', remote_ip), lambda i: {
+                'id': i,
+                'label': remote_ip,
+                'type': 'ip',
+                'ip': remote_ip
+            })
             
             # Edge: Local IP -> Remote IP
-            if conn['local_ip'] and conn['local_ip'] not in ['*', 'localhost']:
-                local_ip_id = f"ip_{conn['local_ip']}"
-                if local_ip_id in node_ids:
-                    edges.append({
-                        'from': node_ids[local_ip_id],
-                        'to': node_ids[remote_ip_id],
-                        'label': f"{conn['local_port']} -> {conn['remote_port']}",
-                        'local_port': conn['local_port'],
-                        'remote_port': conn['remote_port']
-                    })
+            if local_node is not None:
+                edges.append((local_node, remote_node, conn['local_port'], conn['remote_port']))
+    
+    # Connections differing only in fields the edges drop (e.g. the local
+    # IP of a process -> IP edge) still repeat edges; keep the first of each
+    edges = list(dict.fromkeys(edges))
+    
+    if compact:
+        return {
+            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'nodes': nodes,
+            'edge_schema': EDGE_SCHEMA,
+            'edges': edges,
+            'connection_count': len(connections)
+        }
+    
+    edges = [_edge_object(*edge) for edge in edges]
     
     return {
         'timestamp': datetime.utcnow().isoformat() + 'Z',
@@ -155,14 +212,31 @@ def build_network_graph() -> Dict[str, Any]:
         'connection_count': len(connections)
     }
 
+def _edge_object(from_node: int, to_node: int, local_port: int, remote_port) -> Dict[str, Any]:
+    """Expand a compact edge row into the labelled edge object"""
+    if remote_port is None:
+        return {
+            'from': from_node,
+            'to': to_node,
+            'label': f"Port {local_port}",
+            'port': local_port
+        }
+    return {
+        'from': from_node,
+        'to': to_node,
+        'label': f"{local_port} -> {remote_port}",
+        'local_port': local_port,
+        'remote_port': remote_port
+    }
+
 def main():
     """Main function"""
-    output_file = sys.argv[1] if len(sys.argv) > 1 else '/tmp/network_graph.json'
+    args = [arg for arg in sys.argv[1:] if arg != '--compact']
+    output_file = args[0] if args else '/tmp/network_graph.json'
     
-    graph = build_network_graph()
+    graph = build_network_graph(compact='--compact' in sys.argv[1:])
     
-    with open(output_file, 'w') as f:
-        json.dump(graph, f, indent=2)
+    _write_atomic(output_file, _json_dumps_bytes(graph))
     
     print(f"Network graph built: {len(graph['nodes'])} nodes, {len(graph['edges'])} edges")
     print(f"Output: {output_file}")
@@ -6,95 +6,176 @@ Builds process tree visualization data
 """
 
 import json
+import os
 import sys
 import subprocess
-import re
+import threading
 from datetime import datetime
 from typing import Dict, List, Any
 
-def get_process_tree() -> Dict[str, Any]:
-    """Get process tree using ps"""
-    processes = []
+# Seconds before a hung ps is killed
+PS_TIMEOUT = 10
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+
+def _json_dumps_bytes(obj) -> bytes:
+    """Serialize to indented JSON bytes, preferring orjson"""
+    if HAS_ORJSON:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2).encode()
+
+
+def _write_atomic(path: str, data: bytes):
+    """Write data in one call to a temp file, then rename it over path so
+    pollers never see a partial file"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+# Column order of compact edge rows
+EDGE_SCHEMA = ['from', 'to']
+
+def get_process_tree(compact: bool = False) -> Dict[str, Any]:
+    """Get process tree using ps
+    
+    With compact=True edges are emitted as [parent, child] arrays (and the
+    schema is included) instead of one object per edge.
+    """
+    # Parsed rows as parallel columns (struct of arrays)
+    pids = []
+    ppids = []
+    names = []
     
     try:
-        result = subprocess.run(
+        # Stream rows as the command produces them rather than capturing
+        # and splitting the whole output. Rows stay bytes: only the name
+        # column is ever decoded
+        proc = subprocess.Popen(
             ['ps', 'axo', 'pid,ppid,comm,args'],
-            capture_output=True,
-            text=True,
-            timeout=10
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL
         )
+        # A hung command is killed after the timeout; the loop then sees EOF
+        watchdog = threading.Timer(PS_TIMEOUT, proc.kill)
+        watchdog.start()
         
-        if result.returncode != 0:
-            return {'nodes': [], 'edges': []}
-        
-        for line in result.stdout.split('\n')[1:]:  # Skip header
-            if not line.strip():
-                continue
-            
-            parts = line.split(None, 3)
-            if len(parts) < 3:
-                continue
+        try:
+            # Hot loop: bind the appends once; blank lines fail the length check
+            add_pid, add_ppid, add_name = pids.append, ppids.append, names.append
+            next(proc.stdout, None)  # Skip header
+            for line in proc.stdout:
+                parts = line.split(None, 3)
+                if len(parts) < 3:
+                    continue
             
-            try:
-                pid = int(parts[0])
-                ppid = int(parts[1])
-                comm = parts[2]
-                args = parts[3] if len(parts) > 3 else comm
-                
-                processes.append({
-                    'pid': pid,
-                    'ppid': ppid,
-                    'name': comm,
-                    'args': args[:100]  # Limit args length
-                })
-            except (ValueError, IndexError):
-                continue
+                try:
+                    pid = int(parts[0])
+                    ppid = int(parts[1])
+                except ValueError:
+                    continue
+                add_pid(pid)
+                add_ppid(ppid)
+                add_name(parts[2].decode('utf-8', 'replace'))
+        finally:
+            watchdog.cancel()
+            proc.stdout.close()
+            proc.wait()
+        
+        if proc.returncode != 0:
+            return {'nodes': [], 'edges': []}
                 
-    except subprocess.TimeoutExpired:
-        pass
     except Exception as e:
         print(f"Error getting process tree: {e}", file=sys.stderr)
     
     # Build nodes and edges
-    nodes = []
-    edges = []
-    pid_to_index = {}
-    
-    for idx, proc in enumerate(processes):
-        pid_to_index[proc['pid']] = idx
-        nodes.append({
+    nodes = [
+        {
             'id': idx,
-            'label': f"{proc['name']} (PID {proc['pid']})",
-            'pid': proc['pid'],
-            'ppid': proc['ppid'],
-            'name': proc['name']
-        })
+            'label': f"{name} (PID {pid})",
+            'pid': pid,
+            'ppid': ppid,
+            'name': name
+        }
+        for idx, (pid, ppid, name) in enumerate(zip(pids, ppids, names))
+    ]
     
     # Create edges (parent -> child)
-    for proc in processes:
-        if proc['ppid'] in pid_to_index and proc['pid'] in pid_to_index:
-            parent_idx = pid_to_index[proc['ppid']]
-            child_idx = pid_to_index[proc['pid']]
-            edges.append({
-                'from': parent_idx,
-                'to': child_idx
-            })
+    edges = _parent_child_pairs(pids, ppids)
+    
+    if compact:
+        return {
+            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'nodes': nodes,
+            'edge_schema': EDGE_SCHEMA,
+            'edges': edges,
+            'process_count': len(pids)
+        }
+    
+    edges = [
+        {'from': parent_idx, 'to': child_idx}
+        for parent_idx, child_idx in edges
+    ]
     
     return {
         'timestamp': datetime.utcnow().isoformat() + 'Z',
         'nodes': nodes,
         'edges': edges,
-        'process_count': len(processes)
+        'process_count': len(pids)
     }
 
+def _parent_child_pairs(pids: List[int], ppids: List[int]) -> List[tuple]:
+    """(parent index, child index) for every process whose parent is listed"""
+    if not pids:
+        return []
+    
+    if not HAS_NUMPY:
+        pid_to_index = {pid: idx for idx, pid in enumerate(pids)}
+        return [
+            (pid_to_index[ppid], idx)
+            for idx, ppid in enumerate(ppids) if ppid in pid_to_index
+        ]
+    
+    # Look every ppid up in the sorted pid column at once
+    pid_arr = np.asarray(pids, dtype=np.int64)
+    ppid_arr = np.asarray(ppids, dtype=np.int64)
+    order = np.argsort(pid_arr, kind='stable')
+    pid_sorted = pid_arr[order]
+    pos = np.searchsorted(pid_sorted, ppid_arr)
+    pos_clipped = np.minimum(pos, len(pids) - 1)
+    valid = (pos < len(pids)) & (pid_sorted[pos_clipped] == ppid_arr)
+    
+    parents = order[pos_clipped[valid]]
+    children = np.nonzero(valid)[0]
+    return list(zip(parents.tolist(), children.tolist()))
+
 def main():
     """Main function"""
-    output_file = sys.argv[1] if len(sys.argv) > 1 else '/tmp/process_tree.json'
+    args = [arg for arg in sys.argv[1:] if arg != '--compact']
+    output_file = args[0] if args else '/tmp/process_tree.json'
     
-    tree = get_process_tree()
+    tree = get_process_tree(compact='--compact' in sys.argv[1:])
     
-    with open(output_file, 'w') as f:
-        json.dump(tree, f, indent=2)
+    _write_atomic(output_file, _json_dumps_bytes(tree))
     
     print(f"Process tree built: {len(tree['nodes'])} nodes, {len(tree['edges'])} edges")
     print(f"Output: {output_file}")
@@ -10,8 +10,14 @@ import sys
 import os
 import pickle
 import argparse
+import heapq
+import itertools
+import math
+import mmap
+import threading
 from pathlib import Path
-from collections import defaultdict, deque
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import statistics
 
@@ -22,6 +28,18 @@ except ImportError:
     HAS_NUMPY = False
     print("Warning: numpy not available", file=sys.stderr)
 
+try:
+    from ml_engine_numba import zscore_scan
+    HAS_NUMBA = HAS_NUMPY
+except ImportError:
+    HAS_NUMBA = False
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 try:
     from sklearn.ensemble import (
         IsolationForest, RandomForestClassifier, 
@@ -29,7 +47,7 @@ try:
     )
     from sklearn.svm import OneClassSVM, SVC
     from sklearn.cluster import DBSCAN, KMeans
-    from sklearn.preprocessing import StandardScaler, RobustScaler
+    from sklearn.preprocessing import StandardScaler
     from sklearn.model_selection import train_test_split
     from sklearn.metrics import classification_report, accuracy_score
     from sklearn.neighbors import LocalOutlierFactor
@@ -39,6 +57,12 @@ except ImportError:
     HAS_SKLEARN = False
     print("Warning: scikit-learn not available", file=sys.stderr)
 
+try:
+    import lz4  # enables joblib's lz4 codec
+    MODEL_COMPRESS = ('lz4', 3)
+except ImportError:
+    MODEL_COMPRESS = 3  # joblib's default zlib codec
+
 try:
     import pandas as pd
     HAS_PANDAS = True
@@ -46,6 +70,126 @@ except ImportError:
     HAS_PANDAS = False
 
 
+def _json_loads(data):
+    """Parse JSON bytes, preferring orjson's C parser"""
+    return orjson.loads(data) if HAS_ORJSON else json.loads(data)
+
+
+def _json_dumps_bytes(obj):
+    """Serialize to indented JSON bytes, preferring orjson"""
+    if HAS_ORJSON:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, indent=2).encode()
+
+
+# Raw metrics used as features, and those also scored against the baseline
+FEATURE_KEYS = ("process_count", "network_connections", "cpu_usage",
+                "memory_usage", "disk_io", "logged_users")
+BASELINE_KEYS = ("process_count", "network_connections", "cpu_usage", "memory_usage")
+# Raw + z-score + 3 temporal columns
+FEATURE_DIM = len(FEATURE_KEYS) + len(BASELINE_KEYS) + 3
+# Samples kept in the feature history ring
+HISTORY_SIZE = 1000
+# Metrics files at least this big are parsed straight from an mmap
+MMAP_MIN_SIZE = 4096
+# New samples between in-memory refits in online_learning
+REFIT_EVERY = 50
+# |z| above which the statistical fallback flags a metric
+ZSCORE_THRESHOLD = 2.0
+
+
+def _recent_metrics_files(data_path, n):
+    """Newest n metrics_*.json paths (names are timestamp-ordered), newest first
+    
+    Keeps a bounded heap over a single scandir pass instead of sorting every
+    match in the directory.
+    """
+    entries = (
+        entry.name for entry in os.scandir(data_path)
+        if entry.name.startswith("metrics_") and entry.name.endswith(".json")
+    )
+    return [os.path.join(data_path, name) for name in heapq.nlargest(n, entries)]
+
+
+def _linfit(values):
+    """Closed-form least-squares line through values against 0..n-1.
+    
+    Returns (slope, value extrapolated at x = n), i.e. polyfit(x, y, 1)[0]
+    and polyval(coef, n) without the Vandermonde/SVD setup.
+    """
+    y = np.asarray(values, dtype=np.float64)
+    n = y.size
+    x_mean = (n - 1) / 2
+    y_mean = y.mean()
+    dx = np.arange(n) - x_mean
+    denom = (dx * dx).sum()
+    slope = (dx * (y - y_mean)).sum() / denom if denom else 0.0
+    return slope, y_mean + slope * (n - x_mean)
+
+
+def _load_metrics(path):
+    """Read one metrics file, or None if it is missing or malformed"""
+    try:
+        with open(path, 'rb') as f:
+            if HAS_ORJSON and os.fstat(f.fileno()).st_size >= MMAP_MIN_SIZE:
+                # Parse from the page cache without a read() copy
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    with memoryview(mm) as view:
+                        return orjson.loads(view)
+            return _json_loads(f.read())
+    except:
+        return None
+
+
+class BaselineScaler:
+    """Fixed z-score scaling of the raw metric columns by the baseline
+    
+    Drop-in for a fitted sklearn scaler (.transform only): center/scale
+    come from the baseline mean/std instead of per-column percentiles, so
+    there is no fit pass and nothing to sort. Columns without a baseline
+    (including the already-standardized derived ones) pass through.
+    """
+    
+    def __init__(self, center, scale):
+        self.center = np.asarray(center, dtype=np.float32)
+        self.scale = np.asarray(scale, dtype=np.float32)
+        self.inv_scale = np.float32(1.0) / self.scale
+    
+    @classmethod
+    def from_baseline(cls, baseline_pairs):
+        """Build from MLSecurityEngine._baseline_pairs"""
+        center = np.zeros(FEATURE_DIM, dtype=np.float32)
+        scale = np.ones(FEATURE_DIM, dtype=np.float32)
+        for key, mean, std in baseline_pairs:
+            if std and key in FEATURE_KEYS:
+                i = FEATURE_KEYS.index(key)
+                center[i], scale[i] = mean, std
+        return cls(center, scale)
+    
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["center"], data["scale"])
+    
+    def save(self, path):
+        with open(path, 'wb') as f:
+            np.savez(f, center=self.center, scale=self.scale)
+    
+    def transform(self, X):
+        """Scaled float32 copy of X"""
+        X_scaled = np.subtract(X, self.center, dtype=np.float32)
+        X_scaled *= self.inv_scale
+        return X_scaled
+
+
+def _load_metrics_many(paths):
+    """Read metrics files concurrently (IO-bound); order kept, failures dropped"""
+    if not paths:
+        return []
+    with ThreadPoolExecutor(max_workers=min(16, len(paths))) as executor:
+        return [m for m in executor.map(_load_metrics, paths) if m is not None]
+
+
 class MLSecurityEngine:
     """Advanced ML-based security engine with model training"""
     
@@ -58,7 +202,12 @@ class MLSecurityEngine:
         self.classifier = None
         self.clusterer = None
         self.baseline_metrics = None
-        self.feature_history = deque(maxlen=1000)  # Keep last 1000 samples
+        self._baseline_pairs = []
+        self._zscore_names = None  # Statistical fallback arrays (_cache_baseline)
+        # Feature history: preallocated ring of the last HISTORY_SIZE samples
+        self._hist = np.zeros((HISTORY_SIZE, FEATURE_DIM), dtype=np.float32) if HAS_NUMPY else None
+        self._hist_n = 0  # Total samples ever recorded
+        self._last_fit_n = 0  # _hist_n at the last online refit
         
         self.load_models()
         self.load_baseline()
@@ -68,8 +217,7 @@ class MLSecurityEngine:
         baseline_file = Path.home() / ".macguardian" / "ai" / "baseline.json"
         if baseline_file.exists():
             try:
-                with open(baseline_file, 'r') as f:
-                    self.baseline_metrics = json.load(f)
+                self.baseline_metrics = _json_loads(baseline_file.read_bytes())
             except:
                 self.baseline_metrics = None
         
@@ -80,48 +228,182 @@ class MLSecurityEngine:
                 "cpu_usage": {"mean": 20, "std": 15},
                 "memory_usage": {"mean": 4000, "std": 1000}
             }
+        
+        self._cache_baseline()
+    
+    def _cache_baseline(self):
+        """Precompute (key, mean, std) per baseline feature; std 0 scores 0"""
+        pairs = []
+        for key in BASELINE_KEYS:
+            baseline = self.baseline_metrics.get(key)
+            if baseline is None:
+                pairs.append((key, 0, 0))
+                continue
+            std = baseline.get("std", 1)
+            pairs.append((key, baseline.get("mean", 0), std if std > 0 else 0))
+        self._baseline_pairs = pairs
+        self._cache_zscore_arrays()
+        self._specialize_extract_features()
+    
+    def _cache_zscore_arrays(self):
+        """Flatten every scoreable baseline entry (std > 0) into name/mean/std
+        arrays for the statistical fallback; None keeps the dict walk"""
+        self._zscore_names = None
+        if not HAS_NUMPY or not self.baseline_metrics:
+            return
+        
+        names, means, stds = [], [], []
+        try:
+            for name, baseline in self.baseline_metrics.items():
+                std = baseline.get("std", 1)
+                if name == "timestamp" or not std > 0:
+                    continue
+                names.append(name)
+                means.append(baseline.get("mean", 0))
+                stds.append(std)
+            self._zscore_means = np.array(means, dtype=np.float64)
+            self._zscore_stds = np.array(stds, dtype=np.float64)
+        except (AttributeError, TypeError, ValueError):
+            return
+        self._zscore_names = tuple(names)
+    
+    def _zscore_anomalies(self, metrics):
+        """Baseline z-score outliers as "name: zσ" strings, in metrics order"""
+        get = metrics.get
+        values = np.array([get(name) for name in self._zscore_names], dtype=np.float64)
+        
+        if HAS_NUMBA:
+            hits, scores = zscore_scan(values, self._zscore_means,
+                                       self._zscore_stds, ZSCORE_THRESHOLD)
+        else:
+            with np.errstate(invalid="ignore"):
+                scores = np.abs((values - self._zscore_means) / self._zscore_stds)
+                hits = np.flatnonzero(scores > ZSCORE_THRESHOLD)
+            scores = scores[hits]
+        
+        found = [(self._zscore_names[i], z) for i, z in zip(hits.tolist(), scores.tolist())]
+        if len(found) > 1:
+            position = {name: i for i, name in enumerate(metrics)}
+            found.sort(key=lambda item: position[item[0]])
+        return [f"{name}: {z:.2f}σ" for name, z in found]
+    
+    def _specialize_extract_features(self):
+        """Bind an extract_features with the baseline constants inlined
+        
+        The generated function reads each metric once and scores it against
+        literal mean/std values, so the per-sample path has no loops or
+        baseline lookups. Rebuilt by _cache_baseline whenever the baseline
+        changes; the generic method stays in place if codegen fails.
+        """
+        self.__dict__.pop("extract_features", None)
+        if not HAS_NUMPY or not self.baseline_metrics:
+            return
+        
+        try:
+            scored = {key: (float(mean), float(std))
+                      for key, mean, std in self._baseline_pairs}
+        except (TypeError, ValueError):
+            return
+        if not all(map(math.isfinite, itertools.chain.from_iterable(scored.values()))):
+            return  # repr() of inf/nan is not a valid literal
+        
+        keys = list(FEATURE_KEYS) + [k for k in BASELINE_KEYS if k not in FEATURE_KEYS]
+        lines = ["def extract_features(metrics):", "    get = metrics.get"]
+        lines += [f"    v{i} = get({key!r}, _MISSING)" for i, key in enumerate(keys)]
+        items = [f"0 if v{i} is _MISSING else v{i}"
+                 for i, key in enumerate(keys) if key in FEATURE_KEYS]
+        for key in BASELINE_KEYS:
+            i = keys.index(key)
+            mean, std = scored[key]
+            if std:
+                items.append(f"(v{i} - {mean!r}) / {std!r} "
+                             f"if v{i} is not _MISSING and v{i} is not None else 0")
+            else:
+                items.append("0")
+        lines.append("    features = [" + ", ".join(f"({item})" for item in items) + "]")
+        lines.append("    features.extend(_temporal())")
+        lines.append("    return _asarray(features, dtype=_float32)")
+        
+        namespace = {"_MISSING": object(), "_temporal": self._temporal_features,
+                     "_asarray": np.asarray, "_float32": np.float32}
+        exec(compile("\n".join(lines), "<extract_features>", "exec"), namespace)
+        self.extract_features = namespace["extract_features"]
     
     def extract_features(self, metrics):
         """Extract ML features from metrics"""
-        features = []
-        
         # Basic features
-        features.append(metrics.get("process_count", 0))
-        features.append(metrics.get("network_connections", 0))
-        features.append(metrics.get("cpu_usage", 0))
-        features.append(metrics.get("memory_usage", 0))
-        features.append(metrics.get("disk_io", 0))
-        features.append(metrics.get("logged_users", 0))
-        
-        # Derived features
+        get = metrics.get
+        features = [get(key, 0) for key in FEATURE_KEYS]
+        
+        # Derived features (baseline constants cached by _cache_baseline)
         if self.baseline_metrics:
-            for key in ["process_count", "network_connections", "cpu_usage", "memory_usage"]:
-                if key in metrics and key in self.baseline_metrics:
-                    baseline = self.baseline_metrics[key]
-                    mean = baseline.get("mean", 0)
-                    std = baseline.get("std", 1)
-                    if std > 0:
-                        z_score = (metrics[key] - mean) / std
-                        features.append(z_score)
-                    else:
-                        features.append(0)
-                else:
-                    features.append(0)
+            for key, mean, std in self._baseline_pairs:
+                value = get(key)
+                features.append((value - mean) / std if value is not None and std else 0)
         
         # Temporal features (if history available)
-        if len(self.feature_history) > 0:
-            recent = list(self.feature_history)[-5:]  # Last 5 samples
-            if HAS_NUMPY and len(recent) > 1:
-                recent_array = np.array(recent)
-                features.append(np.mean(recent_array[:, 0]))  # Mean process count
-                features.append(np.std(recent_array[:, 0]))   # Std process count
-                features.append(np.mean(recent_array[:, 1]))  # Mean network
-            else:
-                features.extend([0, 0, 0])
-        else:
-            features.extend([0, 0, 0])
+        features.extend(self._temporal_features())
         
-        return np.array(features) if HAS_NUMPY else features
+        return np.asarray(features, dtype=np.float32) if HAS_NUMPY else features
+    
+    @property
+    def history_len(self):
+        """Number of samples currently held in the feature history"""
+        return min(self._hist_n, HISTORY_SIZE)
+    
+    def _record_features(self, features):
+        """Append a sample to the feature history ring"""
+        if HAS_NUMPY:
+            self._hist[self._hist_n % HISTORY_SIZE, :len(features)] = features
+        self._hist_n += 1
+    
+    def _temporal_features(self):
+        """Mean/std process count and mean network over the last 5 samples"""
+        n = min(self._hist_n, 5)  # Last 5 samples
+        if HAS_NUMPY and n > 1:
+            idx = np.arange(self._hist_n - n, self._hist_n) % HISTORY_SIZE
+            recent = self._hist[idx, :2]
+            return [
+                recent[:, 0].mean(),  # Mean process count
+                recent[:, 0].std(),   # Std process count
+                recent[:, 1].mean()   # Mean network
+            ]
+        return [0, 0, 0]
+    
+    def extract_features_batch(self, metrics_list):
+        """Feature matrix for many samples at once (numpy required)
+        
+        Rows match extract_features; the temporal columns depend only on the
+        current history, so they are computed once and broadcast.
+        """
+        nan = float("nan")
+        rows = []
+        for metrics in metrics_list:
+            try:
+                get = metrics.get
+                rows.append([float(get(key, nan)) for key in FEATURE_KEYS])
+            except (AttributeError, TypeError, ValueError):
+                continue
+        
+        raw = np.array(rows, dtype=np.float64).reshape(len(rows), len(FEATURE_KEYS))
+        missing = np.isnan(raw)
+        base = np.where(missing, 0.0, raw)
+        parts = [base]
+        
+        # Derived features: z-scores as one broadcast op; missing or std 0 -> 0
+        if self.baseline_metrics:
+            keys, means, stds = zip(*self._baseline_pairs)
+            cols = [FEATURE_KEYS.index(key) for key in keys]
+            stds = np.array(stds, dtype=np.float64)
+            z = np.zeros((len(rows), len(cols)))
+            np.divide(base[:, cols] - np.array(means, dtype=np.float64), stds,
+                      out=z, where=(stds > 0) & ~missing[:, cols])
+            parts.append(z)
+        
+        temporal = np.array(self._temporal_features(), dtype=np.float64)
+        parts.append(np.broadcast_to(temporal, (len(rows), temporal.size)))
+        
+        return np.hstack(parts).astype(np.float32, copy=False)
     
     def train_anomaly_model(self, data_dir=None, force_retrain=False):
         """Train anomaly detection model"""
@@ -133,9 +415,7 @@ class MLSecurityEngine:
         if model_file.exists() and not force_retrain:
             try:
                 self.anomaly_model = joblib.load(model_file)
-                scaler_file = self.models_dir / "scaler.pkl"
-                if scaler_file.exists():
-                    self.scaler = joblib.load(scaler_file)
+                self._load_scaler()
                 return True
             except:
                 pass
@@ -150,68 +430,51 @@ class MLSecurityEngine:
             return False
         
         # Load historical metrics
-        metrics_files = sorted(data_path.glob("metrics_*.json"), reverse=True)[:100]
+        metrics_files = _recent_metrics_files(data_path, 100)
         
         if len(metrics_files) < 10:
             return False
         
-        X_train = []
-        for mfile in metrics_files:
-            try:
-                with open(mfile, 'r') as f:
-                    metrics = json.load(f)
-                features = self.extract_features(metrics)
-                if HAS_NUMPY:
-                    X_train.append(features)
-                else:
-                    X_train.append(features)
-            except:
-                continue
+        if not HAS_NUMPY:
+            return False
+        
+        # One feature matrix for all samples
+        X_train = self.extract_features_batch(_load_metrics_many(metrics_files))
         
         if len(X_train) < 10:
             return False
         
-        # Convert to numpy array
-        if HAS_NUMPY:
-            X_train = np.array(X_train)
-            
-            # Scale features
-            self.scaler = RobustScaler()
-            X_train_scaled = self.scaler.fit_transform(X_train)
-            
-            # Train Isolation Forest (best for anomaly detection)
-            self.anomaly_model = IsolationForest(
-                contamination=0.1,
-                random_state=42,
-                n_estimators=100,
-                max_samples='auto'
-            )
-            self.anomaly_model.fit(X_train_scaled)
-            
-            # Save models
-            joblib.dump(self.anomaly_model, model_file)
-            joblib.dump(self.scaler, self.models_dir / "scaler.pkl")
-            
-            return True
+        # Scale features against the baseline (float32 end to end: the
+        # trees use float32 anyway)
+        self.scaler = BaselineScaler.from_baseline(self._baseline_pairs)
+        X_train_scaled = self.scaler.transform(X_train)
         
-        return False
+        # Train Isolation Forest (best for anomaly detection)
+        self.anomaly_model = IsolationForest(
+            contamination=0.1,
+            random_state=42,
+            n_estimators=100,
+            max_samples='auto'
+        )
+        self.anomaly_model.fit(X_train_scaled)
+        
+        # Save models
+        joblib.dump(self.anomaly_model, model_file, compress=MODEL_COMPRESS)
+        self.scaler.save(self.models_dir / "scaler.npz")
+        
+        return True
     
     def detect_anomalies_ml(self, metrics_file):
         """Detect anomalies using trained ML model"""
-        try:
-            with open(metrics_file, 'r') as f:
-                metrics = json.load(f)
-        except:
+        metrics = _load_metrics(metrics_file)
+        if metrics is None:
             return "ERROR"
         
         # Extract features
         features = self.extract_features(metrics)
         
         # Add to history
-        if HAS_NUMPY:
-            self.feature_history.append(features)
-        else:
-            self.feature_history.append(features)
+        self._record_features(features)
         
         # Use trained model if available
         if self.anomaly_model is not None and self.scaler is not None and HAS_SKLEARN:
@@ -219,15 +482,23 @@ class MLSecurityEngine:
                 if HAS_NUMPY:
                     features_array = np.array([features])
                     features_scaled = self.scaler.transform(features_array)
-                    prediction = self.anomaly_model.predict(features_scaled)[0]
-                    score = self.anomaly_model.score_samples(features_scaled)[0]
+                    # One pass over the trees: predict() is the sign of
+                    # decision_function, and score_samples() = decision + offset_
+                    decision = self.anomaly_model.decision_function(features_scaled)[0]
                     
-                    if prediction == -1:  # Anomaly
+                    if decision < 0:  # Anomaly
+                        score = decision + getattr(self.anomaly_model, "offset_", 0.0)
                         return f"ML Anomaly detected (score: {score:.2f})"
             except Exception as e:
                 pass  # Fall back to statistical
         
         # Statistical fallback
+        if self._zscore_names is not None:
+            anomalies = self._zscore_anomalies(metrics)
+            if anomalies:
+                return f"Anomaly: {', '.join(anomalies[:3])}"
+            return "NORMAL"
+        
         anomalies = []
         for metric_name, value in metrics.items():
             if metric_name == "timestamp" or metric_name not in self.baseline_metrics:
@@ -269,33 +540,22 @@ class MLSecurityEngine:
         if not data_path.exists():
             return []
         
-        metrics_files = sorted(data_path.glob("metrics_*.json"), reverse=True)[:50]
+        metrics_files = _recent_metrics_files(data_path, 50)
         
         if len(metrics_files) < 5:
             return []
         
-        X = []
-        for mfile in metrics_files:
-            try:
-                with open(mfile, 'r') as f:
-                    metrics = json.load(f)
-                features = self.extract_features(metrics)
-                X.append(features)
-            except:
-                continue
+        X = self.extract_features_batch(_load_metrics_many(metrics_files))
         
         if len(X) < 5:
             return []
         
-        X = np.array(X)
-        
         # Use DBSCAN for clustering (finds arbitrary shaped clusters)
         try:
-            if self.scaler:
-                X_scaled = self.scaler.transform(X)
-            else:
-                self.scaler = StandardScaler()
-                X_scaled = self.scaler.fit_transform(X)
+            # DBSCAN's eps needs every column on one scale; the baseline
+            # scaler leaves columns without a baseline raw, so fit a
+            # standard scaler on the clustering data itself
+            X_scaled = StandardScaler().fit_transform(X)
             
             clusterer = DBSCAN(eps=0.5, min_samples=3)
             clusters = clusterer.fit_predict(X_scaled)
@@ -328,7 +588,7 @@ class MLSecurityEngine:
         if not data_path.exists():
             return "No historical data"
         
-        metrics_files = sorted(data_path.glob("metrics_*.json"), reverse=True)[:20]
+        metrics_files = _recent_metrics_files(data_path, 20)
         
         if len(metrics_files) < 5:
             return "Insufficient data"
@@ -338,13 +598,11 @@ class MLSecurityEngine:
         network_counts = []
         timestamps = []
         
-        for mfile in metrics_files:
+        for data in _load_metrics_many(metrics_files):
             try:
-                with open(mfile, 'r') as f:
-                    data = json.load(f)
-                    process_counts.append(data.get("process_count", 0))
-                    network_counts.append(data.get("network_connections", 0))
-                    timestamps.append(data.get("timestamp", ""))
+                process_counts.append(data.get("process_count", 0))
+                network_counts.append(data.get("network_connections", 0))
+                timestamps.append(data.get("timestamp", ""))
             except:
                 continue
         
@@ -352,17 +610,11 @@ class MLSecurityEngine:
             return "Insufficient data"
         
         # Linear regression for trend prediction
-        x = np.arange(len(process_counts))
-        
         # Process count trend
-        process_coef = np.polyfit(x, process_counts, 1)
-        process_trend = process_coef[0]
-        process_next = np.polyval(process_coef, len(process_counts))
+        process_trend, process_next = _linfit(process_counts)
         
         # Network trend
-        network_coef = np.polyfit(x, network_counts, 1)
-        network_trend = network_coef[0]
-        network_next = np.polyval(network_coef, len(network_counts))
+        network_trend, network_next = _linfit(network_counts)
         
         predictions = []
         
@@ -389,17 +641,15 @@ class MLSecurityEngine:
         if not HAS_SKLEARN:
             return False
         
-        try:
-            with open(metrics_file, 'r') as f:
-                metrics = json.load(f)
-        except:
+        metrics = _load_metrics(metrics_file)
+        if metrics is None:
             return False
         
         features = self.extract_features(metrics)
         
         # Add to history
         if HAS_NUMPY:
-            self.feature_history.append(features)
+            self._record_features(features)
         
         # Update baseline if normal
         if not is_anomaly and self.baseline_metrics:
@@ -417,25 +667,65 @@ class MLSecurityEngine:
                     diff = abs(metrics[key] - new_mean)
                     new_std = alpha * diff + (1 - alpha) * old_std
                     baseline["std"] = new_std
+            self._cache_baseline()
         
-        # Retrain model periodically (every 50 samples)
-        if len(self.feature_history) % 50 == 0 and len(self.feature_history) >= 50:
-            self.train_anomaly_model(force_retrain=True)
+        # Refit periodically (every REFIT_EVERY samples) from memory
+        if HAS_NUMPY and self._hist_n - self._last_fit_n >= REFIT_EVERY:
+            self._refit_from_history()
         
         return True
     
+    def _refit_from_history(self):
+        """Refit the anomaly model on the in-memory history window
+        
+        Replaces reloading and re-parsing up to 100 metrics files. The
+        existing scaler is reused as-is (built from the baseline if missing);
+        the new model is swapped in whole and persisted on a background thread.
+        """
+        window = self._hist[:self.history_len]
+        
+        if self.scaler is None:
+            self.scaler = BaselineScaler.from_baseline(self._baseline_pairs)
+            self.scaler.save(self.models_dir / "scaler.npz")
+        window_scaled = np.asarray(self.scaler.transform(window), dtype=np.float32)
+        
+        model = IsolationForest(
+            contamination=0.1,
+            random_state=42,
+            n_estimators=100,
+            max_samples='auto'
+        )
+        model.fit(window_scaled)
+        
+        self.anomaly_model = model
+        self._last_fit_n = self._hist_n
+        to_save = [(model, self.models_dir / "anomaly_model.pkl")]
+        
+        threading.Thread(target=self._dump_models, args=(to_save,), daemon=True).start()
+    
+    @staticmethod
+    def _dump_models(items):
+        """Write (model, path) pairs via temp file + rename so readers never
+        see a partial pickle"""
+        for model, path in items:
+            tmp_path = path.with_suffix(".tmp")
+            joblib.dump(model, tmp_path, compress=MODEL_COMPRESS)
+            os.replace(tmp_path, path)
+    
     def save_models(self):
         """Save all models"""
         if self.anomaly_model and HAS_SKLEARN:
-            joblib.dump(self.anomaly_model, self.models_dir / "anomaly_model.pkl")
-        if self.scaler and HAS_SKLEARN:
-            joblib.dump(self.scaler, self.models_dir / "scaler.pkl")
+            joblib.dump(self.anomaly_model, self.models_dir / "anomaly_model.pkl", compress=MODEL_COMPRESS)
+        if isinstance(self.scaler, BaselineScaler):
+            self.scaler.save(self.models_dir / "scaler.npz")
+        elif self.scaler and HAS_SKLEARN:
+            joblib.dump(self.scaler, self.models_dir / "scaler.pkl", compress=MODEL_COMPRESS)
         
         # Save baseline
         baseline_file = Path.home() / ".macguardian" / "ai" / "baseline.json"
         baseline_file.parent.mkdir(parents=True, exist_ok=True)
-        with open(baseline_file, 'w') as f:
-            json.dump(self.baseline_metrics, f, indent=2)
+        with open(baseline_file, 'wb') as f:
+            f.write(_json_dumps_bytes(self.baseline_metrics))
     
     def load_models(self):
         """Load saved models"""
@@ -443,15 +733,22 @@ class MLSecurityEngine:
             return
         
         model_file = self.models_dir / "anomaly_model.pkl"
-        scaler_file = self.models_dir / "scaler.pkl"
         
         try:
             if model_file.exists():
                 self.anomaly_model = joblib.load(model_file)
-            if scaler_file.exists():
-                self.scaler = joblib.load(scaler_file)
+            self._load_scaler()
         except:
             pass
+    
+    def _load_scaler(self):
+        """Load the saved scaler, falling back to a legacy sklearn pickle"""
+        scaler_file = self.models_dir / "scaler.npz"
+        legacy_file = self.models_dir / "scaler.pkl"
+        if scaler_file.exists() and HAS_NUMPY:
+            self.scaler = BaselineScaler.load(scaler_file)
+        elif legacy_file.exists():
+            self.scaler = joblib.load(legacy_file)
 
 
 def main():
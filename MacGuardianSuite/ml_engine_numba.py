@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+ML Engine - Numba kernels
+JIT-compiled statistical fallback used by ml_engine when numba is installed
+"""
+
+import numpy as np
+from numba import njit
+
+
+@njit(cache=True)
+def zscore_scan(values, means, stds, threshold):
+    """Return (indices, |z| scores) of values whose |z| exceeds threshold
+
+    stds must be positive; NaN values (metric missing) never match.
+    Matches are in index order.
+    """
+    n = values.size
+    hits = np.empty(n, dtype=np.int64)
+    scores = np.empty(n, dtype=np.float64)
+    count = 0
+
+    for i in range(n):
+        z = abs((values[i] - means[i]) / stds[i])
+        if z > threshold:
+            hits[count] = i
+            scores[count] = z
+            count += 1
+
+    return hits[:count], scores[:count]
@@ -7,27 +7,93 @@ Provides predictive analysis, anomaly detection, and intelligent recommendations
 import sys
 import json
 import os
+import copy
+import hashlib
 from datetime import datetime, timedelta
-from collections import defaultdict
+from collections import Counter, OrderedDict
 import statistics
 
-def calculate_risk_score(events, historical_data=None):
-    """Calculate overall risk score (0-100)"""
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+try:
+    from ml_insights_numba import baseline_stats
+    HAS_NUMBA = HAS_NUMPY
+except ImportError:
+    HAS_NUMBA = False
+
+# Severity levels interned to small integer codes; unknown severities get
+# the last code (weight 0)
+SEVERITY_WEIGHTS = {
+    "critical": 10,
+    "high": 5,
+    "medium": 2,
+    "low": 1,
+    "info": 0
+}
+_SEVERITY_CODES = {name: code for code, name in enumerate(SEVERITY_WEIGHTS)}
+_UNKNOWN_SEVERITY = len(SEVERITY_WEIGHTS)
+_SEVERITY_WEIGHT_VECTOR = (
+    np.array(list(SEVERITY_WEIGHTS.values()) + [0], dtype=np.int64) if HAS_NUMPY else None
+)
+# Scalar path: the levels' first letters are distinct, so the letter indexes
+# the level and its weight directly
+_SEVERITY_INITIALS = "".join(name[0] for name in SEVERITY_WEIGHTS)
+_SEVERITY_LEVELS = tuple(SEVERITY_WEIGHTS)
+_SEVERITY_WEIGHT_TUPLE = tuple(SEVERITY_WEIGHTS.values())
+
+def _severity_weight(severity):
+    """Weight of a severity string (case-insensitive, unknown -> 0)"""
+    code = _SEVERITY_INITIALS.find(severity[:1])
+    if code >= 0 and severity == _SEVERITY_LEVELS[code]:
+        return _SEVERITY_WEIGHT_TUPLE[code]  # Already lowercase: no .lower() copy
+    return SEVERITY_WEIGHTS.get(severity.lower(), 0)
+
+# Summaries kept for repeated scans of the same state (fingerprint -> insights)
+INSIGHTS_CACHE_SIZE = 64
+_insights_cache = OrderedDict()
+
+def _scan_events(events):
+    """One walk over events for everything the summary needs from them
+    
+    Counts (category, severity) pairs in C via Counter, then derives the
+    severity score total and the category histogram from the few distinct
+    pairs.
+    """
+    pairs = Counter((e.get("category", "unknown"), e.get("severity", "info")) for e in events)
+    total_score = 0
+    category_counts = Counter()
+    for (category, severity), count in pairs.items():
+        total_score += _severity_weight(severity) * count
+        category_counts[category] += count
+    return {"total_score": total_score, "category_counts": category_counts}
+
+def calculate_risk_score(events, historical_data=None, scan=None):
+    """Calculate overall risk score (0-100)
+    
+    scan is an optional _scan_events result for these events, reused
+    instead of walking them again.
+    """
     if not events:
         return 0
     
-    severity_weights = {
-        "critical": 10,
-        "high": 5,
-        "medium": 2,
-        "low": 1,
-        "info": 0
-    }
-    
-    total_score = 0
-    for event in events:
-        severity = event.get("severity", "info").lower()
-        total_score += severity_weights.get(severity, 0)
+    if scan is not None:
+        total_score = scan["total_score"]
+    elif HAS_NUMPY:
+        # One code per event, then a histogram of codes dotted with the weights
+        code_of = _SEVERITY_CODES.get
+        codes = np.fromiter(
+            (code_of(event.get("severity", "info").lower(), _UNKNOWN_SEVERITY) for event in events),
+            dtype=np.int8,
+            count=len(events)
+        )
+        counts = np.bincount(codes, minlength=_UNKNOWN_SEVERITY + 1)
+        total_score = int(counts @ _SEVERITY_WEIGHT_VECTOR)
+    else:
+        total_score = sum(_severity_weight(event.get("severity", "info")) for event in events)
     
     # Normalize to 0-100
     max_possible = len(events) * 10
@@ -45,15 +111,21 @@ def detect_anomalies(current_events, historical_data=None):
     if len(historical_counts) < 3:
         return []
     
-    mean_count = statistics.mean(historical_counts)
-    std_dev = statistics.stdev(historical_counts) if len(historical_counts) > 1 else 0
-    
     current_count = len(current_events)
     
+    if HAS_NUMBA:
+        mean_count, std_dev, spike = baseline_stats(
+            np.asarray(historical_counts, dtype=np.float64), current_count
+        )
+    else:
+        mean_count = statistics.mean(historical_counts)
+        std_dev = statistics.stdev(historical_counts) if len(historical_counts) > 1 else 0
+        spike = std_dev > 0 and current_count > mean_count + (2 * std_dev)
+    
     anomalies = []
     
     # Detect spike in issues
-    if std_dev > 0 and current_count > mean_count + (2 * std_dev):
+    if spike:
         anomalies.append({
             "type": "issue_spike",
             "severity": "high",
@@ -62,10 +134,8 @@ def detect_anomalies(current_events, historical_data=None):
         })
     
     # Detect new attack patterns
-    current_categories = set(e.get("category", "unknown") for e in current_events)
-    historical_categories = set()
-    for h in historical_data:
-        historical_categories.update(h.get("categories", []))
+    current_categories = {e.get("category", "unknown") for e in current_events}
+    historical_categories = set().union(*(h.get("categories", ()) for h in historical_data))
     
     new_categories = current_categories - historical_categories
     if new_categories:
@@ -78,6 +148,21 @@ def detect_anomalies(current_events, historical_data=None):
     
     return anomalies
 
+def _trend_line(values):
+    """Least-squares (slope, intercept) of values against 0..n-1"""
+    n = len(values)
+    x_mean = (n - 1) / 2
+    if HAS_NUMPY:
+        y = np.asarray(values, dtype=np.float64)
+        dx = np.arange(n) - x_mean
+        y_mean = y.mean()
+        slope = float(dx @ (y - y_mean) / (dx @ dx))
+    else:
+        y_mean = sum(values) / n
+        dxs = [i - x_mean for i in range(n)]
+        slope = sum(dx * (y - y_mean) for dx, y in zip(dxs, values)) / sum(dx * dx for dx in dxs)
+    return slope, y_mean - slope * x_mean
+
 def predict_future_risks(historical_data):
     """Simple predictive analysis"""
     if not historical_data or len(historical_data) < 7:
@@ -90,19 +175,25 @@ def predict_future_risks(historical_data):
     if len(issue_counts) < 2:
         return None
     
-    # Calculate trend
-    trend = (issue_counts[-1] - issue_counts[0]) / len(issue_counts)
+    # Calculate trend: least-squares slope over the whole window, so one
+    # noisy endpoint does not flip it
+    trend, intercept = _trend_line(issue_counts)
     
+    # Extrapolate the fitted line 7 samples past the last one
     prediction = {
         "trend": "increasing" if trend > 0.5 else "decreasing" if trend < -0.5 else "stable",
-        "predicted_next_week": max(0, round(issue_counts[-1] + trend * 7)),
+        "predicted_next_week": max(0, round(intercept + trend * (len(issue_counts) - 1 + 7))),
         "confidence": "medium"
     }
     
     return prediction
 
-def generate_ai_recommendations(events, risk_score, anomalies=None, prediction=None):
-    """Generate intelligent recommendations using AI/ML insights"""
+def generate_ai_recommendations(events, risk_score, anomalies=None, prediction=None,
+                                category_counts=None):
+    """Generate intelligent recommendations using AI/ML insights
+    
+    category_counts is an optional precomputed category histogram of events.
+    """
     recommendations = []
     
     # Risk-based recommendations
@@ -142,9 +233,10 @@ def generate_ai_recommendations(events, risk_score, anomalies=None, prediction=N
         })
     
     # Category-specific recommendations
-    categories = defaultdict(int)
-    for event in events:
-        categories[event.get("category", "unknown")] += 1
+    if category_counts is not None:
+        categories = category_counts
+    else:
+        categories = Counter(event.get("category", "unknown") for event in events)
     
     if categories.get("malware", 0) > 0:
         recommendations.append({
@@ -172,12 +264,47 @@ def generate_ai_recommendations(events, risk_score, anomalies=None, prediction=N
     
     return recommendations
 
+def _summary_fingerprint(events, historical_data):
+    """Digest of everything generate_ml_summary reads: each event's
+    (category, severity), order-free, and the historical counts/categories"""
+    event_keys = sorted(
+        repr((e.get("category", "unknown"), e.get("severity", "info"))) for e in events
+    )
+    history_keys = [
+        (h.get("issue_count", 0), h.get("categories", [])) for h in historical_data or ()
+    ]
+    payload = json.dumps([event_keys, history_keys], default=repr).encode()
+    return hashlib.blake2b(payload, digest_size=16).digest()
+
+def insights_cache_clear():
+    """Drop all memoized summaries"""
+    _insights_cache.clear()
+
 def generate_ml_summary(events, historical_data=None):
+    """Generate ML-powered summary (memoized on an event-set fingerprint)"""
+    key = _summary_fingerprint(events, historical_data)
+    insights = _insights_cache.get(key)
+    if insights is None:
+        insights = _compute_ml_summary(events, historical_data)
+        _insights_cache[key] = insights
+        if len(_insights_cache) > INSIGHTS_CACHE_SIZE:
+            _insights_cache.popitem(last=False)  # Evict oldest
+    else:
+        _insights_cache.move_to_end(key)
+    
+    # Callers own the returned dict; the cached one stays pristine
+    return copy.deepcopy(insights)
+
+def _compute_ml_summary(events, historical_data=None):
     """Generate ML-powered summary"""
-    risk_score = calculate_risk_score(events, historical_data)
+    scan = _scan_events(events)
+    risk_score = calculate_risk_score(events, historical_data, scan=scan)
     anomalies = detect_anomalies(events, historical_data) if historical_data else []
     prediction = predict_future_risks(historical_data) if historical_data else None
-    recommendations = generate_ai_recommendations(events, risk_score, anomalies, prediction)
+    recommendations = generate_ai_recommendations(
+        events, risk_score, anomalies, prediction,
+        category_counts=scan["category_counts"]
+    )
     
     return {
         "risk_score": risk_score,
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+ML Insights - Numba kernels
+JIT-compiled baseline statistics used by ml_insights when numba is installed
+"""
+
+import math
+
+from numba import njit
+
+
+@njit(cache=True)
+def baseline_stats(counts, current):
+    """Return (mean, sample std, spike flag) of historical issue counts
+
+    Two passes (sum, then squared deviations from the mean) keep the mean
+    correctly rounded, as statistics.mean gives it; spike is
+    current > mean + 2 * std with std > 0.
+    """
+    n = counts.size
+    total = 0.0
+    for i in range(n):
+        total += counts[i]
+    mean = total / n
+
+    m2 = 0.0
+    for i in range(n):
+        delta = counts[i] - mean
+        m2 += delta * delta
+
+    std = math.sqrt(m2 / (n - 1)) if n > 1 else 0.0
+    spike = std > 0 and current > mean + 2 * std
+    return mean, std, spike
@@ -13,7 +13,15 @@ import sys
 # Add current directory to path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from event_bus import get_event_bus
+
+def _coerce(value: str):
+    """Config value -> bool for true/false, list for comma-separated, else str"""
+    lowered = value.lower()
+    if lowered in ("true", "false"):
+        return lowered == "true"
+    if "," in value:
+        return [v.strip() for v in value.split(",")]
+    return value
 
 
 class ModuleManager:
@@ -24,19 +32,34 @@ class ModuleManager:
         self.config = self._load_config()
         self.collectors = []
         self.outputs = []
-        self.event_bus = get_event_bus()
+        self._event_bus = None
+    
+    @property
+    def event_bus(self) -> "EventBus":
+        """Global event bus, imported and created on first use so config-only
+        callers never load it"""
+        if self._event_bus is None:
+            from event_bus import get_event_bus
+            self._event_bus = get_event_bus()
+        return self._event_bus
+    
+    @event_bus.setter
+    def event_bus(self, bus: "EventBus"):
+        self._event_bus = bus
         
     def _load_config(self) -> Dict:
         """Load module configuration"""
         if not self.config_file.exists():
             return self._default_config()
         
-        # Simple INI-like parser
+        # Single-pass INI-like parser (configparser is several times slower
+        # on a file this size); a line it cannot use is skipped with a
+        # warning instead of failing the whole file
         config = {}
         current_section = None
         
         with open(self.config_file, "r") as f:
-            for line in f:
+            for lineno, line in enumerate(f, 1):
                 line = line.strip()
                 if not line or line.startswith("#"):
                     continue
@@ -44,19 +67,15 @@ class ModuleManager:
                 if line.startswith("[") and line.endswith("]"):
                     current_section = line[1:-1]
                     config[current_section] = {}
-                elif "=" in line and current_section:
-                    key, value = line.split("=", 1)
-                    key = key.strip()
-                    value = value.strip()
-                    
-                    # Parse boolean
-                    if value.lower() in ("true", "false"):
-                        value = value.lower() == "true"
-                    # Parse list
-                    elif "," in value:
-                        value = [v.strip() for v in value.split(",")]
-                    
-                    config[current_section][key] = value
+                    continue
+                
+                key, sep, value = line.partition("=")
+                key = key.strip()
+                if not sep or not key or current_section is None:
+                    print(f"⚠️  {self.config_file}:{lineno}: ignoring line: {line}")
+                    continue
+                
+                config[current_section][key] = _coerce(value.strip())
         
         return config
     
@@ -148,6 +167,11 @@ class ModuleManager:
             collector.stop()
         
         self.event_bus.stop()
+        
+        for output in self.outputs:
+            close = getattr(output, "close", None)
+            if close is not None:
+                close()
     
     def get_status(self) -> Dict:
         """Get status of all modules"""
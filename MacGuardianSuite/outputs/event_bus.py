@@ -9,16 +9,66 @@ import json
 import sys
 import os
 import asyncio
+import inspect
 import websockets
 import socket
+import struct
 import uuid
 import re
+import time
+from itertools import islice
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Any, Optional
-from dataclasses import dataclass, asdict
+from typing import Deque, Dict, List, Any, Optional
+from dataclasses import dataclass, field, fields
 import signal
 
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+try:
+    import uvloop
+    HAS_UVLOOP = True
+except ImportError:
+    HAS_UVLOOP = False
+
+
+def _json_dumps_bytes(obj) -> bytes:
+    """Serialize to compact UTF-8 JSON bytes (orjson produces bytes natively)"""
+    if HAS_ORJSON:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, separators=(',', ':')).encode()
+
+
+# Connection class -> send() kwargs; {"text": True} where send() can emit
+# pre-encoded UTF-8 bytes as a text frame (websockets >= 14)
+_SEND_KWARGS: Dict[type, Dict[str, Any]] = {}
+
+def _send_kwargs(client) -> Dict[str, Any]:
+    """send() kwargs for a client; without text support bytes go out as
+    binary frames, which LiveUpdateService also decodes"""
+    cls = type(client)
+    kwargs = _SEND_KWARGS.get(cls)
+    if kwargs is None:
+        try:
+            params = inspect.signature(cls.send).parameters
+        except (TypeError, ValueError):
+            params = {}
+        kwargs = _SEND_KWARGS[cls] = {"text": True} if "text" in params else {}
+    return kwargs
+
+
+def _json_loads(data: bytes):
+    """Parse JSON bytes, preferring orjson (its errors subclass json.JSONDecodeError)"""
+    if HAS_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data.decode('utf-8'))
+
 # Configuration
 EVENT_DIR = Path.home() / ".macguardian" / "events"
 LOG_DIR = Path.home() / ".macguardian" / "logs"
@@ -26,12 +76,81 @@ UDS_SOCKET = "/tmp/macguardian.sock"
 WS_PORT = 9765
 WS_HOST = "localhost"
 MAX_EVENTS_CACHE = 1000
+BROADCAST_QUEUE_SIZE = 10000  # Events awaiting broadcast; oldest dropped when full
+BROADCAST_BATCH = 64  # Max events the broadcaster sends per wake-up
+UDS_LEGACY_READ = 4096  # Max size of a one-shot (unframed) UDS event
+UDS_MAX_FRAME = 1 << 20  # Max payload of one framed UDS event
+EVENT_LOG_BUFFER = 1 << 16  # Write buffer of the daily event log
+EVENT_LOG_FLUSH_INTERVAL = 1.0  # Max seconds an event waits before its batch is written
+EVENT_LOG_FSYNC = True  # fsync the event log once per batch write
+
+# Event Spec v1.0.0 validation
+_UUID_RE = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-4[0-9a-f]{3}-[89ab][0-9a-f]{3}-[0-9a-f]{12}$')
+_ISO8601_RE = re.compile(r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d{1,3})?Z?$')
+_VALID_TYPES = frozenset({
+    'process_anomaly', 'network_connection', 'dns_request',
+    'file_integrity_change', 'cron_modification', 'ssh_key_change',
+    'tcc_permission_change', 'user_account_change', 'signature_hit',
+    'ids_alert', 'privacy_event', 'ransomware_activity', 'config_change'
+})
+_VALID_SEVERITIES = frozenset({'low', 'medium', 'high', 'critical'})
+
+# Event Spec v1.0.0 event types to source mapping
+_SOURCE_MAP = {
+    'file_integrity_change': 'fsevents_watcher',
+    'process_anomaly': 'process_watcher',
+    'network_connection': 'network_watcher',
+    'dns_request': 'network_watcher',
+    'ids_alert': 'ids_engine',
+    'ssh_key_change': 'ssh_auditor',
+    'user_account_change': 'user_account_auditor',
+    'cron_modification': 'cron_auditor',
+    'tcc_permission_change': 'tcc_auditor',
+    'privacy_event': 'tcc_auditor',
+    'ransomware_activity': 'ransomware_detector',
+    'signature_hit': 'signature_engine',
+    'config_change': 'config_manager'
+}
+
+# Also support legacy types for backward compatibility
+_LEGACY_SOURCE_MAP = {
+    'filesystem': 'fsevents_watcher',
+    'fs': 'fsevents_watcher',
+    'process': 'process_watcher',
+    'network': 'network_watcher',
+    'ids': 'ids_engine',
+    'correlation': 'ids_engine',
+    'ssh': 'ssh_auditor',
+    'user_accounts': 'user_account_auditor',
+    'cron': 'cron_auditor',
+    'tcc_privacy': 'tcc_auditor',
+    'privacy': 'tcc_auditor',
+    'ransomware': 'ransomware_detector',
+    'signature': 'signature_engine'
+}
+
+# One lookup for _infer_source (Event Spec types win on a clash)
+_INFERRED_SOURCES = {**_LEGACY_SOURCE_MAP, **_SOURCE_MAP}
+
+# The schema is fixed at import, so the four checks are compiled into one
+# expression with the matchers and enums bound as default arguments
+_VALIDATOR_SRC = (
+    "def _validate_spec(event_id, event_type, severity, timestamp,\n"
+    "                   _uuid=_UUID_RE.match, _iso=_ISO8601_RE.match,\n"
+    "                   _types=_VALID_TYPES, _severities=_VALID_SEVERITIES):\n"
+    "    return bool(_uuid(event_id.lower()) and event_type in _types\n"
+    "                and severity in _severities and _iso(timestamp))\n"
+)
+exec(compile(_VALIDATOR_SRC, "<event_spec_validator>", "exec"), globals())
 
 # Ensure directories exist
 EVENT_DIR.mkdir(parents=True, exist_ok=True)
 LOG_DIR.mkdir(parents=True, exist_ok=True)
 
-@dataclass
+# __slots__ instances (no per-event __dict__) where dataclasses support it
+_DATACLASS_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+@dataclass(**_DATACLASS_SLOTS)
 class Event:
     """Event Spec v1.0.0 compliant event structure"""
     event_id: str
@@ -41,9 +160,19 @@ class Event:
     source: str  # process_watcher, network_watcher, etc.
     message: str
     context: Dict[str, Any]
+    # to_json_bytes() result, serialized on first use (events are not
+    # modified after normalization)
+    _json: Optional[bytes] = field(default=None, init=False, repr=False, compare=False)
     
     def to_json(self) -> str:
         """Convert to Event Spec v1.0.0 JSON format"""
+        return self.to_json_bytes().decode()
+    
+    def to_json_bytes(self) -> bytes:
+        """Event Spec v1.0.0 JSON as UTF-8 bytes, encoded once per event"""
+        if self._json is not None:
+            return self._json
+        
         event_dict = {
             "event_id": self.event_id,
             "event_type": self.type,
@@ -52,7 +181,12 @@ class Event:
             "source": self.source,
             "context": {**self.context, "message": self.message} if self.message else self.context
         }
-        return json.dumps(event_dict)
+        self._json = _json_dumps_bytes(event_dict)
+        return self._json
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Field name -> value (shallow; unlike asdict, context is not deep-copied)"""
+        return {name: getattr(self, name) for name in _EVENT_FIELDS}
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'Event':
@@ -70,14 +204,30 @@ class Event:
             context=context
         )
 
+_EVENT_FIELDS = tuple(f.name for f in fields(Event) if f.init)
+
 class EventBus:
     """Central event bus for MacGuardian"""
     
     def __init__(self):
-        self.event_cache: List[Event] = []
+        self.event_cache: Deque[Event] = deque(maxlen=MAX_EVENTS_CACHE)
         self.websocket_clients: set = set()
         self.running = True
         
+        # Append-only JSONL event log, one file per UTC day. Inside the event
+        # loop, lines collect in _log_pending and each batch is written (one
+        # write, one flush, one fsync) on a single worker thread, in order
+        self._log_fh = None
+        self._log_day = None
+        self._log_pending: List[bytes] = []
+        self._log_flush_pending = False
+        self._io_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="event-log")
+        
+        # Ingest -> broadcaster hand-off, created in run() so it binds to the
+        # running loop (before 3.10 a Queue binds to the loop current at
+        # construction time)
+        self._broadcast_q: Optional[asyncio.Queue] = None
+        
     def normalize_event(self, raw_data: Dict[str, Any]) -> Event:
         """Normalize event to Event Spec v1.0.0 format"""
         # Event Spec v1.0.0 required fields
@@ -110,80 +260,78 @@ class EventBus:
         )
     
     def _validate_event_spec(self, event_id: str, event_type: str, severity: str, timestamp: str) -> bool:
-        """Validate Event Spec v1.0.0 compliance"""
-        import re
-        
-        # Validate UUID format
-        uuid_pattern = r'^[0-9a-f]{8}-[0-9a-f]{4}-4[0-9a-f]{3}-[89ab][0-9a-f]{3}-[0-9a-f]{12}$'
-        if not re.match(uuid_pattern, event_id.lower()):
-            return False
-        
-        # Validate event_type enum
-        valid_types = [
-            'process_anomaly', 'network_connection', 'dns_request',
-            'file_integrity_change', 'cron_modification', 'ssh_key_change',
-            'tcc_permission_change', 'user_account_change', 'signature_hit',
-            'ids_alert', 'privacy_event', 'ransomware_activity', 'config_change'
-        ]
-        if event_type not in valid_types:
-            return False
-        
-        # Validate severity enum
-        if severity not in ['low', 'medium', 'high', 'critical']:
-            return False
+        """Validate Event Spec v1.0.0 compliance (UUID, type and severity
+        enums, ISO8601 timestamp)"""
+        return _validate_spec(event_id, event_type, severity, timestamp)
+    
+    @staticmethod
+    def _infer_source(event_type: str) -> str:
+        """Infer source from Event Spec v1.0.0 event type (or a legacy type)"""
+        return _INFERRED_SOURCES.get(event_type, 'unknown')
+    
+    def store_event(self, event: Event):
+        """Store event to disk (one line in the daily events-YYYYMMDD.jsonl)
         
-        # Validate ISO8601 timestamp
-        iso8601_pattern = r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d{1,3})?Z?$'
-        if not re.match(iso8601_pattern, timestamp):
-            return False
+        Inside the event loop the line joins the pending batch, which the
+        I/O thread writes within EVENT_LOG_FLUSH_INTERVAL, so a slow disk
+        never stalls ingestion or broadcast; elsewhere it is written and
+        flushed before returning.
+        """
+        line = _json_dumps_bytes(event.to_dict()) + b"\n"
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._write_log_lines([line], fsync=False)
+            return
         
-        return True
+        self._log_pending.append(line)
+        self._schedule_log_flush(loop)
     
-    def _infer_source(self, event_type: str) -> str:
-        """Infer source from Event Spec v1.0.0 event type"""
-        # Event Spec v1.0.0 event types to source mapping
-        source_map = {
-            'file_integrity_change': 'fsevents_watcher',
-            'process_anomaly': 'process_watcher',
-            'network_connection': 'network_watcher',
-            'dns_request': 'network_watcher',
-            'ids_alert': 'ids_engine',
-            'ssh_key_change': 'ssh_auditor',
-            'user_account_change': 'user_account_auditor',
-            'cron_modification': 'cron_auditor',
-            'tcc_permission_change': 'tcc_auditor',
-            'privacy_event': 'tcc_auditor',
-            'ransomware_activity': 'ransomware_detector',
-            'signature_hit': 'signature_engine',
-            'config_change': 'config_manager'
-        }
-        # Also support legacy types for backward compatibility
-        legacy_map = {
-            'filesystem': 'fsevents_watcher',
-            'fs': 'fsevents_watcher',
-            'process': 'process_watcher',
-            'network': 'network_watcher',
-            'ids': 'ids_engine',
-            'correlation': 'ids_engine',
-            'ssh': 'ssh_auditor',
-            'user_accounts': 'user_account_auditor',
-            'cron': 'cron_auditor',
-            'tcc_privacy': 'tcc_auditor',
-            'privacy': 'tcc_auditor',
-            'ransomware': 'ransomware_detector',
-            'signature': 'signature_engine'
-        }
-        return source_map.get(event_type) or legacy_map.get(event_type, 'unknown')
+    def _schedule_log_flush(self, loop: asyncio.AbstractEventLoop):
+        """Submit the pending lines as one batch within EVENT_LOG_FLUSH_INTERVAL"""
+        if self._log_flush_pending:
+            return
+        self._log_flush_pending = True
+        loop.call_later(EVENT_LOG_FLUSH_INTERVAL, self._submit_log_batch)
     
-    def store_event(self, event: Event):
-        """Store event to disk"""
-        event_file = EVENT_DIR / f"event_{datetime.utcnow().strftime('%Y%m%d_%H%M%S_%f')}.json"
+    def _submit_log_batch(self):
+        """Hand every pending line to the I/O thread as a single job"""
+        self._log_flush_pending = False
+        lines, self._log_pending = self._log_pending, []
+        if lines:
+            self._io_pool.submit(self._write_log_lines, lines)
+    
+    def _write_log_lines(self, lines: List[bytes], fsync: bool = EVENT_LOG_FSYNC):
+        """Append lines to today's event log in one write, then flush (and
+        fsync) once; the file rolls daily"""
         try:
-            with open(event_file, 'w') as f:
-                json.dump(asdict(event), f, indent=2)
-        except IOError as e:
+            day = int(time.time()) // 86400
+            if day != self._log_day:
+                self._close_log_file()
+                event_file = EVENT_DIR / f"events-{datetime.utcnow().strftime('%Y%m%d')}.jsonl"
+                self._log_fh = open(event_file, 'ab', buffering=EVENT_LOG_BUFFER)
+                self._log_day = day
+            
+            self._log_fh.write(b"".join(lines))
+            self._log_fh.flush()
+            if fsync:
+                os.fsync(self._log_fh.fileno())
+        except OSError as e:
             print(f"Error storing event: {e}", file=sys.stderr)
     
+    def _close_log_file(self):
+        if self._log_fh is not None:
+            self._log_fh.close()
+        self._log_fh = None
+        self._log_day = None
+    
+    def close_event_log(self):
+        """Write out pending lines and close the current event log file"""
+        lines, self._log_pending = self._log_pending, []
+        if lines:
+            self._write_log_lines(lines)
+        self._close_log_file()
+    
     def add_event(self, raw_data: Dict[str, Any]):
         """Add and broadcast event"""
         event = self.normalize_event(raw_data)
@@ -191,30 +339,66 @@ class EventBus:
         # Store to disk
         self.store_event(event)
         
-        # Add to cache
+        # Add to cache (the deque drops the oldest event when full)
         self.event_cache.append(event)
-        if len(self.event_cache) > MAX_EVENTS_CACHE:
-            self.event_cache.pop(0)
         
-        # Broadcast to WebSocket clients
-        asyncio.create_task(self.broadcast_event(event))
+        # Hand off to the broadcaster; ingestion never waits on clients
+        if self._broadcast_q is None:
+            return
+        try:
+            self._broadcast_q.put_nowait(event)
+        except asyncio.QueueFull:
+            self._broadcast_q.get_nowait()  # Drop the oldest pending event
+            self._broadcast_q.put_nowait(event)
+    
+    async def _broadcaster(self):
+        """Drain the broadcast queue in batches of up to BROADCAST_BATCH"""
+        queue = self._broadcast_q
+        while True:
+            events = [await queue.get()]
+            while len(events) < BROADCAST_BATCH:
+                try:
+                    events.append(queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            
+            if self.websocket_clients:
+                await self._broadcast_messages([event.to_json_bytes() for event in events])
     
     async def broadcast_event(self, event: Event):
         """Broadcast event to all connected WebSocket clients"""
         if not self.websocket_clients:
             return
         
-        message = event.to_json()
-        disconnected = set()
+        await self._broadcast_messages([event.to_json_bytes()])
+    
+    async def _broadcast_messages(self, messages: List[bytes]):
+        """Send messages, in order, to every connected WebSocket client
         
-        for client in self.websocket_clients:
-            try:
-                await client.send(message)
-            except websockets.exceptions.ConnectionClosed:
-                disconnected.add(client)
-            except Exception as e:
-                print(f"Error broadcasting to client: {e}", file=sys.stderr)
-                disconnected.add(client)
+        Each event stays its own message (clients decode one event per
+        message); a batch is serialized and UTF-8 encoded once, then
+        written per client.
+        """
+        async def send_all(client):
+            kwargs = _send_kwargs(client)
+            for message in messages:
+                await client.send(message, **kwargs)
+        
+        # Send to a snapshot of the clients concurrently, so one slow client
+        # delays the broadcast by its own latency only
+        clients = list(self.websocket_clients)
+        results = await asyncio.gather(
+            *(send_all(client) for client in clients),
+            return_exceptions=True
+        )
+        
+        disconnected = set()
+        for client, result in zip(clients, results):
+            if not isinstance(result, Exception):
+                continue
+            if not isinstance(result, websockets.exceptions.ConnectionClosed):
+                print(f"Error broadcasting to client: {result}", file=sys.stderr)
+            disconnected.add(client)
         
         # Remove disconnected clients
         self.websocket_clients -= disconnected
@@ -226,9 +410,10 @@ class EventBus:
         
         try:
             # Send recent events on connect
-            recent_events = self.event_cache[-100:]  # Last 100 events
+            cache = self.event_cache
+            recent_events = list(islice(cache, max(len(cache) - 100, 0), None))  # Last 100 events
             for event in recent_events:
-                await websocket.send(event.to_json())
+                await websocket.send(event.to_json_bytes(), **_send_kwargs(websocket))
             
             # Keep connection alive
             await websocket.wait_closed()
@@ -239,24 +424,54 @@ class EventBus:
             print(f"WebSocket client disconnected: {websocket.remote_address}")
     
     async def handle_uds_client(self, reader, writer):
-        """Handle Unix Domain Socket client (from shell scripts)"""
+        """Handle Unix Domain Socket client (from shell scripts)
+        
+        Two wire formats, told apart by the first byte:
+        - legacy: one JSON event (up to 4 KiB), then the client closes
+        - framed: any number of events on one connection until EOF, each a
+          4-byte big-endian payload length followed by that many bytes of
+          JSON. Lengths are capped at UDS_MAX_FRAME, so a header always
+          starts with a zero byte, which JSON text never does.
+        """
         try:
-            data = await reader.read(4096)
-            if not data:
+            first = await reader.read(1)
+            if not first:
                 return
             
-            # Parse JSON from shell script
-            try:
-                raw_event = json.loads(data.decode('utf-8'))
-                self.add_event(raw_event)
-            except json.JSONDecodeError as e:
-                print(f"Invalid JSON from UDS client: {e}", file=sys.stderr)
+            if first != b"\0":
+                # Legacy: parse JSON from shell script
+                self._ingest_uds_payload(first + await reader.read(UDS_LEGACY_READ - 1))
+                return
+            
+            header = first + await reader.readexactly(3)
+            while True:
+                (length,) = struct.unpack(">I", header)
+                if length > UDS_MAX_FRAME:
+                    print(f"UDS frame too large ({length} bytes), closing", file=sys.stderr)
+                    return
+                self._ingest_uds_payload(await reader.readexactly(length))
+                
+                try:
+                    header = await reader.readexactly(4)
+                except asyncio.IncompleteReadError:
+                    return  # Client done
+        except asyncio.IncompleteReadError:
+            print("Truncated frame from UDS client", file=sys.stderr)
         except Exception as e:
             print(f"Error handling UDS client: {e}", file=sys.stderr)
         finally:
             writer.close()
             await writer.wait_closed()
     
+    def _ingest_uds_payload(self, data: bytes):
+        """Parse one JSON event from a UDS client and add it"""
+        try:
+            raw_event = _json_loads(data)
+        except json.JSONDecodeError as e:
+            print(f"Invalid JSON from UDS client: {e}", file=sys.stderr)
+            return
+        self.add_event(raw_event)
+    
     async def start_uds_server(self):
         """Start Unix Domain Socket server"""
         # Remove existing socket
@@ -288,11 +503,20 @@ class EventBus:
         print(f"UDS socket: {UDS_SOCKET}")
         print(f"WebSocket: ws://{WS_HOST}:{WS_PORT}")
         
-        # Run both servers concurrently
-        await asyncio.gather(
-            self.start_uds_server(),
-            self.start_websocket_server()
-        )
+        self._broadcast_q = asyncio.Queue(maxsize=BROADCAST_QUEUE_SIZE)
+        
+        # Run both servers and the broadcaster concurrently
+        try:
+            await asyncio.gather(
+                self.start_uds_server(),
+                self.start_websocket_server(),
+                self._broadcaster()
+            )
+        finally:
+            # Shutdown (signal, error): let the I/O thread finish the batches
+            # already handed to it, then write what is still pending
+            self._io_pool.shutdown(wait=True)
+            self.close_event_log()
 
 def signal_handler(signum, frame):
     """Handle shutdown signals"""
@@ -305,6 +529,10 @@ def main():
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
     
+    # libuv-backed event loop when available
+    if HAS_UVLOOP:
+        uvloop.install()
+    
     # Create and run event bus
     bus = EventBus()
     
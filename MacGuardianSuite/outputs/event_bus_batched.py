@@ -9,17 +9,154 @@ import json
 import gzip
 import base64
 import socket
+import struct
 import websockets
-from collections import deque
+from collections import OrderedDict, deque
 from datetime import datetime, timedelta
-from typing import Dict, Set, List, Optional
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 import hashlib
+import os
+from pathlib import Path
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+try:
+    import xxhash
+    HAS_XXHASH = True
+except ImportError:
+    HAS_XXHASH = False
+
+try:
+    import ciso8601
+    HAS_CISO8601 = True
+except ImportError:
+    HAS_CISO8601 = False
+
+try:
+    import uvloop
+    HAS_UVLOOP = True
+except ImportError:
+    HAS_UVLOOP = False
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+try:
+    import ormsgpack
+    HAS_ORMSGPACK = True
+except ImportError:
+    HAS_ORMSGPACK = False
 
 # Configuration
 BATCH_SIZE = 50  # Events per batch
 BATCH_INTERVAL = 0.1  # 100ms batching window
 COMPRESS_THRESHOLD = 1024  # Compress contexts larger than 1KB
 DEDUP_WINDOW = timedelta(seconds=5)  # Deduplicate events within 5 seconds
+DEDUP_MAX_HASHES = 20000  # Cap on remembered hashes, whatever their age
+DEDUP_EVICT_TO = DEDUP_MAX_HASHES * 9 // 10  # Size after an over-cap eviction pass
+BLOOM_BITS = 1 << 19  # Dedup prefilter bits per generation (64 KiB)
+_BLOOM_MASK = BLOOM_BITS - 1
+CLIENT_QUEUE_SIZE = 256  # Pending batches per WebSocket client; oldest dropped when full
+COALESCE_MAX = 32  # Queued batches a client writer sends per wake-up
+UDS_LEGACY_READ = 65536  # Max size of a one-shot (unframed) UDS event
+UDS_MAX_FRAME = 1 << 20  # Max payload of one framed UDS event
+INGEST_QUEUE_SIZE = 10000  # Raw UDS payloads awaiting processing
+INGEST_BATCH = 64  # Payloads processed per ingest worker pass
+ZSTD_LEVEL = 3  # Context compression level when zstandard is installed
+ZSTD_DICT_PATH = Path.home() / '.macguardian' / 'ctx.zdict'  # Trained context dictionary
+ZSTD_DICT_SIZE = 65536  # Dictionary size in bytes
+ZSTD_DICT_SAMPLES = 1000  # Serialized contexts collected per training run
+ZSTD_DICT_REFRESH = 24 * 3600  # Retrain once a day (seconds)
+
+def _json_dumps_bytes(obj) -> bytes:
+    """Serialize to compact JSON bytes, preferring orjson"""
+    if HAS_ORJSON:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj).encode('utf-8')
+
+def _json_loads(data: bytes):
+    """Parse JSON bytes, preferring orjson (its errors subclass json.JSONDecodeError)"""
+    if HAS_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data.decode('utf-8'))
+
+def _pack(obj) -> bytes:
+    """Serialize a wire message: msgpack when ormsgpack is installed (binary
+    fields travel as-is), JSON otherwise"""
+    if HAS_ORMSGPACK:
+        return ormsgpack.packb(obj, option=ormsgpack.OPT_NON_STR_KEYS)
+    return _json_dumps_bytes(obj)
+
+def _compress_context(event: Dict, context_bytes: bytes, zstd_compressor=None):
+    """Replace event['context'] with its compressed serialization
+    
+    zstd goes in 'context_zstd' (raw bytes on the msgpack wire, base64 on
+    JSON); without zstandard, gzip + base64 in 'context_compressed'.
+    """
+    if zstd_compressor is not None:
+        compressed = zstd_compressor.compress(context_bytes)
+        if not HAS_ORMSGPACK:
+            compressed = base64.b64encode(compressed).decode('ascii')
+        event['context_zstd'] = compressed
+    else:
+        compressed = gzip.compress(context_bytes)
+        event['context_compressed'] = base64.b64encode(compressed).decode('utf-8')
+    event['context'] = None  # Remove original to save space
+
+def _new_zstd_compressor(dict_data=None):
+    """Reusable zstd compressor (not thread-safe; only the event loop uses it)"""
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=dict_data)
+
+def _load_zstd_dict():
+    """Load the persisted context dictionary, or None"""
+    try:
+        return zstandard.ZstdCompressionDict(ZSTD_DICT_PATH.read_bytes())
+    except (OSError, zstandard.ZstdError):
+        return None
+
+def _save_zstd_dict(data: bytes):
+    """Persist the context dictionary atomically (clients read it to decompress)"""
+    ZSTD_DICT_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = f"{ZSTD_DICT_PATH}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, ZSTD_DICT_PATH)
+
+def _bloom_positions(h: int):
+    """Three bit positions for a 64-bit hash (disjoint slices of it)"""
+    return h & _BLOOM_MASK, (h >> 21) & _BLOOM_MASK, (h >> 42) & _BLOOM_MASK
+
+def _bloom_contains(bits: bytearray, positions) -> bool:
+    """True if every position is set (possibly seen)"""
+    for p in positions:
+        if not bits[p >> 3] & (1 << (p & 7)):
+            return False
+    return True
+
+def _bloom_add(bits: bytearray, positions):
+    for p in positions:
+        bits[p >> 3] |= 1 << (p & 7)
+
+@lru_cache(maxsize=4096)
+def _parse_ts(timestamp: str) -> datetime:
+    """Parse an ISO8601 timestamp ('Z' suffix allowed); repeated strings
+    (bursts share timestamps) hit the cache"""
+    if HAS_CISO8601:
+        try:
+            return ciso8601.parse_datetime(timestamp)
+        except ValueError:
+            pass  # Let the stdlib parser decide
+    if timestamp.endswith('Z'):
+        return datetime.fromisoformat(timestamp[:-1] + '+00:00')
+    return datetime.fromisoformat(timestamp)
 
 class EventBusBatched:
     """High-performance Event Bus with batching and compression"""
@@ -27,10 +164,31 @@ class EventBusBatched:
     def __init__(self, uds_path: str = "/tmp/macguardian.sock", ws_port: int = 9765):
         self.uds_path = uds_path
         self.ws_port = ws_port
-        self.clients: Set[websockets.WebSocketServerProtocol] = set()
+        # Connected clients -> their pending outgoing batches
+        self.clients: Dict[websockets.WebSocketServerProtocol, asyncio.Queue] = {}
         self.event_buffer: deque = deque(maxlen=1000)
         self.batch_task: Optional[asyncio.Task] = None
-        self.recent_hashes: Dict[str, datetime] = {}  # For deduplication
+        # Raw UDS payloads; readers only enqueue, _ingest_worker processes
+        self._ingest: asyncio.Queue = asyncio.Queue(maxsize=INGEST_QUEUE_SIZE)
+        self.ingest_task: Optional[asyncio.Task] = None
+        # (event time, times seen) per hash, least recently stored first
+        self.recent_hashes: "OrderedDict[int, Tuple[datetime, int]]" = OrderedDict()
+        # Bloom prefilter over recent_hashes: current and previous
+        # DEDUP_WINDOW generations, so anything stored within the window is
+        # in one of them and a miss in both means "definitely new"
+        self._bloom = bytearray(BLOOM_BITS >> 3)
+        self._bloom_prev = bytearray(BLOOM_BITS >> 3)
+        self._bloom_epoch: Optional[int] = None
+        # Context compression: zstd with a dictionary trained on recent
+        # contexts (frames carry the dictionary ID); samples are collected
+        # while no dictionary is loaded, and again at each daily refresh
+        self._zstd = None
+        self._zstd_samples: Optional[List[bytes]] = None
+        if HAS_ZSTD:
+            dict_data = _load_zstd_dict()
+            self._zstd = _new_zstd_compressor(dict_data)
+            if dict_data is None:
+                self._zstd_samples = []
         
     async def start(self):
         """Start the event bus servers"""
@@ -47,8 +205,11 @@ class EventBusBatched:
             self.ws_port
         )
         
-        # Start batch processor
+        # Start ingest worker and batch processor
+        self.ingest_task = asyncio.create_task(self._ingest_worker())
         self.batch_task = asyncio.create_task(self.batch_processor())
+        if HAS_ZSTD:
+            self.zstd_dict_task = asyncio.create_task(self._zstd_dict_refresher())
         
         print(f"✅ Event Bus started: UDS={self.uds_path}, WS=ws://localhost:{self.ws_port}")
         
@@ -59,65 +220,178 @@ class EventBusBatched:
         )
     
     async def handle_uds_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
-        """Handle Unix Domain Socket client"""
+        """Handle Unix Domain Socket client
+        
+        Same wire formats as the realtime event bus, told apart by the first
+        byte: framed (4-byte big-endian length, capped at UDS_MAX_FRAME so it
+        starts with a zero byte, then that many bytes of JSON; repeated until
+        EOF) or legacy (one JSON event of up to 64 KiB, e.g. from nc).
+        """
         try:
+            first = await reader.read(1)
+            if not first:
+                return
+            
+            if first != b'\0':
+                await self._ingest.put(first + await reader.read(UDS_LEGACY_READ - 1))
+                return
+            
+            header = first + await reader.readexactly(3)
             while True:
-                data = await reader.read(65536)  # 64KB max
-                if not data:
-                    break
+                (length,) = struct.unpack('>I', header)
+                if length > UDS_MAX_FRAME:
+                    print(f"⚠️ UDS frame too large ({length} bytes), closing")
+                    return
+                await self._ingest.put(await reader.readexactly(length))
                 
                 try:
-                    event = json.loads(data.decode('utf-8'))
-                    await self.process_event(event)
-                except json.JSONDecodeError as e:
-                    print(f"⚠️ Invalid JSON: {e}")
+                    header = await reader.readexactly(4)
+                except asyncio.IncompleteReadError:
+                    return  # Client done
+        except asyncio.IncompleteReadError:
+            print("⚠️ Truncated frame from UDS client")
         except Exception as e:
             print(f"⚠️ UDS client error: {e}")
         finally:
             writer.close()
             await writer.wait_closed()
     
+    async def _ingest_worker(self):
+        """Parse and process queued UDS payloads, up to INGEST_BATCH per pass"""
+        queue = self._ingest
+        while True:
+            items = [await queue.get()]
+            while len(items) < INGEST_BATCH and not queue.empty():
+                items.append(queue.get_nowait())
+            
+            # Each payload parsed on its own: a joined parse would let a bad
+            # payload splice into its neighbours and fabricate events
+            events = []
+            for data in items:
+                try:
+                    events.append(_json_loads(data))
+                except json.JSONDecodeError as e:
+                    print(f"⚠️ Invalid JSON: {e}")
+            
+            for event in events:
+                if not isinstance(event, dict):
+                    print(f"⚠️ Ignoring non-object event: {type(event).__name__}")
+                    continue
+                try:
+                    await self.process_event(event)
+                except Exception as e:
+                    print(f"⚠️ Failed to process event: {e}")
+    
     async def handle_ws_client(self, websocket: websockets.WebSocketServerProtocol, path: str):
         """Handle WebSocket client"""
-        self.clients.add(websocket)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        writer = asyncio.create_task(self._client_writer(websocket, queue))
+        self.clients[websocket] = queue
         try:
             await websocket.wait_closed()
         finally:
-            self.clients.remove(websocket)
+            del self.clients[websocket]
+            writer.cancel()
+    
+    async def _client_writer(self, websocket: websockets.WebSocketServerProtocol, queue: asyncio.Queue):
+        """Send one client's queued batches in order
+        
+        Every batch stays its own {type: 'batch'} message; whatever queued up
+        while the previous sends were draining (up to COALESCE_MAX) is taken
+        in one pass and sent back to back.
+        """
+        send = websocket.send
+        try:
+            while True:
+                messages = [await queue.get()]
+                while len(messages) < COALESCE_MAX and not queue.empty():
+                    messages.append(queue.get_nowait())
+                for message in messages:
+                    await send(message)
+        except websockets.ConnectionClosed:
+            pass
+        except Exception as e:
+            print(f"⚠️ Failed to send to client: {e}")
     
     async def process_event(self, event: Dict):
         """Process incoming event with deduplication"""
         # Generate event hash for deduplication
         event_hash = self._hash_event(event)
         
-        # Check if duplicate
-        if event_hash in self.recent_hashes:
-            event_time = datetime.fromisoformat(event.get('timestamp', '').replace('Z', '+00:00'))
-            if event_time - self.recent_hashes[event_hash] < DEDUP_WINDOW:
+        # Parse the timestamp once for both the check and the store
+        event_time = _parse_ts(event.get('timestamp', ''))
+        recent = self.recent_hashes
+        
+        # Rotate the prefilter generations forward with event time
+        epoch = int(event_time.timestamp() // DEDUP_WINDOW.total_seconds())
+        if self._bloom_epoch is None or epoch > self._bloom_epoch:
+            if self._bloom_epoch is not None and epoch == self._bloom_epoch + 1:
+                self._bloom_prev = self._bloom
+            else:
+                self._bloom_prev = bytearray(BLOOM_BITS >> 3)
+            self._bloom = bytearray(BLOOM_BITS >> 3)
+            self._bloom_epoch = epoch
+        
+        # Check if duplicate; the dict is only probed on a prefilter hit
+        positions = _bloom_positions(event_hash)
+        entry = None
+        if _bloom_contains(self._bloom, positions) or _bloom_contains(self._bloom_prev, positions):
+            entry = recent.get(event_hash)
+            if entry is not None and event_time - entry[0] < DEDUP_WINDOW:
+                recent[event_hash] = (entry[0], entry[1] + 1)
                 return  # Skip duplicate
         
-        # Store hash and timestamp
-        event_time = datetime.fromisoformat(event.get('timestamp', '').replace('Z', '+00:00'))
-        self.recent_hashes[event_hash] = event_time
+        # Store hash, timestamp and hit count (moved to the most recent end)
+        _bloom_add(self._bloom, positions)
+        recent[event_hash] = (event_time, entry[1] + 1 if entry is not None else 1)
+        recent.move_to_end(event_hash)
         
-        # Clean old hashes
-        cutoff = datetime.utcnow() - DEDUP_WINDOW
-        self.recent_hashes = {
-            h: t for h, t in self.recent_hashes.items()
-            if t > cutoff
-        }
+        # Clean old hashes: expire from the oldest end only, stopping at the
+        # first one still inside the window, then enforce the size cap
+        cutoff = event_time - DEDUP_WINDOW
+        while recent:
+            oldest = next(iter(recent))
+            if recent[oldest][0] > cutoff:
+                break
+            recent.popitem(last=False)
+        if len(recent) > DEDUP_MAX_HASHES:
+            self._evict_hashes()
         
         # Compress large contexts
         if 'context' in event:
-            context_str = json.dumps(event['context'])
-            if len(context_str) > COMPRESS_THRESHOLD:
-                compressed = gzip.compress(context_str.encode('utf-8'))
-                event['context_compressed'] = base64.b64encode(compressed).decode('utf-8')
-                event['context'] = None  # Remove original to save space
+            context_bytes = _json_dumps_bytes(event['context'])
+            samples = self._zstd_samples
+            if samples is not None:
+                samples.append(context_bytes)
+                if len(samples) >= ZSTD_DICT_SAMPLES:
+                    self._zstd_samples = None
+                    self.zstd_train_task = asyncio.create_task(self._train_zstd_dict(samples))
+            if len(context_bytes) > COMPRESS_THRESHOLD:
+                _compress_context(event, context_bytes, self._zstd)
         
         # Add to buffer
         self.event_buffer.append(event)
     
+    async def _train_zstd_dict(self, samples: List[bytes]):
+        """Train a context dictionary off the loop, persist it and switch to it"""
+        loop = asyncio.get_running_loop()
+        try:
+            dict_data = await loop.run_in_executor(
+                None, zstandard.train_dictionary, ZSTD_DICT_SIZE, samples
+            )
+            await loop.run_in_executor(None, _save_zstd_dict, dict_data.as_bytes())
+        except (zstandard.ZstdError, OSError) as e:
+            print(f"⚠️ zstd dictionary training failed: {e}")
+            return
+        self._zstd = _new_zstd_compressor(dict_data)
+    
+    async def _zstd_dict_refresher(self):
+        """Start a new round of sample collection once a day"""
+        while True:
+            await asyncio.sleep(ZSTD_DICT_REFRESH)
+            if self._zstd_samples is None:
+                self._zstd_samples = []
+    
     async def batch_processor(self):
         """Process events in batches"""
         while True:
@@ -141,44 +415,69 @@ class EventBusBatched:
         if not self.clients:
             return
         
-        # Serialize batch
-        batch_json = json.dumps({
+        # Serialize batch once for every client: msgpack goes out as a binary
+        # frame, JSON as a text frame like before
+        message = _pack({
             'type': 'batch',
             'count': len(batch),
             'events': batch,
             'timestamp': datetime.utcnow().isoformat() + 'Z'
         })
+        if not HAS_ORMSGPACK:
+            message = message.decode('utf-8')
         
-        # Broadcast to all clients in parallel
-        if self.clients:
-            await asyncio.gather(
-                *[self._send_to_client(client, batch_json) for client in self.clients],
-                return_exceptions=True
-            )
+        # Hand the payload to each client's writer; no task per client, and a
+        # slow client loses its oldest pending batch instead of stalling others
+        for queue in self.clients.values():
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                queue.get_nowait()
+                queue.put_nowait(message)
     
-    async def _send_to_client(self, client: websockets.WebSocketServerProtocol, message: str):
-        """Send message to a single client"""
-        try:
-            await client.send(message)
-        except Exception as e:
-            print(f"⚠️ Failed to send to client: {e}")
-            self.clients.discard(client)
+    def _evict_hashes(self):
+        """Shrink recent_hashes to DEDUP_EVICT_TO, LRU-2 style
+        
+        Hashes seen only once go first (oldest first), so a flood of unique
+        events cannot push out hashes that are actually repeating; only
+        then are the oldest repeated ones dropped.
+        """
+        recent = self.recent_hashes
+        excess = len(recent) - DEDUP_EVICT_TO
+        one_shot = []
+        for event_hash, (_, count) in recent.items():
+            if count == 1:
+                one_shot.append(event_hash)
+                if len(one_shot) == excess:
+                    break
+        for event_hash in one_shot:
+            del recent[event_hash]
+        while len(recent) > DEDUP_EVICT_TO:
+            recent.popitem(last=False)
     
-    def _hash_event(self, event: Dict) -> str:
-        """Generate hash for event deduplication"""
+    def _hash_event(self, event: Dict) -> int:
+        """Generate hash for event deduplication
+        
+        Non-cryptographic (xxh3, else 64-bit BLAKE2b) over the raw fields,
+        NUL-separated, without building or JSON-encoding a key dict.
+        """
+        h = xxhash.xxh3_64() if HAS_XXHASH else hashlib.blake2b(digest_size=8)
+        update = h.update
+        
         # Hash based on event_id, type, and key context fields
-        key_fields = {
-            'event_id': event.get('event_id', ''),
-            'event_type': event.get('event_type', ''),
-            'source': event.get('source', ''),
-        }
+        for name in ('event_id', 'event_type', 'source'):
+            update(str(event.get(name, '')).encode())
+            update(b'\0')
         
         # Include relevant context fields
-        if 'context' in event and isinstance(event['context'], dict):
-            key_fields['context_keys'] = sorted(event['context'].keys())
+        context = event.get('context')
+        if isinstance(context, dict):
+            update(b'\1')  # Distinguishes an empty context from none
+            for key in sorted(map(str, context)):
+                update(key.encode())
+                update(b'\0')
         
-        hash_str = json.dumps(key_fields, sort_keys=True)
-        return hashlib.sha256(hash_str.encode('utf-8')).hexdigest()
+        return h.intdigest() if HAS_XXHASH else int.from_bytes(h.digest(), 'little')
 
 async def main():
     """Main entry point"""
@@ -186,6 +485,10 @@ async def main():
     await bus.start()
 
 if __name__ == '__main__':
+    # libuv-backed event loop when available (must precede asyncio.run)
+    if HAS_UVLOOP:
+        uvloop.install()
+    
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
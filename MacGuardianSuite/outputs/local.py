@@ -4,10 +4,52 @@ Local Output Module - Store events locally in JSONL format
 """
 
 import json
+import os
+import time
 from pathlib import Path
 from typing import List, Dict
 from datetime import datetime
 
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+
+def _json_line_bytes(obj) -> bytes:
+    """Serialize to one compact JSON line (newline included), preferring orjson"""
+    if HAS_ORJSON:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE)
+    return json.dumps(obj).encode("utf-8") + b"\n"
+
+
+# Max buffers per writev call
+try:
+    IOV_MAX = os.sysconf("SC_IOV_MAX")
+except (AttributeError, ValueError, OSError):
+    IOV_MAX = 1024
+if IOV_MAX <= 0:
+    IOV_MAX = 1024
+
+
+def _writev_all(fd: int, buffers: List[bytes]) -> int:
+    """Write every buffer with gathered writes, resuming after short writes"""
+    total = 0
+    while buffers:
+        chunk = buffers[:IOV_MAX]
+        written = os.writev(fd, chunk)
+        total += written
+        # Drop fully written buffers; keep the unwritten tail of a partial one
+        i = 0
+        while i < len(chunk) and written >= len(chunk[i]):
+            written -= len(chunk[i])
+            i += 1
+        buffers = buffers[i:]
+        if written:
+            buffers[0] = memoryview(buffers[0])[written:]
+    return total
+
 
 class LocalOutput:
     """
@@ -22,8 +64,10 @@ class LocalOutput:
         self.path = Path(config.get("path", "~/.macguardian/events")).expanduser()
         self.path.mkdir(parents=True, exist_ok=True)
         
-        # Current file
+        # Current file: kept open across batches, rotated by size or UTC day
         self.current_file = None
+        self._fd = None
+        self._file_day = None
         self.file_size = 0
         self.max_file_size = 10 * 1024 * 1024  # 10MB
         
@@ -33,18 +77,27 @@ class LocalOutput:
             return
         
         # Get current file
-        if not self.current_file or self.file_size >= self.max_file_size:
+        if (self._fd is None or self.file_size >= self.max_file_size
+                or int(time.time()) // 86400 != self._file_day):
             self._rotate_file()
         
-        # Write events
-        with open(self.current_file, "a") as f:
-            for event in events:
-                f.write(json.dumps(event) + "\n")
-                self.file_size += len(json.dumps(event)) + 1
+        # Write events: each serialized once, the batch gathered into one
+        # writev on the O_APPEND fd (no concatenation copy, whole lines only)
+        lines = [_json_line_bytes(event) for event in events]
+        self.file_size += _writev_all(self._fd, lines)
     
     def _rotate_file(self):
         """Rotate to a new file"""
+        self.close()
+        self._file_day = int(time.time()) // 86400
         timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
         self.current_file = self.path / f"events_{timestamp}.jsonl"
-        self.file_size = 0
+        self._fd = os.open(self.current_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self.file_size = os.fstat(self._fd).st_size
+    
+    def close(self):
+        """Close the current file (the next batch rotates to a new one)"""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
 
@@ -4,16 +4,77 @@ Splunk Output Module - Send events to Splunk via HEC (HTTP Event Collector)
 """
 
 import requests
+from requests.adapters import HTTPAdapter
 import json
 import gzip
-from typing import List, Dict
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional
 from datetime import datetime
+from functools import lru_cache
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+try:
+    import ciso8601
+    HAS_CISO8601 = True
+except ImportError:
+    HAS_CISO8601 = False
+
+
+# HEC request bodies are gzipped once per batch; level 1 favours throughput
+HEC_GZIP_LEVEL = 1
+
+# Buffer bound, in batches; on overflow the oldest events are dropped
+BUFFER_BATCHES = 20
+
+# Failed sends retry after 2, 4, 8, ... seconds, capped here
+RETRY_MAX_DELAY = 60
+
+
+def _json_dumps_bytes(obj) -> bytes:
+    """Serialize to compact JSON bytes, preferring orjson"""
+    if HAS_ORJSON:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj).encode("utf-8")
+
+
+# "macguardian:<event_type>" per event type (there are only a handful)
+_SOURCETYPE_CACHE: Dict[str, str] = {}
+
+
+def _sourcetype(event_type: str) -> str:
+    """Interned HEC sourcetype for an event type"""
+    sourcetype = _SOURCETYPE_CACHE.get(event_type)
+    if sourcetype is None:
+        sourcetype = _SOURCETYPE_CACHE.setdefault(event_type, f"macguardian:{event_type}")
+    return sourcetype
+
+
+@lru_cache(maxsize=4096)
+def _iso_to_epoch(timestamp_str: str) -> float:
+    """ISO timestamp -> Unix epoch; a batch often repeats the same string"""
+    if HAS_CISO8601:
+        try:
+            return ciso8601.parse_datetime(timestamp_str).timestamp()
+        except ValueError:
+            pass  # Let the stdlib parser decide
+    return datetime.fromisoformat(timestamp_str.replace("Z", "+00:00")).timestamp()
 
 
 class SplunkOutput:
     """
     Output module for Splunk HEC.
     Sends events in batches to Splunk HTTP Event Collector.
+    
+    Sends run on a background thread; the bus callback only buffers. The
+    buffer is bounded (oldest events dropped first), and failed sends are
+    retried with exponential backoff.
     """
     
     def __init__(self, config: Dict):
@@ -23,7 +84,24 @@ class SplunkOutput:
         self.token = config.get("token", "")
         self.index = config.get("index", "macguardian")
         self.batch_size = config.get("batch_size", 100)
-        self.buffer = []
+        self.buffer: deque = deque(maxlen=self.batch_size * BUFFER_BATCHES)
+        self.dropped = 0
+        
+        # Background sender: one send (or scheduled retry) in flight at a time
+        self._lock = threading.Lock()
+        self._sender = ThreadPoolExecutor(max_workers=1)
+        self._send_pending = False
+        self._fail_count = 0
+        self._retry_timer: Optional[threading.Timer] = None
+        
+        # Keep-alive connection pool: TCP + TLS set up once, not per batch
+        self._session = requests.Session()
+        self._session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+        self._session.headers.update({
+            "Authorization": f"Splunk {self.token}",
+            "Content-Type": "application/json",
+            "Content-Encoding": "gzip"
+        })
         
         if not self.url or not self.token:
             self.enabled = False
@@ -34,56 +112,117 @@ class SplunkOutput:
         if not self.enabled:
             return
         
+        with self._lock:
+            self._buffer_events(events)
+            
+            # Send batch when full (unless a send or retry is already pending)
+            if len(self.buffer) >= self.batch_size and not self._send_pending:
+                self._send_pending = True
+                self._sender.submit(self._send_batch)
+    
+    def close(self):
+        """Cancel any pending retry and wait for an in-flight send"""
+        with self._lock:
+            if self._retry_timer is not None:
+                self._retry_timer.cancel()
+                self._retry_timer = None
+        self._sender.shutdown(wait=True)
+    
+    def _buffer_events(self, events: List[Dict]):
+        """Append to the bounded buffer, counting overflow (caller holds _lock)"""
+        overflow = len(self.buffer) + len(events) - self.buffer.maxlen
+        if overflow > 0:
+            self.dropped += overflow
         self.buffer.extend(events)
-        
-        # Send batch when full
-        if len(self.buffer) >= self.batch_size:
-            self._send_batch()
     
     def _send_batch(self):
-        """Send buffered events to Splunk"""
-        if not self.buffer:
-            return
+        """Send buffered events to Splunk (sender thread)
         
-        # Format events for Splunk HEC
-        hec_events = []
-        for event in self.buffer:
-            hec_events.append({
-                "time": self._parse_timestamp(event.get("timestamp")),
-                "host": event.get("host", "unknown"),
-                "source": event.get("source", "macguardian"),
-                "sourcetype": f"macguardian:{event.get('event_type', 'unknown')}",
-                "index": self.index,
-                "event": event
-            })
-        
-        # Send to Splunk HEC
-        headers = {
-            "Authorization": f"Splunk {self.token}",
-            "Content-Type": "application/json"
-        }
+        Whatever goes wrong, either a follow-up send or retry is scheduled or
+        _send_pending is cleared, so __call__ can always submit again.
+        """
+        scheduled = False
+        try:
+            scheduled = self._send_buffered()
+        finally:
+            if not scheduled:
+                with self._lock:
+                    self._send_pending = False
+    
+    def _send_buffered(self) -> bool:
+        """Send one batch; True if a follow-up send or retry was scheduled"""
+        with self._lock:
+            self._retry_timer = None
+            events = list(self.buffer)
+            self.buffer.clear()
         
-        hec_url = f"{self.url}/services/collector/event"
+        if not events:
+            return False
         
         try:
-            response = requests.post(
-                hec_url,
-                headers=headers,
-                json=hec_events,
+            body = self._hec_body(events)
+            response = self._session.post(
+                f"{self.url}/services/collector/event",
+                data=body,
                 timeout=10
             )
             response.raise_for_status()
-            print(f"✅ Sent {len(self.buffer)} events to Splunk")
-            self.buffer = []
         except requests.exceptions.RequestException as e:
-            print(f"❌ Error sending to Splunk: {e}")
-            # Keep buffer for retry
+            with self._lock:
+                # Put the batch back ahead of newer events; the bound still
+                # holds, so an outage drops the oldest events, not memory
+                newer = list(self.buffer)
+                self.buffer.clear()
+                self._buffer_events(events)
+                self._buffer_events(newer)
+                
+                self._fail_count += 1
+                delay = min(2 ** self._fail_count, RETRY_MAX_DELAY)
+                self._retry_timer = threading.Timer(delay, self._sender.submit, args=(self._send_batch,))
+                self._retry_timer.daemon = True
+                self._retry_timer.start()
+            print(f"❌ Error sending to Splunk: {e} (retrying in {delay}s)")
+            return True
+        except Exception as e:
+            # Not a transport problem (e.g. an unserializable event): retrying
+            # the same batch would fail again, so drop it
+            with self._lock:
+                self.dropped += len(events)
+            print(f"❌ Dropped {len(events)} events, could not send to Splunk: {e}")
+        else:
+            print(f"✅ Sent {len(events)} events to Splunk")
+            with self._lock:
+                self._fail_count = 0
+        
+        with self._lock:
+            if len(self.buffer) >= self.batch_size:
+                self._sender.submit(self._send_batch)
+                return True
+        return False
+    
+    def _hec_body(self, events: List[Dict]) -> bytes:
+        """Gzipped HEC request body for a batch of events"""
+        # Format events for Splunk HEC (one dict display per event, cached
+        # sourcetype strings, attribute lookups hoisted out of the loop)
+        parse_timestamp = self._parse_timestamp
+        index = self.index
+        hec_events = [
+            {
+                "time": parse_timestamp(event.get("timestamp")),
+                "host": event.get("host", "unknown"),
+                "source": event.get("source", "macguardian"),
+                "sourcetype": _sourcetype(event.get("event_type", "unknown")),
+                "index": index,
+                "event": event
+            }
+            for event in events
+        ]
+        return gzip.compress(_json_dumps_bytes(hec_events), compresslevel=HEC_GZIP_LEVEL)
     
     def _parse_timestamp(self, timestamp_str: str) -> float:
         """Parse ISO timestamp to Unix epoch"""
         try:
-            dt = datetime.fromisoformat(timestamp_str.replace("Z", "+00:00"))
-            return dt.timestamp()
+            return _iso_to_epoch(timestamp_str)
         except:
             return datetime.utcnow().timestamp()
 
@@ -107,4 +246,4 @@ if __name__ == "__main__":
     ]
     
     output(test_events)
-
+    output.close()
@@ -11,6 +11,40 @@ import os
 from datetime import datetime
 from typing import List, Dict, Any
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+try:
+    import ciso8601
+    HAS_CISO8601 = True
+except ImportError:
+    HAS_CISO8601 = False
+
+# orjson's decode errors subclass json.JSONDecodeError
+_json_loads = orjson.loads if HAS_ORJSON else json.loads
+
+# Concurrent event file reads in load_events
+LOAD_WORKERS = 16
+
+
+def _json_dumps_bytes(obj) -> bytes:
+    """Serialize to indented JSON bytes, preferring orjson"""
+    if HAS_ORJSON:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, indent=2).encode('utf-8')
+
+def _load_one(event_file: Path):
+    """Read and parse one event file (None on error)"""
+    try:
+        return _json_loads(event_file.read_bytes())
+    except (json.JSONDecodeError, IOError) as e:
+        print(f"Error loading {event_file}: {e}", file=sys.stderr)
+        return None
 
 def load_events(event_dir: str) -> List[Dict[str, Any]]:
     """Load all events from event directory"""
@@ -20,19 +54,36 @@ def load_events(event_dir: str) -> List[Dict[str, Any]]:
     if not event_path.exists():
         return events
     
-    for event_file in event_path.glob('event_*.json'):
+    # Per-file events: reads overlap in a thread pool, results keep glob order
+    event_files = list(event_path.glob('event_*.json'))
+    if event_files:
+        with ThreadPoolExecutor(max_workers=LOAD_WORKERS) as executor:
+            events.extend(e for e in executor.map(_load_one, event_files) if e is not None)
+    
+    # Daily append-only logs from the event bus: one event per line
+    for log_file in event_path.glob('events-*.jsonl'):
         try:
-            with open(event_file, 'r') as f:
-                event = json.load(f)
-                events.append(event)
-        except (json.JSONDecodeError, IOError) as e:
-            print(f"Error loading {event_file}: {e}", file=sys.stderr)
-            continue
+            with open(log_file, 'rb') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        events.append(_json_loads(line))
+                    except json.JSONDecodeError:
+                        continue  # Partially written last line
+        except IOError as e:
+            print(f"Error loading {log_file}: {e}", file=sys.stderr)
     
     return events
 
 def parse_timestamp(timestamp_str: str) -> datetime:
     """Parse ISO8601 timestamp"""
+    if HAS_CISO8601:
+        try:
+            # C parser; handles 'Z' without a string replace
+            return ciso8601.parse_datetime(timestamp_str)
+        except ValueError:
+            pass  # Let the stdlib parsers decide
     try:
         # Try with fractional seconds
         if '.' in timestamp_str or 'T' in timestamp_str:
@@ -52,12 +103,10 @@ def format_timeline(events: List[Dict[str, Any]]) -> Dict[str, Any]:
     )
     
     # Group by type
-    by_type = {}
+    event_types = {}
     for event in sorted_events:
         event_type = event.get('type', 'unknown')
-        if event_type not in by_type:
-            by_type[event_type] = []
-        by_type[event_type].append(event)
+        event_types[event_type] = event_types.get(event_type, 0) + 1
     
     # Calculate statistics
     severity_counts = {}
@@ -65,10 +114,11 @@ def format_timeline(events: List[Dict[str, Any]]) -> Dict[str, Any]:
         severity = event.get('severity', 'unknown')
         severity_counts[severity] = severity_counts.get(severity, 0) + 1
     
+    
     return {
         'timestamp': datetime.utcnow().isoformat() + 'Z',
         'total_events': len(sorted_events),
-        'event_types': {k: len(v) for k, v in by_type.items()},
+        'event_types': event_types,
         'severity_counts': severity_counts,
         'events': sorted_events,
         'timeline': [
@@ -99,8 +149,8 @@ def main():
     output_path = Path(output_file)
     output_path.parent.mkdir(parents=True, exist_ok=True)
     
-    with open(output_file, 'w') as f:
-        json.dump(timeline, f, indent=2)
+    with open(output_file, 'wb') as f:
+        f.write(_json_dumps_bytes(timeline))
     
     print(f"Timeline formatted: {len(events)} events")
     print(f"Output: {output_file}")
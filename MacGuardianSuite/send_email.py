@@ -2,13 +2,17 @@
 """Omega Tech Black-Ops Email Dispatcher for the MacGuardian Suite."""
 
 import argparse
+import atexit
 import os
 import smtplib
+import string
 import sys
+import threading
 from email import encoders
 from email.mime.base import MIMEBase
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, Optional
 import html
@@ -39,13 +43,7 @@ THEME_STATUS_LINE = THEME_PROFILE.get("THEME_STATUS_LINE", "Automation Wing // A
 THEME_TAGLINE = THEME_PROFILE.get("THEME_TAGLINE", "Omega Technologies // Watchdog Division")
 
 
-def render_theme_html(message: str, headline: Optional[str] = None, status_line: Optional[str] = None,
-                      tagline: Optional[str] = None) -> str:
-    """Wrap message content in the Omega Tech Black-Ops HTML template."""
-    try:
-        template = THEME_TEMPLATE_PATH.read_text()
-    except FileNotFoundError:
-        template = """<!DOCTYPE html><html lang=\"en\"><head><meta charset=\"UTF-8\"><title>{{headline}}</title>
+_FALLBACK_TEMPLATE = """<!DOCTYPE html><html lang=\"en\"><head><meta charset=\"UTF-8\"><title>{{headline}}</title>
 <style>body{background-color:#0D0D0D;color:#E5E5E5;font-family:'Courier New',Menlo,monospace;margin:0;padding:32px}a{color:#FFE600}</style>
 </head><body><h1 style=\"color:#8C00FF;text-transform:uppercase;letter-spacing:0.2em;font-size:20px;\">{{headline}}</h1>
 <p style=\"color:#FFE600;letter-spacing:0.18em;text-transform:uppercase;font-size:12px;\">{{status_line}}</p>
@@ -54,18 +52,89 @@ def render_theme_html(message: str, headline: Optional[str] = None, status_line:
 <p style=\"font-size:11px;color:#666666;letter-spacing:0.16em;text-transform:uppercase;\">Omega Technologies • Black-Ops Watchdog</p>
 </body></html>"""
 
+
+def load_theme_template() -> string.Template:
+    """Read the theme HTML once and compile its {{token}} slots for a single substitution pass."""
+    try:
+        raw = THEME_TEMPLATE_PATH.read_text()
+    except FileNotFoundError:
+        raw = _FALLBACK_TEMPLATE
+    # Literal "$" in the theme must survive string.Template
+    raw = raw.replace("$", "$$")
+    for token in ("headline", "status_line", "body", "tagline"):
+        raw = raw.replace("{{%s}}" % token, "${%s}" % token)
+    return string.Template(raw)
+
+
+THEME_TEMPLATE = load_theme_template()
+
+# One authenticated SMTP session per process, reused by consecutive sends
+_SMTP: Optional[smtplib.SMTP] = None
+_SMTP_KEY: Optional[tuple] = None
+_SMTP_LOCK = threading.Lock()
+
+
+@lru_cache(maxsize=32)
+def _escape_field(value: str) -> str:
+    """HTML-escape a headline/status/tagline value (these rarely change)."""
+    return html.escape(value.strip())
+
+
+def render_theme_html(message: str, headline: Optional[str] = None, status_line: Optional[str] = None,
+                      tagline: Optional[str] = None) -> str:
+    """Wrap message content in the Omega Tech Black-Ops HTML template."""
     safe_body = "<br>".join(html.escape(line) for line in message.splitlines()) if message else ""
 
-    replacements = {
-        "{{headline}}": html.escape((headline or THEME_HEADLINE).strip()),
-        "{{status_line}}": html.escape((status_line or THEME_STATUS_LINE).strip()),
-        "{{body}}": safe_body,
-        "{{tagline}}": html.escape((tagline or THEME_TAGLINE).strip()),
-    }
+    return THEME_TEMPLATE.substitute(
+        headline=_escape_field(headline or THEME_HEADLINE),
+        status_line=_escape_field(status_line or THEME_STATUS_LINE),
+        body=safe_body,
+        tagline=_escape_field(tagline or THEME_TAGLINE),
+    )
 
-    for token, value in replacements.items():
-        template = template.replace(token, value)
-    return template
+
+def _get_server(config: Dict, reconnect: bool = False) -> smtplib.SMTP:
+    """Return the live, authenticated session for config, connecting on first use
+    or when the config changed (caller holds _SMTP_LOCK)."""
+    global _SMTP, _SMTP_KEY
+    key = (config['smtp_server'], config['smtp_port'], config['use_tls'],
+           config['username'], config['password'])
+    if _SMTP is not None and (reconnect or key != _SMTP_KEY):
+        _close_server()
+
+    if _SMTP is None:
+        if config['use_tls']:
+            server = smtplib.SMTP(config['smtp_server'], config['smtp_port'])
+            server.starttls()
+        else:
+            server = smtplib.SMTP_SSL(config['smtp_server'], config['smtp_port'])
+        try:
+            server.login(config['username'], config['password'])
+        except Exception:
+            server.close()
+            raise
+        _SMTP, _SMTP_KEY = server, key
+    return _SMTP
+
+
+def _close_server() -> None:
+    """Drop the cached session (caller holds _SMTP_LOCK)."""
+    global _SMTP, _SMTP_KEY
+    if _SMTP is not None:
+        try:
+            _SMTP.quit()
+        except (smtplib.SMTPException, OSError):
+            _SMTP.close()
+    _SMTP, _SMTP_KEY = None, None
+
+
+def close_smtp_session() -> None:
+    """Quit the cached SMTP session, if any (also run at interpreter exit)."""
+    with _SMTP_LOCK:
+        _close_server()
+
+
+atexit.register(close_smtp_session)
 
 
 def send_email(to_email: str, subject: str, body: str, html_body: Optional[str] = None,
@@ -139,15 +208,16 @@ def send_email(to_email: str, subject: str, body: str, html_body: Optional[str]
                 if isinstance(msg, MIMEMultipart):
                     msg.attach(part)
 
-        if config['use_tls']:
-            server = smtplib.SMTP(config['smtp_server'], config['smtp_port'])
-            server.starttls()
-        else:
-            server = smtplib.SMTP_SSL(config['smtp_server'], config['smtp_port'])
-
-        server.login(config['username'], config['password'])
-        server.send_message(msg)
-        server.quit()
+        with _SMTP_LOCK:
+            try:
+                try:
+                    _get_server(config).send_message(msg)
+                except smtplib.SMTPServerDisconnected:
+                    # The server closed an idle session; reconnect once
+                    _get_server(config, reconnect=True).send_message(msg)
+            except Exception:
+                _close_server()
+                raise
 
         print(f"Ω✅ Transmission delivered to {to_email}")
         return True
@@ -6,102 +6,200 @@
 # ===============================
 
 import json
+import os
 import sys
-from datetime import datetime
-from uuid import uuid4
+import time
+from uuid import UUID
 
-def create_stix_bundle(observables, indicators=None):
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+try:
+    import ijson
+    HAS_IJSON = True
+except ImportError:
+    HAS_IJSON = False
+
+# Errors from parsing an IOC file (orjson's subclass json.JSONDecodeError)
+_IOC_PARSE_ERRORS = (json.JSONDecodeError, ijson.JSONError) if HAS_IJSON else (json.JSONDecodeError,)
+
+def _dumps(obj):
+    """Serialize to compact JSON bytes, preferring orjson"""
+    if HAS_ORJSON:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+def _loads(data):
+    """Parse JSON bytes, preferring orjson (its errors subclass json.JSONDecodeError)"""
+    return orjson.loads(data) if HAS_ORJSON else json.loads(data)
+
+# IOC files this large are parsed incrementally (with ijson) instead of whole
+IOC_STREAM_MIN = 64 << 20  # 64 MiB
+
+# Write buffer for streamed bundles
+STIX_WRITE_BUFFER = 1 << 20  # 1 MiB
+
+# STIX hash algorithm names -> hashes dict keys
+_HASH_MAP = {"SHA-256": "sha256", "MD5": "md5", "SHA-1": "sha1", "SHA-512": "sha512"}
+
+# (microsecond, formatted string) of the last _now_iso() call
+_now_cache = (0, "")
+
+def _now_iso():
+    """Current UTC time as a STIX timestamp, re-formatted only when the microsecond changes"""
+    global _now_cache
+    now_us = time.time_ns() // 1000
+    if now_us != _now_cache[0]:
+        # YYYY-MM-DDTHH:MM:SS.ffffffZ straight from gmtime: no datetime
+        # object, no strftime format parsing
+        secs, us = divmod(now_us, 1_000_000)
+        g = time.gmtime(secs)
+        _now_cache = (now_us, f"{g.tm_year:04d}-{g.tm_mon:02d}-{g.tm_mday:02d}T"
+                              f"{g.tm_hour:02d}:{g.tm_min:02d}:{g.tm_sec:02d}.{us:06d}Z")
+    return _now_cache[1]
+
+def _uuid4_pool(n):
+    """Iterator over n random (version 4) UUID strings, all drawn from one
+    os.urandom call instead of one per uuid4()"""
+    raw = os.urandom(16 * n)
+    return (str(UUID(bytes=raw[i:i + 16], version=4)) for i in range(0, 16 * n, 16))
+
+def _identity_object(now, uuid):
+    """Identity (your organization)"""
+    return {
+        "type": "identity",
+        "id": f"identity--{uuid()}",
+        "spec_version": "2.1",
+        "name": "MacGuardian Suite",
+        "identity_class": "organization",
+        "created": now,
+        "modified": now
+    }
+
+def _observed_objects(observables, now, uuid):
+    """Yield one observed-data object per observable"""
+    for obs in observables:
+        yield {
+            "type": "observed-data",
+            "id": f"observed-data--{uuid()}",
+            "spec_version": "2.1",
+            "created": now,
+            "modified": now,
+            "first_observed": obs.get("first_observed", now),
+            "last_observed": obs.get("last_observed", now),
+            "number_observed": obs.get("number_observed", 1),
+            "objects": {
+                "0": obs["object"]
+            }
+        }
+
+def _indicator_objects(indicators, now, uuid):
+    """Yield one indicator object per indicator"""
+    for ind in indicators:
+        yield {
+            "type": "indicator",
+            "id": f"indicator--{uuid()}",
+            "spec_version": "2.1",
+            "created": now,
+            "modified": now,
+            "pattern": ind.get("pattern", ""),
+            "pattern_type": "stix",
+            "pattern_version": "2.1",
+            "valid_from": now,
+            "labels": ind.get("labels", ["malicious-activity"]),
+            "kill_chain_phases": ind.get("kill_chain_phases", [])
+        }
+
+def _bundle_objects(observables, indicators, now, uuid):
+    """Yield the bundle's objects one at a time: identity, observables, indicators"""
+    yield _identity_object(now, uuid)
+    yield from _observed_objects(observables, now, uuid)
+    yield from _indicator_objects(indicators, now, uuid)
+
+def create_stix_bundle(observables, indicators=None, now=None):
     """
     Create a STIX 2.1 bundle with observables and indicators
     
     Args:
         observables: List of observable objects (IPs, domains, hashes, etc.)
         indicators: List of indicator objects (optional)
+        now: STIX timestamp shared by every object (optional, defaults to now)
     
     Returns:
         STIX bundle as dict
     """
-    bundle = {
+    # One timestamp for every object created in this bundle; every id
+    # (identity, observables, indicators, bundle) comes from one
+    # pre-generated pool
+    now = now or _now_iso()
+    indicators = indicators or ()
+    uuid = _uuid4_pool(len(observables) + len(indicators) + 2).__next__
+    
+    return {
         "type": "bundle",
-        "id": f"bundle--{uuid4()}",
+        "id": f"bundle--{uuid()}",
         "spec_version": "2.1",
-        "objects": []
+        "objects": list(_bundle_objects(observables, indicators, now, uuid))
     }
+
+def write_stix_bundle(output_file, observables, indicators=None, now=None):
+    """
+    Stream a STIX 2.1 bundle to a file, one object per line
     
-    # Add identity (your organization)
-    identity = {
-        "type": "identity",
-        "id": f"identity--{uuid4()}",
-        "spec_version": "2.1",
-        "name": "MacGuardian Suite",
-        "identity_class": "organization",
-        "created": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
-        "modified": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.%fZ")
-    }
-    bundle["objects"].append(identity)
-    
-    # Add observables
-    for obs in observables:
-        observable = {
-            "type": "observed-data",
-            "id": f"observed-data--{uuid4()}",
-            "spec_version": "2.1",
-            "created": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
-            "modified": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
-            "first_observed": obs.get("first_observed", datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.%fZ")),
-            "last_observed": obs.get("last_observed", datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.%fZ")),
-            "number_observed": obs.get("number_observed", 1),
-            "objects": {
-                "0": obs["object"]
-            }
-        }
-        bundle["objects"].append(observable)
+    Same content as create_stix_bundle, but each object is serialized and
+    written as it is built, so only one object (plus the write buffer) is
+    in memory at a time.
     
-    # Add indicators if provided
-    if indicators:
-        for ind in indicators:
-            indicator = {
-                "type": "indicator",
-                "id": f"indicator--{uuid4()}",
-                "spec_version": "2.1",
-                "created": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
-                "modified": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
-                "pattern": ind.get("pattern", ""),
-                "pattern_type": "stix",
-                "pattern_version": "2.1",
-                "valid_from": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
-                "labels": ind.get("labels", ["malicious-activity"]),
-                "kill_chain_phases": ind.get("kill_chain_phases", [])
-            }
-            bundle["objects"].append(indicator)
+    Args:
+        output_file: Path to output STIX JSON file
+        observables: List of observable objects (IPs, domains, hashes, etc.)
+        indicators: List of indicator objects (optional)
+        now: STIX timestamp shared by every object (optional, defaults to now)
+    """
+    now = now or _now_iso()
+    indicators = indicators or ()
+    uuid = _uuid4_pool(len(observables) + len(indicators) + 2).__next__
     
-    return bundle
+    with open(output_file, 'wb', buffering=STIX_WRITE_BUFFER) as f:
+        f.write(b'{"type":"bundle","id":"bundle--%s","spec_version":"2.1","objects":['
+                % uuid().encode())
+        write = f.write
+        sep = b"\n"
+        dumps = _dumps
+        for obj in _bundle_objects(observables, indicators, now, uuid):
+            write(sep)
+            write(dumps(obj))
+            sep = b",\n"
+        f.write(b"\n]}\n")
 
-def ip_to_stix(ip_address, malicious=True):
+def ip_to_stix(ip_address, malicious=True, first_observed=None):
     """Convert IP address to STIX observable"""
     return {
         "object": {
             "type": "ipv4-addr",
             "value": ip_address
         },
-        "first_observed": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+        "first_observed": first_observed or _now_iso(),
         "labels": ["malicious-activity"] if malicious else ["suspicious-activity"]
     }
 
-def domain_to_stix(domain, malicious=True):
+def domain_to_stix(domain, malicious=True, first_observed=None):
     """Convert domain to STIX observable"""
     return {
         "object": {
             "type": "domain-name",
             "value": domain
         },
-        "first_observed": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+        "first_observed": first_observed or _now_iso(),
         "labels": ["malicious-activity"] if malicious else ["suspicious-activity"]
     }
 
-def hash_to_stix(file_hash, hash_type="SHA-256"):
+def hash_to_stix(file_hash, hash_type="SHA-256", first_observed=None):
     """Convert file hash to STIX observable"""
-    hash_type_lower = hash_type.lower().replace("-", "")
+    hash_type_lower = _HASH_MAP.get(hash_type) or hash_type.lower().replace("-", "")
     return {
         "object": {
             "type": "file",
@@ -109,21 +207,72 @@ def hash_to_stix(file_hash, hash_type="SHA-256"):
                 hash_type_lower: file_hash
             }
         },
-        "first_observed": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+        "first_observed": first_observed or _now_iso(),
         "labels": ["malicious-activity"]
     }
 
-def url_to_stix(url, malicious=True):
+def url_to_stix(url, malicious=True, first_observed=None):
     """Convert URL to STIX observable"""
     return {
         "object": {
             "type": "url",
             "value": url
         },
-        "first_observed": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+        "first_observed": first_observed or _now_iso(),
         "labels": ["malicious-activity"] if malicious else ["suspicious-activity"]
     }
 
+def _sha256_to_stix(file_hash, malicious=True, first_observed=None):
+    """SHA-256 hash IOC -> STIX observable (hashes are always labelled malicious)"""
+    return hash_to_stix(file_hash, "SHA-256", first_observed)
+
+def _md5_to_stix(file_hash, malicious=True, first_observed=None):
+    """MD5 hash IOC -> STIX observable (hashes are always labelled malicious)"""
+    return hash_to_stix(file_hash, "MD5", first_observed)
+
+# IOC "type" -> (dedup kind, converter(value, malicious, first_observed))
+_IOC_CONVERTERS = {
+    "ip": ("ip", ip_to_stix),
+    "domain": ("domain", domain_to_stix),
+    "url": ("url", url_to_stix),
+    "hash": ("MD5", _md5_to_stix),  # Untyped hashes have always been exported as MD5
+    "sha256": ("SHA-256", _sha256_to_stix),
+    "md5": ("MD5", _md5_to_stix)
+}
+
+def _read_iocs(f):
+    """IOC records from an open IOC file: a large file is streamed record by
+    record (needs ijson), anything else is parsed in one go"""
+    if HAS_IJSON and os.fstat(f.fileno()).st_size >= IOC_STREAM_MIN:
+        return ijson.items(f, "item")
+    return _loads(f.read())
+
+def _collect_observables(iocs, now):
+    """
+    Convert IOCs to STIX observables
+    
+    A repeated IOC (same kind and value) bumps number_observed on its first
+    observable instead of becoming another observed-data object.
+    """
+    seen = {}
+    converters = _IOC_CONVERTERS
+    for ioc in iocs:
+        converter = converters.get(ioc.get("type", "").lower())
+        if converter is None:
+            continue
+        kind, convert = converter
+        value = ioc.get("value", "")
+        key = (kind, value)
+        
+        observable = seen.get(key)
+        if observable is not None:
+            observable["number_observed"] = observable.get("number_observed", 1) + 1
+            continue
+        
+        seen[key] = convert(value, ioc.get("malicious", True), now)
+    
+    return list(seen.values())
+
 def export_iocs_to_stix(ioc_file, output_file):
     """
     Export IOCs from JSON file to STIX format
@@ -132,39 +281,23 @@ def export_iocs_to_stix(ioc_file, output_file):
         ioc_file: Path to IOC JSON file
         output_file: Path to output STIX JSON file
     """
+    now = _now_iso()
+    
+    # Only the observables (one per distinct IOC) are kept; a streamed
+    # file is never held in memory as a whole
     try:
-        with open(ioc_file, 'r') as f:
-            iocs = json.load(f)
+        with open(ioc_file, 'rb') as f:
+            observables = _collect_observables(_read_iocs(f), now)
     except FileNotFoundError:
         print(f"Error: IOC file not found: {ioc_file}")
         return False
-    except json.JSONDecodeError:
+    except _IOC_PARSE_ERRORS:
         print(f"Error: Invalid JSON in {ioc_file}")
         return False
     
-    observables = []
-    
-    # Convert IOCs to STIX observables
-    for ioc in iocs:
-        ioc_type = ioc.get("type", "").lower()
-        value = ioc.get("value", "")
-        malicious = ioc.get("malicious", True)
-        
-        if ioc_type == "ip":
-            observables.append(ip_to_stix(value, malicious))
-        elif ioc_type == "domain":
-            observables.append(domain_to_stix(value, malicious))
-        elif ioc_type in ["hash", "sha256", "md5"]:
-            observables.append(hash_to_stix(value, "SHA-256" if "sha" in ioc_type else "MD5"))
-        elif ioc_type == "url":
-            observables.append(url_to_stix(value, malicious))
-    
-    # Create STIX bundle
-    bundle = create_stix_bundle(observables)
-    
-    # Write to file
-    with open(output_file, 'w') as f:
-        json.dump(bundle, f, indent=2)
+    # Stream the STIX bundle to the file, stamped with the same timestamp
+    # as the observables' first_observed
+    write_stix_bundle(output_file, observables, now=now)
     
     print(f"✅ Exported {len(observables)} IOCs to STIX format: {output_file}")
     return True
@@ -17,14 +17,18 @@ from collectors.unified_logging import UnifiedLoggingCollector
 from outputs.local import LocalOutput
 
 
-def test_event_bus():
-    """Test the event bus"""
+def test_event_bus(bus: EventBus = None):
+    """Test the event bus (on a shared, already started bus when given one)"""
     print("=" * 60)
     print("🧪 Testing Event Bus")
     print("=" * 60)
     
-    bus = EventBus()
-    bus.start()
+    own_bus = bus is None
+    if own_bus:
+        bus = EventBus()
+        bus.start()
+    received_before = bus.stats["events_received"]
+    sent_before = bus.stats["events_sent"]
     
     # Register test output
     events_received = []
@@ -55,10 +59,11 @@ def test_event_bus():
     print(f"  Events sent: {stats['events_sent']}")
     print(f"  Queue size: {stats['queue_size']}")
     
-    bus.stop()
+    if own_bus:
+        bus.stop()
     
-    assert stats['events_received'] == 5, "Should receive 5 events"
-    assert stats['events_sent'] == 5, "Should send 5 events"
+    assert stats['events_received'] - received_before == 5, "Should receive 5 events"
+    assert stats['events_sent'] - sent_before == 5, "Should send 5 events"
     print("✅ Event bus test passed!\n")
 
 
@@ -90,7 +95,8 @@ def test_local_output():
     ]
     
     print("\n💾 Writing events to local storage...")
-    output(test_events)
+    output(test_events)  # One batch -> one writev
+    output.close()
     
     # Check if file was created
     output_path = Path.home() / ".macguardian" / "test_events"
@@ -111,14 +117,16 @@ def test_local_output():
     print("✅ Local output test passed!\n")
 
 
-def test_collectors():
-    """Test collectors (quick start/stop)"""
+def test_collectors(bus: EventBus = None):
+    """Test collectors (quick start/stop), on a shared bus when given one"""
     print("=" * 60)
     print("🧪 Testing Collectors")
     print("=" * 60)
     
-    bus = EventBus()
-    bus.start()
+    own_bus = bus is None
+    if own_bus:
+        bus = EventBus()
+        bus.start()
     
     # Test FSEvents collector
     print("\n📁 Testing FSEvents Collector...")
@@ -157,7 +165,8 @@ def test_collectors():
     unified.stop()
     print("✅ Unified Logging collector test passed!")
     
-    bus.stop()
+    if own_bus:
+        bus.stop()
     print()
 
 
@@ -167,10 +176,14 @@ def main():
     print("=" * 60)
     print()
     
+    # One bus for the whole run: its threads start and stop once
+    bus = EventBus()
+    bus.start()
+    
     try:
-        test_event_bus()
+        test_event_bus(bus)
         test_local_output()
-        test_collectors()
+        test_collectors(bus)
         
         print("=" * 60)
         print("✅ All tests passed!")
@@ -189,6 +202,8 @@ def main():
         import traceback
         traceback.print_exc()
         sys.exit(1)
+    finally:
+        bus.stop()
 
 
 if __name__ == "__main__":
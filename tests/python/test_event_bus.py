@@ -22,9 +22,13 @@ from event_bus import EventBus, Event
 class TestEventBus(unittest.TestCase):
     """Test Event Bus functionality"""
     
+    @classmethod
+    def setUpClass(cls):
+        """One bus shared by every test in the class"""
+        cls.bus = EventBus()
+    
     def setUp(self):
         """Set up test fixtures"""
-        self.bus = EventBus()
         self.test_event = {
             "timestamp": "2024-01-15T10:30:45Z",
             "type": "process",
@@ -65,10 +69,14 @@ class TestEventBus(unittest.TestCase):
         event = self.bus.normalize_event(self.test_event)
         self.bus.store_event(event)
         
-        # Check if event file was created
+        # Check the event was appended to the daily log
         event_dir = Path.home() / ".macguardian" / "events"
-        event_files = list(event_dir.glob("event_*.json"))
-        self.assertGreater(len(event_files), 0)
+        log_files = sorted(event_dir.glob("events-*.jsonl"))
+        self.assertGreater(len(log_files), 0)
+        
+        last_line = log_files[-1].read_text().splitlines()[-1]
+        self.assertEqual(json.loads(last_line)["event_id"], event.event_id)
+        self.bus.close_event_log()
 
 
 class TestEventSchema(unittest.TestCase):
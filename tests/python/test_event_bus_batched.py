@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+
+"""
+Batched Event Bus Test Suite
+"""
+
+import unittest
+import json
+import base64
+import asyncio
+import struct
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+import sys
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "MacGuardianSuite" / "outputs"))
+
+import event_bus_batched
+from event_bus_batched import EventBusBatched, _compress_context, _json_dumps_bytes
+
+if event_bus_batched.HAS_ZSTD:
+    import zstandard
+
+
+class FakeWebSocket:
+    """Records sent messages; open until close() is called"""
+
+    def __init__(self):
+        self.sent = []
+        self._closed = asyncio.Event()
+
+    async def send(self, message):
+        self.sent.append(message)
+
+    async def wait_closed(self):
+        await self._closed.wait()
+
+    def close(self):
+        self._closed.set()
+
+
+class FakeStreamWriter:
+    """Minimal UDS writer: the client handler only closes it"""
+
+    def close(self):
+        pass
+
+    async def wait_closed(self):
+        pass
+
+
+def _stamped(event_id, timestamp):
+    return {
+        "event_id": event_id,
+        "event_type": "process",
+        "source": "test",
+        "timestamp": timestamp
+    }
+
+
+def _event(i):
+    return {
+        "timestamp": "2024-01-15T10:30:45Z",
+        "type": "process",
+        "severity": "info",
+        "message": f"Test event {i}"
+    }
+
+
+class TestContextCompression(unittest.TestCase):
+    """Test context compression round-trips"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.context = {"pid": 12345, "cmdline": "/usr/bin/python3 " + "x" * 2048}
+        self.context_bytes = _json_dumps_bytes(self.context)
+
+    def test_gzip_round_trip(self):
+        """Test gzip + base64 context without zstandard"""
+        import gzip
+
+        event = {"context": self.context}
+        _compress_context(event, self.context_bytes)
+
+        self.assertIsNone(event["context"])
+        restored = gzip.decompress(base64.b64decode(event["context_compressed"]))
+        self.assertEqual(json.loads(restored), self.context)
+
+    @unittest.skipUnless(event_bus_batched.HAS_ZSTD, "zstandard not installed")
+    def test_zstd_dictionary_round_trip(self):
+        """Test that a context compressed with a trained dictionary decompresses with it"""
+        samples = [
+            _json_dumps_bytes({"pid": i, "user": f"user{i % 7}", "path": f"/Users/u/file{i}.txt"})
+            for i in range(1000)
+        ]
+        dict_data = zstandard.train_dictionary(4096, samples)
+
+        event = {"context": self.context}
+        _compress_context(event, self.context_bytes, event_bus_batched._new_zstd_compressor(dict_data))
+
+        self.assertIsNone(event["context"])
+        compressed = event["context_zstd"]
+        if not event_bus_batched.HAS_ORMSGPACK:
+            compressed = base64.b64decode(compressed)
+        self.assertEqual(zstandard.get_frame_parameters(compressed).dict_id, dict_data.dict_id())
+
+        restored = zstandard.ZstdDecompressor(dict_data=dict_data).decompress(compressed)
+        self.assertEqual(json.loads(restored), self.context)
+
+
+@unittest.skipIf(event_bus_batched.HAS_ORMSGPACK, "batches go out as msgpack")
+class TestBatchBroadcast(unittest.TestCase):
+    """Test WebSocket batch framing"""
+
+    def test_one_message_per_batch(self):
+        """Test that every batch reaches the client as its own {type: 'batch'} text message"""
+        async def run():
+            bus = EventBusBatched()
+            websocket = FakeWebSocket()
+            client = asyncio.create_task(bus.handle_ws_client(websocket, "/"))
+            await asyncio.sleep(0)
+
+            # Queued back to back, so the writer takes both in one pass
+            await bus.broadcast_batch([_event(0)])
+            await bus.broadcast_batch([_event(1), _event(2)])
+            for _ in range(10):
+                await asyncio.sleep(0)
+
+            websocket.close()
+            await client
+            return websocket.sent
+
+        sent = asyncio.run(run())
+
+        self.assertEqual(len(sent), 2)
+        for message in sent:
+            self.assertIsInstance(message, str)
+        batches = [json.loads(message) for message in sent]
+        self.assertEqual([b["type"] for b in batches], ["batch", "batch"])
+        self.assertEqual([b["count"] for b in batches], [1, 2])
+        self.assertEqual(
+            [e["message"] for b in batches for e in b["events"]],
+            ["Test event 0", "Test event 1", "Test event 2"]
+        )
+
+
+class TestDeduplication(unittest.TestCase):
+    """Test duplicate suppression in process_event"""
+
+    def _process(self, events):
+        """Run events through a new bus's process_event; returns the bus"""
+        async def run():
+            bus = EventBusBatched()
+            for event in events:
+                await bus.process_event(event)
+            return bus
+        return asyncio.run(run())
+
+    def test_duplicate_within_epoch(self):
+        """Test that a repeat inside one Bloom generation is dropped and counted"""
+        bus = self._process([
+            _stamped("e1", "2024-01-15T10:30:40Z"),
+            _stamped("e1", "2024-01-15T10:30:41Z")
+        ])
+
+        self.assertEqual(len(bus.event_buffer), 1)
+        (_, count), = bus.recent_hashes.values()
+        self.assertEqual(count, 2)
+
+    def test_duplicate_across_epochs(self):
+        """Test that a repeat in the next Bloom generation is still caught"""
+        bus = self._process([
+            _stamped("e1", "2024-01-15T10:30:44Z"),
+            _stamped("e1", "2024-01-15T10:30:46Z")
+        ])
+
+        self.assertEqual(len(bus.event_buffer), 1)
+
+    def test_distinct_events_kept(self):
+        """Test that different events are never merged"""
+        bus = self._process([
+            _stamped("e1", "2024-01-15T10:30:40Z"),
+            _stamped("e2", "2024-01-15T10:30:40Z")
+        ])
+
+        self.assertEqual(len(bus.event_buffer), 2)
+
+    def test_expiry_after_window(self):
+        """Test that a hash older than DEDUP_WINDOW expires and its event passes again"""
+        first = datetime(2024, 1, 15, 10, 30, 40)
+        later = first + event_bus_batched.DEDUP_WINDOW
+        bus = self._process([
+            _stamped("e1", first.isoformat() + "Z"),
+            _stamped("e2", first.isoformat() + "Z"),
+            _stamped("e1", later.isoformat() + "Z")
+        ])
+
+        self.assertEqual(len(bus.event_buffer), 3)
+        # e2 fell out of the window; e1 was stored again with a fresh time
+        self.assertEqual(len(bus.recent_hashes), 1)
+
+    def test_eviction_drops_one_shot_hashes_first(self):
+        """Test that over the cap, hashes seen once go before repeated ones"""
+        events = [
+            _stamped("repeated", "2024-01-15T10:30:40Z"),
+            _stamped("repeated", "2024-01-15T10:30:40Z")
+        ] + [_stamped(f"unique{i}", "2024-01-15T10:30:41Z") for i in range(4)]
+
+        with mock.patch.object(event_bus_batched, "DEDUP_MAX_HASHES", 4), \
+                mock.patch.object(event_bus_batched, "DEDUP_EVICT_TO", 3):
+            bus = self._process(events)
+
+        counts = list(bus.recent_hashes.values())
+        self.assertEqual(len(counts), 3)
+        # The oldest entry survives because it repeated; the two oldest
+        # one-shot hashes were evicted
+        self.assertEqual([count for _, count in counts], [2, 1, 1])
+
+    def test_eviction_falls_back_to_oldest(self):
+        """Test that without enough one-shot hashes the oldest repeated ones go"""
+        async def run():
+            bus = EventBusBatched()
+            t = datetime(2024, 1, 15, 10, 30, 40)
+            bus.recent_hashes = OrderedDict(
+                [(1, (t, 2)), (2, (t, 1)), (3, (t, 3)), (4, (t, 2))]
+            )
+            with mock.patch.object(event_bus_batched, "DEDUP_EVICT_TO", 2):
+                bus._evict_hashes()
+            return bus
+
+        bus = asyncio.run(run())
+        self.assertEqual(list(bus.recent_hashes), [3, 4])
+
+
+class TestUDSInput(unittest.TestCase):
+    """Test UDS wire formats and payload parsing"""
+
+    def _read(self, data):
+        """Feed raw bytes to handle_uds_client; returns the queued payloads"""
+        async def run():
+            bus = EventBusBatched()
+            reader = asyncio.StreamReader()
+            reader.feed_data(data)
+            reader.feed_eof()
+            await bus.handle_uds_client(reader, FakeStreamWriter())
+            payloads = []
+            while not bus._ingest.empty():
+                payloads.append(bus._ingest.get_nowait())
+            return payloads
+        return asyncio.run(run())
+
+    def test_framed_input(self):
+        """Test that length-prefixed frames each become one payload"""
+        first = json.dumps(_stamped("e1", "2024-01-15T10:30:40Z")).encode()
+        second = json.dumps(_stamped("e2", "2024-01-15T10:30:40Z")).encode()
+        data = b"".join(struct.pack(">I", len(p)) + p for p in (first, second))
+
+        self.assertEqual(self._read(data), [first, second])
+
+    def test_legacy_input(self):
+        """Test that an unframed event (e.g. from nc) is read as one payload"""
+        payload = json.dumps(_stamped("e1", "2024-01-15T10:30:40Z")).encode()
+
+        self.assertEqual(self._read(payload), [payload])
+
+    def test_oversized_frame_rejected(self):
+        """Test that a frame over UDS_MAX_FRAME is not queued"""
+        header = struct.pack(">I", event_bus_batched.UDS_MAX_FRAME + 1)
+
+        self.assertEqual(self._read(header + b"{}"), [])
+
+    def test_truncated_frame_dropped(self):
+        """Test that a frame cut short by EOF is not queued"""
+        payload = b'{"event_id": "e1"}'
+
+        self.assertEqual(self._read(struct.pack(">I", len(payload) + 10) + payload), [])
+
+    def test_invalid_payloads_not_spliced(self):
+        """Test that malformed payloads cannot combine into fabricated events"""
+        async def run():
+            bus = EventBusBatched()
+            valid = json.dumps(_stamped("e1", "2024-01-15T10:30:40Z")).encode()
+            ts = b'"timestamp":"2024-01-15T10:30:40Z"'
+            # Joined with commas these would parse as four stamped objects
+            spliced = (
+                b'{"a":"',
+                b'",' + ts + b',"event_id":"fake1"}',
+                b'{' + ts + b',"event_id":"fake2"},{' + ts + b',"event_id":"fake3"}'
+            )
+            for payload in spliced + (valid,):
+                bus._ingest.put_nowait(payload)
+            worker = asyncio.create_task(bus._ingest_worker())
+            for _ in range(10):
+                await asyncio.sleep(0)
+            worker.cancel()
+            return bus
+
+        bus = asyncio.run(run())
+        self.assertEqual([e["event_id"] for e in bus.event_buffer], ["e1"])
+
+
+if __name__ == '__main__':
+    unittest.main()
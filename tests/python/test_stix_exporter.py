@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+
+"""
+STIX Exporter Test Suite
+"""
+
+import unittest
+import json
+import tempfile
+from pathlib import Path
+import sys
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "MacGuardianSuite"))
+
+import stix_exporter
+
+
+NOW = "2024-01-15T10:30:45.000000Z"
+
+
+def _without_ids(objects):
+    """Bundle objects with their random ids dropped, for comparison"""
+    return [{k: v for k, v in obj.items() if k != "id"} for obj in objects]
+
+
+class TestStixExport(unittest.TestCase):
+    """Test STIX bundle output"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.tmp_path = Path(self.tmp.name)
+        self.observables = [
+            stix_exporter.ip_to_stix(f"10.0.0.{i}", first_observed=NOW)
+            for i in range(25)
+        ]
+        self.indicators = [{"pattern": "[ipv4-addr:value = '10.0.0.1']"}]
+
+    def tearDown(self):
+        """Clean up test artifacts"""
+        self.tmp.cleanup()
+
+    def _read_bundle(self, path):
+        with open(path, 'rb') as f:
+            return json.load(f)
+
+    def test_streamed_bundle_matches_in_memory(self):
+        """Test that write_stix_bundle writes what create_stix_bundle builds"""
+        output_file = self.tmp_path / "bundle.stix.json"
+        stix_exporter.write_stix_bundle(output_file, self.observables, self.indicators, now=NOW)
+
+        written = self._read_bundle(output_file)
+        built = stix_exporter.create_stix_bundle(self.observables, self.indicators, now=NOW)
+        self.assertEqual(_without_ids(written["objects"]), _without_ids(built["objects"]))
+
+
+class TestIOCExport(unittest.TestCase):
+    """Test IOC file to STIX conversion"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.tmp_path = Path(self.tmp.name)
+        self.iocs = [
+            {"type": "ip", "value": "10.0.0.1"},
+            {"type": "ip", "value": "10.0.0.1"},
+            {"type": "domain", "value": "evil.example"},
+            {"type": "ip", "value": "10.0.0.1"},
+            {"type": "hash", "value": "d41d8cd98f00b204e9800998ecf8427e"},
+            {"type": "md5", "value": "d41d8cd98f00b204e9800998ecf8427e"},
+            {"type": "unsupported", "value": "ignored"}
+        ]
+        self.ioc_file = self.tmp_path / "iocs.json"
+        self.ioc_file.write_text(json.dumps(self.iocs))
+
+    def tearDown(self):
+        """Clean up test artifacts"""
+        self.tmp.cleanup()
+
+    def _export(self, name):
+        output_file = self.tmp_path / name
+        self.assertTrue(stix_exporter.export_iocs_to_stix(self.ioc_file, output_file))
+        with open(output_file, 'rb') as f:
+            return json.load(f)
+
+    def _observed(self, bundle):
+        """(object, number_observed) per observed-data object, in order"""
+        return [
+            (obj["objects"]["0"], obj["number_observed"])
+            for obj in bundle["objects"] if obj["type"] == "observed-data"
+        ]
+
+    def test_duplicate_iocs_counted(self):
+        """Test that repeated IOCs become one observable with number_observed"""
+        observed = self._observed(self._export("iocs.stix.json"))
+
+        self.assertEqual(observed, [
+            ({"type": "ipv4-addr", "value": "10.0.0.1"}, 3),
+            ({"type": "domain-name", "value": "evil.example"}, 1),
+            ({"type": "file", "hashes": {"md5": "d41d8cd98f00b204e9800998ecf8427e"}}, 2)
+        ])
+
+    @unittest.skipUnless(stix_exporter.HAS_IJSON, "ijson not installed")
+    def test_streamed_ioc_file(self):
+        """Test that a streamed (ijson) IOC file exports like a fully parsed one"""
+        parsed = self._observed(self._export("parsed.stix.json"))
+
+        saved = stix_exporter.IOC_STREAM_MIN
+        stix_exporter.IOC_STREAM_MIN = 0
+        try:
+            with open(self.ioc_file, 'rb') as f:
+                self.assertNotIsInstance(stix_exporter._read_iocs(f), list)
+            streamed = self._observed(self._export("streamed.stix.json"))
+        finally:
+            stix_exporter.IOC_STREAM_MIN = saved
+
+        self.assertEqual(streamed, parsed)
+
+    @unittest.skipUnless(stix_exporter.HAS_IJSON, "ijson not installed")
+    def test_streamed_invalid_json(self):
+        """Test that a malformed streamed IOC file is reported, not raised"""
+        self.ioc_file.write_text('[{"type": "ip", "value": ')
+
+        saved = stix_exporter.IOC_STREAM_MIN
+        stix_exporter.IOC_STREAM_MIN = 0
+        try:
+            self.assertFalse(
+                stix_exporter.export_iocs_to_stix(self.ioc_file, self.tmp_path / "out.json")
+            )
+        finally:
+            stix_exporter.IOC_STREAM_MIN = saved
+
+
+if __name__ == '__main__':
+    unittest.main()